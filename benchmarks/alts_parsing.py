@@ -0,0 +1,122 @@
+"""
+Compare l'ancienne implémentation de alts_parsing (iterrows) à la version vectorisée.
+
+Les deux versions sont appliquées aux mêmes alternants synthétiques : les
+DataFrames produits doivent être identiques, puis les durées sont comparées.
+
+    python -m benchmarks.alts_parsing [nombre_alternants]
+"""
+import asyncio
+import random
+import sys
+import time
+
+import pandas as pd
+
+import src.modules.extract.parsers.constants as constants
+from src.modules.extract.parsers.alternantsJSON import alts_parsing
+
+MESURES = [
+    "Aide exceptionnelle (Apprentissage moins de 250 salaries ET niveau de diplome superieur a 4)",
+    "Aide exceptionnelle (Contrat professionnalisation moins de 250 salaries ET niveau de diplome superieur a 4)",
+    "Aide exceptionnelle (Apprentissage 250 salaries et plus)",
+    "Aide exceptionnelle (Contrat professionnalisation 250 salaries et plus)",
+    "Aide unique apprentissage",
+    "Embauche PME",
+]
+
+
+async def legacy_alts_parsing(df_alts: pd.DataFrame):
+    """Implémentation d'origine (ligne par ligne), conservée comme référence."""
+    df_alts = df_alts.drop(constants.IGNORED_COLUMNS_ALT, axis=1)
+    df_alts.drop(
+        df_alts[df_alts["mesure"].str.startswith("Embauche PME")].index, inplace=True
+    )
+
+    for index, row in df_alts.iterrows():
+        df_alts.at[index, "siret"] = row["employeur"]["siret"]
+        df_alts.at[index, "denominationENT"] = row["employeur"]["denomination"]
+        montantObtenu = 0
+        DSN = False
+
+        for rowDetails in row["details"]:
+            if "montant_aide" in rowDetails and rowDetails["montant_aide"] != "":
+                montantObtenu += float(rowDetails["montant_aide"])
+            if "salaire_brut" in rowDetails:
+                if (
+                    rowDetails["salaire_brut"] == ""
+                    or rowDetails["salaire_brut"] == "0"
+                ):
+                    DSN = True
+        df_alts.at[index, "montantAideObtenu"] = montantObtenu
+        if DSN:
+            df_alts.at[index, "AnomalieDSN"] = "X"
+        else:
+            df_alts.at[index, "AnomalieDSN"] = ""
+
+    for old_value, new_value in constants.MESURE_REPLACEMENTS.items():
+        df_alts["mesure"] = df_alts["mesure"].str.replace(old_value, new_value)
+
+    df_alts["montantAideObtenu"] = df_alts["montantAideObtenu"].astype(float)
+
+    df_alts["Millésime"] = df_alts["dateDebut"].apply(lambda x: x.split("/")[-1])
+    df_alts["AnnéePaiement"] = df_alts["dateDebut"].apply(lambda x: x.split("/")[-1])
+
+    df_alts = df_alts.drop(["employeur"], axis=1)
+
+    existing_columns = [
+        col for col in constants.colonnes_ordonnees if col in df_alts.columns
+    ]
+    if existing_columns:
+        df_alts = df_alts[existing_columns]
+
+    return df_alts
+
+
+def _detail(rng: random.Random) -> dict:
+    detail = {"mois": f"{rng.randint(1, 12):02d}/2024"}
+    if rng.random() < 0.9:
+        detail["montant_aide"] = rng.choice(["", f"{rng.randint(0, 600000) / 100}", "500"])
+    if rng.random() < 0.8:
+        detail["salaire_brut"] = rng.choice(["", "0", "1750.25", "2100"])
+    return detail
+
+
+def synthetic_alternants(count: int, seed: int = 42) -> pd.DataFrame:
+    rng = random.Random(seed)
+    alternants = []
+    for i in range(count):
+        alternant = {column: rng.randint(0, 1) for column in constants.IGNORED_COLUMNS_ALT}
+        alternant.update({
+            "nom": f"NOM{i}",
+            "prenom": f"Prenom{i}",
+            "numeroDossier": f"DOS{i:07d}",
+            "dateDebut": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2019, 2025)}",
+            "dateFinPrevue": "31/08/2026",
+            "mesure": rng.choice(MESURES),
+            "etatSuivi": "En cours",
+            "employeur": {"siret": f"{rng.randint(10**13, 10**14 - 1)}", "denomination": f"ENTREPRISE {i % 500}"},
+            "details": [_detail(rng) for _ in range(rng.randint(0, 24))],
+        })
+        alternants.append(alternant)
+    return pd.DataFrame.from_dict(alternants)
+
+
+async def main(count: int) -> None:
+    df = synthetic_alternants(count)
+
+    start = time.perf_counter()
+    expected = await legacy_alts_parsing(df.copy())
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = alts_parsing(df.copy())
+    vectorised = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(result, expected)
+    print(f"{count} alternants : iterrows {legacy:.3f}s, vectorisé {vectorised:.3f}s "
+          f"(x{legacy / vectorised:.1f})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
@@ -0,0 +1,93 @@
+"""
+Chargement des AVPs pour l'extraction : ancienne boucle contre lecture parallèle.
+
+Crée un jeu de sauvegardes synthétiques (un dossier par SIRET) dans un
+dossier temporaire, puis compare :
+    - l'ancienne boucle : get_stored_avps SIRET par SIRET et pd.concat à chaque tour ;
+    - get_stored_avps_frames : lectures en parallèle et DataFrame construit en une passe.
+
+Le pic mémoire est celui suivi par tracemalloc (allocations Python et numpy).
+
+    python -m benchmarks.avp_extract [nombre_sirets] [avps_par_siret] [codec]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import src.config as config
+from src.modules.storage.avps.avps import get_stored_avps, get_stored_avps_frames, save_avps
+
+
+async def legacy_load(sirets):
+    """Boucle d'origine de avp_extract, conservée comme référence."""
+    df_avps = pd.DataFrame()
+    for siret in sirets:
+        avps_dict = await get_stored_avps(siret)
+        df_avps = pd.concat(
+            [df_avps, pd.DataFrame.from_dict(avps_dict)], ignore_index=True
+        )
+    return df_avps
+
+
+async def parallel_load(sirets):
+    return await get_stored_avps_frames(sirets)
+
+
+async def build_dataset(count: int, per_siret: int, seed: int = 42):
+    rng = random.Random(seed)
+    sirets = [f"{rng.randint(10**13, 10**14 - 1)}" for _ in range(count)]
+    for siret in sirets:
+        avps = [
+            {
+                "id": str(rng.randint(10**6, 10**7)),
+                "siret": siret,
+                "employeur": f"ENTREPRISE {siret[-4:]}",
+                "date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024",
+                "montant": f"{rng.randint(0, 9999)},{rng.randint(0, 99):02d}",
+                "libelle": "Aide exceptionnelle apprentissage",
+                "delta": rng.random() < 0.2,
+            }
+            for _ in range(per_siret)
+        ]
+        await save_avps(avps, siret)
+    return sirets
+
+
+async def measure(name, load, sirets):
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = await load(sirets)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<10} {elapsed:7.2f}s  pic {peak / 2**20:7.1f} MB  ({len(df)} AVPs)")
+    return df, elapsed
+
+
+async def main(count: int, per_siret: int, codec: str) -> None:
+    config.SNAPSHOT_CODEC = codec
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        sirets = await build_dataset(count, per_siret)
+        print(f"{count} SIRETs, {per_siret} AVPs par SIRET, format {codec}")
+
+        legacy, legacy_time = await measure("iteratif", legacy_load, sirets)
+        parallel, parallel_time = await measure("parallele", parallel_load, sirets)
+
+        pd.testing.assert_frame_equal(parallel, legacy)
+        print(f"x{legacy_time / parallel_time:.1f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(
+        int(args[0]) if len(args) > 0 else 5000,
+        int(args[1]) if len(args) > 1 else 20,
+        args[2] if len(args) > 2 else config.SNAPSHOT_CODEC,
+    ))
@@ -0,0 +1,130 @@
+"""
+Export Excel : ancien pd.ExcelWriter + add_table contre écriture en flux (constant_memory).
+
+Les deux classeurs sont écrits à partir des mêmes DataFrames synthétiques
+(AVPs, entreprises, alternants) ; les valeurs des cellules sont relues dans
+le XML des feuilles et comparées, puis les durées et les pics mémoire
+(tracemalloc) sont comparés.
+
+    python -m benchmarks.excel_export [nombre_lignes]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from xml.etree import ElementTree
+
+import pandas as pd
+
+from src.modules.extract.parsers.utils import open_workbook, save_excel
+
+
+def legacy_save_excel(writer, df: pd.DataFrame, sheet):
+    """save_excel d'origine, conservée comme référence."""
+    df.to_excel(writer, sheet_name=sheet, startrow=1, header=False, index=False)
+    worksheet = writer.sheets[sheet]
+
+    (max_row, max_col) = df.shape
+    column_settings = [{"header": column} for column in df.columns]
+    worksheet.add_table(0, 0, max_row, max_col - 1, {"columns": column_settings})
+
+    worksheet.set_column(0, max_col - 1, 25)
+
+
+def legacy_export(path, sheets):
+    with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
+        for sheet, df in sheets:
+            legacy_save_excel(writer, df, sheet)
+
+
+def stream_export(path, sheets):
+    workbook = open_workbook(path)
+    try:
+        for sheet, df in sheets:
+            save_excel(workbook, df, sheet)
+    finally:
+        workbook.close()
+
+
+NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def read_cells(path):
+    """Valeurs de chaque cellule de chaque feuille ({feuille: {référence: valeur}})."""
+    with zipfile.ZipFile(path) as archive:
+        shared = []
+        if "xl/sharedStrings.xml" in archive.namelist():
+            root = ElementTree.fromstring(archive.read("xl/sharedStrings.xml"))
+            shared = ["".join(t.text or "" for t in si.iter(NS + "t")) for si in root.iter(NS + "si")]
+        sheets = {}
+        for name in sorted(n for n in archive.namelist() if n.startswith("xl/worksheets/sheet")):
+            cells = {}
+            for c in ElementTree.fromstring(archive.read(name)).iter(NS + "c"):
+                formula = c.find(NS + "f")
+                value = c.find(NS + "v")
+                if formula is not None:
+                    cells[c.get("r")] = "=" + formula.text
+                elif c.get("t") == "s":
+                    cells[c.get("r")] = shared[int(value.text)]
+                elif c.get("t") == "inlineStr":
+                    cells[c.get("r")] = "".join(t.text or "" for t in c.iter(NS + "t"))
+                elif value is not None:
+                    cells[c.get("r")] = value.text
+            sheets[name] = cells
+        return sheets
+
+
+def build_sheets(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    sirets = [f"{rng.randint(10**13, 10**14 - 1)}" for _ in range(max(count // 20, 1))]
+    df_avps = pd.DataFrame({
+        "siret": [rng.choice(sirets) for _ in range(count)],
+        "id": [str(rng.randint(10**6, 10**7)) for _ in range(count)],
+        "date": pd.to_datetime([f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024" for _ in range(count)],
+                               format="%d/%m/%Y"),
+        "montant": [rng.randint(0, 999999) / 100 for _ in range(count)],
+        "libelle": ["Aide exceptionnelle apprentissage"] * count,
+        "delta": [rng.random() < 0.2 for _ in range(count)],
+    })
+    df_ent = pd.DataFrame({
+        "siret": sirets,
+        "denomination": [f"ENTREPRISE {siret[-4:]}" for siret in sirets],
+    })
+    df_alts = pd.DataFrame({
+        "nom": [rng.choice(["DUPONT", "LE GALL", "N'DIAYE"]) for _ in range(count)],
+        "numeroDossier": [f"A{rng.randint(10**5, 10**7)}" for _ in range(count)],
+        "montantAideObtenu": [rng.choice([rng.randint(0, 600000) / 100, float("nan")]) for _ in range(count)],
+        "siret": [rng.choice(sirets) for _ in range(count)],
+    })
+    return [("AVPs", df_avps), ("Entreprises", df_ent), ("Alternants", df_alts)]
+
+
+def measure(name, export, path, sheets):
+    tracemalloc.start()
+    start = time.perf_counter()
+    export(path, sheets)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<10} {elapsed:7.2f}s  pic {peak / 2**20:7.1f} MB  ({os.path.getsize(path) / 2**20:.1f} MB)")
+    return elapsed, peak
+
+
+def main(count: int) -> None:
+    sheets = build_sheets(count)
+    with tempfile.TemporaryDirectory() as workdir:
+        legacy_path = os.path.join(workdir, "legacy.xlsx")
+        stream_path = os.path.join(workdir, "stream.xlsx")
+        print(f"{count} lignes par feuille")
+        legacy_time, legacy_peak = measure("ExcelWriter", legacy_export, legacy_path, sheets)
+        stream_time, stream_peak = measure("flux", stream_export, stream_path, sheets)
+
+        assert read_cells(stream_path) == read_cells(legacy_path), "les classeurs diffèrent"
+        print(f"temps x{legacy_time / stream_time:.1f}, mémoire /{legacy_peak / stream_peak:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,92 @@
+"""
+Classement des lignes d'AVP : ancien enchaînement de re.findall contre classify_line.
+
+Les deux versions sont appliquées au même corpus de lignes synthétiques
+(alternants, paiements, acomptes, régularisations, lignes ignorées et
+inconnues) : les résultats doivent être identiques, puis les débits sont
+comparés en lignes par seconde.
+
+    python -m benchmarks.pdf_lines [nombre_lignes]
+"""
+import random
+import re
+import sys
+import time
+
+import src.modules.extract.parsers.constants as constants
+from src.modules.extract.parsers.alternantsPDF import (
+    LINE_IGNORED,
+    LINE_NOM,
+    LINE_PAIEMENT,
+    LINE_REGULARISATION,
+    classify_line,
+)
+
+MOIS = ["JANVIER", "FEVRIER", "MARS", "AVRIL", "MAI", "JUIN", "JUILLET", "AOUT"]
+NOMS = ["DUPONT", "LE GALL", "N'DIAYE"]
+
+
+def legacy_classify_line(line: str):
+    """Logique d'origine de alternants_extract_pdf, conservée comme référence."""
+    find_nom = re.findall(constants.REGEX_PATTERN_NOM_DOSSIER, line, re.IGNORECASE)
+    find_paiement = re.findall(constants.REGEX_DETECT_PAIEMENT, line, re.IGNORECASE)
+    find_acompte = re.findall(constants.REGEX_DETECT_ACOMPTE, line, re.IGNORECASE)
+    find_regularisation = re.findall(constants.REGEX_DETECT_REGULARISATION, line, re.IGNORECASE)
+    if find_nom:
+        return LINE_NOM, find_nom[0]
+    if find_paiement or find_acompte:
+        date = re.findall(constants.CAPTURE_DATE, line, re.IGNORECASE)[0]
+        montant = re.findall(constants.CAPTURE_MONTANT, line, re.IGNORECASE)[0]
+        return LINE_PAIEMENT, (date, montant)
+    if find_regularisation:
+        date = re.findall(constants.CAPTURE_DATE, line, re.IGNORECASE)[0]
+        montant = re.findall(constants.CAPTURE_MONTANT, line, re.IGNORECASE)[0]
+        return LINE_REGULARISATION, (date, montant)
+    if any(words in line for words in constants.IGNOREDLINES):
+        return LINE_IGNORED, None
+    return None, None
+
+
+def _montant(rng: random.Random) -> str:
+    return rng.choice([f"{rng.randint(1, 999)},{rng.randint(0, 99):02d}", f"1 {rng.randint(100, 999)},00"])
+
+
+def sample_lines(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    generators = [
+        lambda: f"M{rng.choice(['', 'ME', 'LE'])} {rng.choice(NOMS)} MARIE DOSSIER "
+                f"{rng.choice(['A', 'EA', 'P', ''])}{rng.randint(10**5, 10**7)}",
+        lambda: f"Paiement du mois de {rng.randint(1, 12):02d}/2024 {_montant(rng)}",
+        lambda: f"Paiement des mois de {'/'.join(rng.sample(MOIS, 2))} {_montant(rng)}",
+        lambda: f"ACOMPTE {rng.randint(1, 12):02d}/2024 {rng.randint(100, 999)},00",
+        lambda: f"Regularisation du mois de {rng.randint(1, 12):02d}/2024 {_montant(rng)}",
+        lambda: f"REGUL {rng.randint(1, 12):02d}/2024 AURAIT DU PERCEVOIR 500,00 A PERCU 400,00 {_montant(rng)}",
+        lambda: rng.choice(constants.IGNOREDLINES),
+        lambda: f"{rng.choice(constants.IGNOREDLINES)} {_montant(rng)}",
+        lambda: f"Ligne inconnue {rng.randint(0, 10**6)}",
+    ]
+    weights = [2, 4, 2, 1, 1, 1, 4, 2, 1]
+    return [rng.choices(generators, weights)[0]() for _ in range(count)]
+
+
+def throughput(classify, lines):
+    start = time.perf_counter()
+    results = [classify(line) for line in lines]
+    return results, len(lines) / (time.perf_counter() - start)
+
+
+def main(count: int) -> None:
+    lines = sample_lines(count)
+    # Le cache de re.findall est chauffé avant la mesure
+    legacy_classify_line(lines[0])
+
+    expected, legacy_rate = throughput(legacy_classify_line, lines)
+    results, rate = throughput(classify_line, lines)
+
+    assert results == expected, "classify_line diffère de l'ancienne logique"
+    print(f"{count} lignes : findall {legacy_rate:,.0f} lignes/s, classify_line {rate:,.0f} lignes/s "
+          f"(x{rate / legacy_rate:.1f})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -40,6 +40,63 @@ ALTS_URL =      config("ALTS_URL", default=None)
 ALT_URL =       config("ALT_URL", default=None)
 ALT_EDP_URL =   config("ALT_EDP_URL", default=None)
 
+# Client HTTP Sylaé (pool de connexions keep-alive partagé)
+SYLAE_HTTP_TIMEOUT =            config("SYLAE_HTTP_TIMEOUT", cast=float, default=60.0)
+SYLAE_HTTP_CONNECT_TIMEOUT =    config("SYLAE_HTTP_CONNECT_TIMEOUT", cast=float, default=10.0)
+SYLAE_HTTP_MAX_CONNECTIONS =    config("SYLAE_HTTP_MAX_CONNECTIONS", cast=int, default=20)
+SYLAE_HTTP_MAX_KEEPALIVE =      config("SYLAE_HTTP_MAX_KEEPALIVE", cast=int, default=10)
+SYLAE_HTTP_MAX_PER_HOST =       config("SYLAE_HTTP_MAX_PER_HOST", cast=int, default=10)
+SYLAE_HTTP2 =                   config("SYLAE_HTTP2", cast=bool, default=True)
+# Ne renvoie pas VERIFID_URL si l'employeur est déjà sélectionné pour la session.
+# Limité aux sessions du pool, propres à chaque worker : la session partagée entre
+# workers (fichier de session) renvoie toujours VERIFID_URL.
+SYLAE_EMPLOYER_AFFINITY =       config("SYLAE_EMPLOYER_AFFINITY", cast=bool, default=True)
+
+# Pool de sessions Sylaé : chaque session porte son propre employeur sélectionné,
+# N sessions permettent de traiter N entreprises en parallèle
+SYLAE_SESSION_POOL_SIZE =       config("SYLAE_SESSION_POOL_SIZE", cast=int, default=1)
+SYLAE_SESSION_TTL =             config("SYLAE_SESSION_TTL", cast=int, default=15 * 60)  # Secondes
+SYLAE_SESSION_REFRESH_MARGIN =  config("SYLAE_SESSION_REFRESH_MARGIN", cast=int, default=120)  # Secondes
+
+# Stratégie de connexion : "playwright", "http" (formulaire rejoué sans navigateur)
+# ou "auto" (formulaire HTTP, navigateur en secours)
+SYLAE_LOGIN_STRATEGY =          config("SYLAE_LOGIN_STRATEGY", default="auto")
+# Navigateur Playwright lancé au démarrage du worker et réutilisé pour chaque connexion
+SYLAE_BROWSER_WARM =            config("SYLAE_BROWSER_WARM", cast=bool, default=True)
+
+# Détails des alternants : concurrence adaptative (réduite quand Sylaé sature)
+SYLAE_ALT_CONCURRENCY =         config("SYLAE_ALT_CONCURRENCY", cast=int, default=4)
+SYLAE_ALT_MIN_CONCURRENCY =     config("SYLAE_ALT_MIN_CONCURRENCY", cast=int, default=1)
+SYLAE_ALT_MAX_CONCURRENCY =     config("SYLAE_ALT_MAX_CONCURRENCY", cast=int, default=16)
+SYLAE_ALT_RETRIES =             config("SYLAE_ALT_RETRIES", cast=int, default=3)
+SYLAE_ALT_BACKOFF =             config("SYLAE_ALT_BACKOFF", cast=float, default=1.0)
+
+# Téléchargement des PDFs d'AVP : téléchargements simultanés et nouvelles tentatives par PDF
+SYLAE_PDF_WORKERS =             config("SYLAE_PDF_WORKERS", cast=int, default=4)
+SYLAE_PDF_RETRIES =             config("SYLAE_PDF_RETRIES", cast=int, default=3)
+SYLAE_PDF_BACKOFF =             config("SYLAE_PDF_BACKOFF", cast=float, default=0.5)
+# Mode spool : PDFs écrits par morceaux dans data/sylae/blobs au lieu d'être gardés en mémoire
+SYLAE_PDF_SPOOL =               config("SYLAE_PDF_SPOOL", cast=bool, default=True)
+# Les PDFs déjà présents dans l'index local sont servis sans requête ; avec REVALIDATE,
+# ceux qui ont un ETag / Last-Modified sont revalidés par une requête conditionnelle
+SYLAE_PDF_REVALIDATE =          config("SYLAE_PDF_REVALIDATE", cast=bool, default=False)
+SYLAE_BLOB_RETENTION_HOURS =    config("SYLAE_BLOB_RETENTION_HOURS", cast=int, default=48)
+# Nombre de sauvegardes JSON conservées par dossier (AVPs / alternants par SIRET, entreprises)
+SNAPSHOT_RETENTION =            config("SNAPSHOT_RETENTION", cast=int, default=10)
+# Format des sauvegardes d'AVPs et d'alternants : "json" (historique, indenté), "jsonl"
+# (JSON compact, une ligne par enregistrement) ou "parquet" (colonnaire, nécessite pyarrow)
+SNAPSHOT_CODEC =                config("SNAPSHOT_CODEC", default="jsonl")
+# Lectures simultanées de sauvegardes lors des extractions
+SNAPSHOT_LOAD_WORKERS =         config("SNAPSHOT_LOAD_WORKERS", cast=int, default=8)
+# Analyse des PDFs d'AVP : processus en parallèle (0 = nombre de cœurs) et extraction du
+# texte, "pypdf" ou "pymupdf" (PyMuPDF, plus rapide)
+PDF_PARSE_WORKERS =             config("PDF_PARSE_WORKERS", cast=int, default=0)
+PDF_TEXT_BACKEND =              config("PDF_TEXT_BACKEND", default="pypdf")
+# Transformations des extractions (DataFrames des feuilles Excel) : "process" (pool de
+# processus, feuilles réellement construites en parallèle) ou "thread"
+EXTRACT_EXECUTOR =              config("EXTRACT_EXECUTOR", default="process")
+EXTRACT_WORKERS =               config("EXTRACT_WORKERS", cast=int, default=3)
+
 SNAPLOGIC_BASE_URL = config("SNAPLOGIC_BASE_URL", default=None)
 SNAPLOGIC_UPLOAD_ENDPOINT = config("SNAPLOGIC_UPLOAD_ENDPOINT", default=None)
 SNAPLOGIC_BEARER = config("SNAPLOGIC_BEARER", default=None)
@@ -47,6 +104,11 @@ SNAPLOGIC_BEARER = config("SNAPLOGIC_BEARER", default=None)
 SNAPLOGIC_NOTIFICATION_ENDPOINT = config("SNAPLOGIC_NOTIFICATION_ENDPOINT", default=None)
 SNAPLOGIC_NOTIFICATION_BEARER = config("SNAPLOGIC_NOTIFICATION_BEARER", default=None)
 
+# Pipeline
+# Nombre d'entreprises traitées en parallèle (par défaut une par session du pool).
+# Au-delà de SYLAE_SESSION_POOL_SIZE, les entreprises attendent qu'une session se libère.
+PIPELINE_COMPANY_WORKERS = config("PIPELINE_COMPANY_WORKERS", cast=int, default=SYLAE_SESSION_POOL_SIZE)
+
 
 # class CustomBaseSettings(BaseSettings):
 #     model_config = SettingsConfigDict(
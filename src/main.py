@@ -17,7 +17,10 @@ from .middlewares.rate_limiter import limiter
 
 # Imports
 from .api import api_router
-from .config import app_configs
+from .config import app_configs, SYLAE_BROWSER_WARM
+from .modules.webscrapping.client import close_sylae_client
+from .modules.extract.executor import close_extract_executor
+from .modules.webscrapping.scenarios.browser import get_browser_manager, close_browser_manager
 
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
@@ -25,17 +28,28 @@ from typing import AsyncGenerator
 log = logging.getLogger(__name__)
 # configure_logging()
 
-# we create the ASGI for the app
-app = FastAPI(exception_handlers=exception_handlers, openapi_url="")
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-#app.add_middleware(GZipMiddleware, minimum_size=1000)
-
 @asynccontextmanager
 async def lifespan(_application: FastAPI) -> AsyncGenerator:
     # Code executed on the Startup
+    if SYLAE_BROWSER_WARM:
+        try:
+            await get_browser_manager().start()
+        except Exception as e:
+            # Le navigateur sera lancé à la première connexion
+            log.warning(f"Démarrage du navigateur Playwright impossible : {e}")
     yield
     # Code executed on the Shutdown
+    await close_sylae_client()
+    await close_browser_manager()
+    close_extract_executor()
+
+
+# we create the ASGI for the app
+# (le lifespan doit être porté par l'app racine : Starlette ne l'exécute pas pour les apps montées)
+app = FastAPI(exception_handlers=exception_handlers, openapi_url="", lifespan=lifespan)
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+#app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 
 # we create the Web API framework
@@ -0,0 +1,68 @@
+"""Exécution des transformations (pandas, xlsxwriter) hors de la boucle d'événements."""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional
+
+import src.config as config
+
+logger = logging.getLogger(__name__)
+
+_extract_executor: Optional[Executor] = None
+
+
+def get_extract_executor() -> Executor:
+    """Exécuteur partagé des transformations (créé au premier appel)."""
+    global _extract_executor
+    if _extract_executor is None:
+        if config.EXTRACT_EXECUTOR == "process":
+            # spawn : le serveur a des threads actifs, un fork pourrait hériter de verrous pris
+            _extract_executor = ProcessPoolExecutor(
+                max_workers=config.EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        elif config.EXTRACT_EXECUTOR == "thread":
+            _extract_executor = ThreadPoolExecutor(
+                max_workers=config.EXTRACT_WORKERS, thread_name_prefix="extract"
+            )
+        else:
+            raise Exception(f"Exécuteur d'extraction inconnu : {config.EXTRACT_EXECUTOR}")
+    return _extract_executor
+
+
+async def run_extract(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Exécute une transformation dans l'exécuteur partagé.
+
+    Avec l'exécuteur "process", la fonction doit être définie au niveau d'un
+    module et ses arguments et résultat doivent pouvoir être picklés.
+
+    Args:
+        func: Fonction de transformation (synchrone)
+        args: Arguments de la fonction
+
+    Returns:
+        Résultat de la fonction
+    """
+    global _extract_executor
+    executor = get_extract_executor()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args))
+    except BrokenProcessPool:
+        # Un processus est mort (mémoire...) : le pool est recréé au prochain appel
+        logger.error("Pool de transformation interrompu, il sera recréé")
+        if _extract_executor is executor:
+            _extract_executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+
+
+def close_extract_executor() -> None:
+    """Arrête l'exécuteur partagé (arrêt de l'application)."""
+    global _extract_executor
+    if _extract_executor is not None:
+        _extract_executor.shutdown(wait=False, cancel_futures=True)
+        _extract_executor = None
@@ -1,11 +1,18 @@
 import logging
+import re
+import numpy as np
 import pandas as pd
 import src.modules.extract.parsers.constants as constants
 
 logger = logging.getLogger(__name__)
 
+# Libellés de mesure à raccourcir, les plus longs d'abord
+MESURE_PATTERN = re.compile(
+    "|".join(re.escape(old) for old in sorted(constants.MESURE_REPLACEMENTS, key=len, reverse=True))
+)
 
-async def alts_parsing(df_alts: pd.DataFrame):
+
+def alts_parsing(df_alts: pd.DataFrame):
     """
     Parse et transforme le DataFrame des alternants.
 
@@ -26,35 +33,35 @@ async def alts_parsing(df_alts: pd.DataFrame):
         df_alts[df_alts["mesure"].str.startswith("Embauche PME")].index, inplace=True
     )
 
-    for index, row in df_alts.iterrows():
-        df_alts.at[index, "siret"] = row["employeur"]["siret"]
-        df_alts.at[index, "denominationENT"] = row["employeur"]["denomination"]
-        montantObtenu = 0
-        DSN = False
-
-        for rowDetails in row["details"]:
-            if "montant_aide" in rowDetails and rowDetails["montant_aide"] != "":
-                montantObtenu += float(rowDetails["montant_aide"])
-            if "salaire_brut" in rowDetails:
-                if (
-                    rowDetails["salaire_brut"] == ""
-                    or rowDetails["salaire_brut"] == "0"
-                ):
-                    DSN = True
-        df_alts.at[index, "montantAideObtenu"] = montantObtenu
-        if DSN:
-            df_alts.at[index, "AnomalieDSN"] = "X"
-        else:
-            df_alts.at[index, "AnomalieDSN"] = ""
-
-    # Remplacer les valeurs dans la colonne mesure si elle existe
-    for old_value, new_value in constants.MESURE_REPLACEMENTS.items():
-        df_alts["mesure"] = df_alts["mesure"].str.replace(old_value, new_value)
+    df_alts["siret"] = df_alts["employeur"].str.get("siret")
+    df_alts["denominationENT"] = df_alts["employeur"].str.get("denomination")
+
+    # Une ligne par détail (paiement mensuel), rattachée à l'alternant par l'index
+    details = df_alts["details"].explode().dropna()
+    df_details = pd.DataFrame(
+        details.tolist(), index=details.index, columns=["montant_aide", "salaire_brut"]
+    )
+
+    montant_aide = df_details["montant_aide"]
+    montant_aide = montant_aide[montant_aide.notna() & (montant_aide != "")].astype(float)
+    df_alts["montantAideObtenu"] = (
+        montant_aide.groupby(level=0).sum().reindex(df_alts.index, fill_value=0.0)
+    )
+
+    # Salaire brut vide ou nul sur au moins un mois : anomalie DSN
+    anomalie = df_details["salaire_brut"].isin(["", "0"])
+    anomalie = anomalie.groupby(level=0).any().reindex(df_alts.index, fill_value=False)
+    df_alts["AnomalieDSN"] = np.where(anomalie, "X", "")
+
+    # Remplacer les valeurs dans la colonne mesure en une seule passe
+    df_alts["mesure"] = df_alts["mesure"].str.replace(
+        MESURE_PATTERN, lambda match: constants.MESURE_REPLACEMENTS[match.group(0)], regex=True
+    )
 
     df_alts["montantAideObtenu"] = df_alts["montantAideObtenu"].astype(float)
 
-    df_alts["Millésime"] = df_alts["dateDebut"].apply(lambda x: x.split("/")[-1])
-    df_alts["AnnéePaiement"] = df_alts["dateDebut"].apply(lambda x: x.split("/")[-1])
+    df_alts["Millésime"] = df_alts["dateDebut"].str.rsplit("/", n=1).str[-1]
+    df_alts["AnnéePaiement"] = df_alts["Millésime"]
 
     df_alts = df_alts.drop(["employeur"], axis=1)
     # df_alts = df_alts.drop(['details'], axis=1)
@@ -1,88 +1,327 @@
+import hashlib
+import json
+import logging
+import multiprocessing
 import re
 import pandas as pd
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from pypdf import PdfReader
+try:
+    import pymupdf
+except ImportError:  # PyMuPDF absent : seul le backend pypdf est disponible
+    pymupdf = None
 
+import src.config as config
 import src.modules.extract.parsers.constants as constants
 import src.modules.extract.parsers.utils as utils
+from src.modules.storage.blobs.blobs import file_sha256
+from src.modules.storage.blobs.manifest import get_manifest, resolve_pdf_path
+from src.modules.storage.pdf_cache.pdf_cache import get_parsed_pdfs, save_parsed_pdfs
 
+logger = logging.getLogger(__name__)
 
-def alternants_extract_pdf():
-    ents = utils.get_last_stored_json(constants.ENTREPRISE_FOLDER)
-    #data = []
+PDF_TEXT_BACKENDS = ("pypdf", "pymupdf")
+
+# Un PDF à analyser : (chemin du fichier, SIRET de l'entreprise, AVP)
+PdfTask = Tuple[str, str, Dict]
+# Un alternant lu dans un PDF : [nom, numéro de dossier, [[type, date, montant, texte], ...]]
+ParsedAlternant = List
+
+
+# Motifs de constants.py compilés une seule fois
+_NOM_DOSSIER = re.compile(constants.REGEX_PATTERN_NOM_DOSSIER, re.IGNORECASE)
+_PAIEMENT = re.compile(constants.REGEX_DETECT_PAIEMENT, re.IGNORECASE)
+_ACOMPTE = re.compile(constants.REGEX_DETECT_ACOMPTE, re.IGNORECASE)
+_REGULARISATION = re.compile(constants.REGEX_DETECT_REGULARISATION, re.IGNORECASE)
+_DATE = re.compile(constants.CAPTURE_DATE, re.IGNORECASE)
+_MONTANT = re.compile(constants.CAPTURE_MONTANT, re.IGNORECASE)
+_IGNORED = re.compile("|".join(re.escape(words) for words in constants.IGNOREDLINES))
+
+LINE_NOM = "nom"
+LINE_PAIEMENT = "paiement"
+LINE_REGULARISATION = "regularisation"
+LINE_IGNORED = "ignored"
+
+
+def _amount_captures(line: str) -> Tuple[str, str]:
+    return _DATE.search(line).group(1), _MONTANT.search(line).group(0)
+
+
+def classify_line(line: str) -> Tuple[Optional[str], Optional[Tuple[str, str]]]:
+    """
+    Classe une ligne d'AVP et capture ses valeurs en une passe.
+
+    Chaque motif n'est essayé que si la ligne contient son mot-clé (DOSSIER)
+    ou commence par son préfixe (PAIEMENT, ACOMPTE, REGUL) : la plupart des
+    lignes ne passent que par ces tests de chaînes. L'ordre de priorité est
+    celui de l'analyse : alternant, paiement / acompte, régularisation, ligne
+    ignorée.
+
+    Returns:
+        (LINE_NOM, (nom, dossier)), (LINE_PAIEMENT | LINE_REGULARISATION, (date, montant)),
+        (LINE_IGNORED, None), ou (None, None) pour une ligne inconnue
+    """
+    upper = line.upper()
+    if "DOSSIER" in upper:
+        match = _NOM_DOSSIER.search(line)
+        if match:
+            return LINE_NOM, match.groups()
+    if (upper.startswith("PAIEMENT ") and _PAIEMENT.match(line)) \
+            or (upper.startswith("ACOMPTE ") and _ACOMPTE.match(line)):
+        return LINE_PAIEMENT, _amount_captures(line)
+    if upper.startswith("REGUL") and _REGULARISATION.match(line):
+        return LINE_REGULARISATION, _amount_captures(line)
+    if _IGNORED.search(line):
+        return LINE_IGNORED, None
+    return None, None
+
+
+class _MuPdfPage:
+    """Page PyMuPDF exposant extract_text() comme une page pypdf."""
+
+    def __init__(self, page):
+        self._page = page
+
+    def extract_text(self) -> str:
+        return self._page.get_text()
+
+
+def iter_pdf_lines(avp_file: str, backend: str) -> Iterator[str]:
+    """
+    Lignes utiles d'un AVP (hors en-têtes et pieds de page), page par page.
+
+    Args:
+        avp_file: Chemin du PDF
+        backend: "pypdf" ou "pymupdf" (plus rapide)
+    """
+    if backend == "pymupdf":
+        if pymupdf is None:
+            raise Exception("PyMuPDF n'est pas installé")
+        with pymupdf.open(avp_file) as document:
+            pages = (_MuPdfPage(page) for page in document)
+            yield from utils.iter_pages_lines(
+                pages, constants.FIN_HEADER, constants.DEBUT_FOOTER, constants.LOG_FILE, avp_file, constants.SEPARATOR
+            )
+        return
+    reader = PdfReader(avp_file)
+    yield from utils.iter_pages_lines(
+        reader.pages, constants.FIN_HEADER, constants.DEBUT_FOOTER, constants.LOG_FILE, avp_file, constants.SEPARATOR
+    )
+
+
+def iter_avp_alternants(avp_file: str, backend: str = "pypdf") -> Iterator[ParsedAlternant]:
+    """
+    Alternants et paiements d'un AVP, produits au fil de la lecture des pages.
+
+    Un alternant est produit dès que la ligne de l'alternant suivant (ou la
+    fin du document) est atteinte.
+
+    Yields:
+        [nom, numéro de dossier, paiements] pour chaque alternant ayant des paiements
+    """
+    alternant = []
+    paiements = []
+
+    def flush():
+        if alternant != [] and paiements == []:
+            utils.logjson(constants.LOG_FILE, "fichier bizarre : " + avp_file + "\n" + str(alternant))
+        return [alternant[0], alternant[1], paiements] if alternant != [] and paiements != [] else None
+
+    for line in iter_pdf_lines(avp_file, backend):
+        kind, captures = classify_line(line)
+        if kind == LINE_NOM:
+            parsed = flush()
+            if parsed is not None:
+                yield parsed
+            nom_prenom, numero_dossier = captures
+            alternant = [nom_prenom.strip(), numero_dossier.replace(" ", "")]
+            paiements = []
+        elif kind == LINE_PAIEMENT:
+            date, montant = captures
+            paiements.append(["paiement",date,float(montant.replace(" ","").replace(",",".")),line])
+        elif kind == LINE_REGULARISATION:
+            date, montant = captures
+            paiements.append(["regularisation",date,float("-" + montant.replace(" ","").replace(",",".")),line])
+        elif kind is None:
+            print(line, avp_file)
+    parsed = flush()
+    if parsed is not None:
+        yield parsed
+
+
+def parse_avp_pdf(avp_file: str, backend: str = "pypdf") -> List[ParsedAlternant]:
+    """
+    Extrait les alternants et leurs paiements d'un AVP.
+
+    Le résultat ne dépend que du contenu du PDF (il peut être mis en cache).
+    Fonction de niveau module : elle est exécutée dans les processus du pool.
+
+    Args:
+        avp_file: Chemin du PDF
+        backend: Extraction du texte ("pypdf" ou "pymupdf")
+
+    Returns:
+        [nom, numéro de dossier, paiements] pour chaque alternant ayant des paiements
+    """
+    return list(iter_avp_alternants(avp_file, backend))
+
+
+def build_rows(parsed: List[ParsedAlternant], siret: str, avp: Dict) -> List[Dict]:
+    """Lignes de paiement d'un AVP à partir de son analyse (voir parse_avp_pdf)."""
     alts = []
+    paiements_dict = {}
+    for nom, num_dossier, paiements in parsed:
+        for paiement in paiements:
+            paiements_dict["nom"] = nom
+            paiements_dict["num_dossier"] = num_dossier
+            paiements_dict["siret_ent"] = siret
+            paiements_dict["type_versement"] = paiement[0]
+            paiements_dict["montant"] = paiement[2]
+            paiements_dict["date"] = paiement[1]
+            paiements_dict["texte"] = paiement[3]
+            if 'delta' in avp and avp['delta'] == True :
+                paiements_dict["fichierPDF"] = "=HYPERLINK(\"data/" + siret + '/' + str(avp[constants.CHAMP_ID_AVP]) + '.pdf")'
+            else :
+                paiements_dict["fichierPDF"] = "=HYPERLINK(\"delta/" + siret + '/' + str(avp[constants.CHAMP_ID_AVP]) + '.pdf")'
+            alts.append(paiements_dict)
+    return alts
+
+
+def parser_version(backend: str) -> str:
+    """
+    Version de l'analyse, clé du cache avec l'empreinte du PDF.
+
+    Elle change avec PDF_PARSER_VERSION, avec les motifs et listes de
+    constants.py utilisés par l'analyse, et avec le backend d'extraction.
+    """
+    rules = [
+        constants.REGEX_PATTERN_NOM_DOSSIER, constants.REGEX_DETECT_PAIEMENT,
+        constants.REGEX_DETECT_ACOMPTE, constants.REGEX_DETECT_REGULARISATION,
+        constants.CAPTURE_DATE, constants.CAPTURE_MONTANT, constants.SEPARATOR,
+        constants.FIN_HEADER, constants.DEBUT_FOOTER, constants.IGNOREDLINES,
+    ]
+    fingerprint = hashlib.sha256(json.dumps(rules).encode("utf-8")).hexdigest()[:12]
+    return f"{constants.PDF_PARSER_VERSION}-{backend}-{fingerprint}"
 
+
+def pdf_tasks() -> List[PdfTask]:
+    """Liste des AVPs à analyser, d'après les dernières sauvegardes d'entreprises et d'AVPs."""
+    ents = utils.get_last_stored_json(constants.ENTREPRISE_FOLDER)
+    tasks = []
     for ent in ents:
-        
-        save_path_avps = f"{constants.AVPS_FOLDER}/{ent[constants.CHAMP_SIRET_ENT]}"
-        delta_save_path_avps = f"{constants.AVPS_DELTA_FOLDER}/{ent[constants.CHAMP_SIRET_ENT]}"
-        
+        siret = ent[constants.CHAMP_SIRET_ENT]
+        save_path_avps = f"{constants.AVPS_FOLDER}/{siret}"
         avps = utils.get_last_stored_json(save_path_avps)
-        
+        manifest = get_manifest(siret)
         for avp in avps:
-            if 'delta' in avp and avp['delta'] == True :
-                avp_file = delta_save_path_avps + '/' + str(avp[constants.CHAMP_ID_AVP]) + ".pdf"
-            else:
-                avp_file = save_path_avps + '/' + str(avp[constants.CHAMP_ID_AVP]) + ".pdf"
-            reader = PdfReader(avp_file)
-            pages = reader.pages
-            raw = utils.parse_pages(
-                pages,
-                constants.FIN_HEADER,
-                constants.DEBUT_FOOTER,
-                constants.LOG_FILE,
-                avp_file
-                )  
-            raw = raw.split(constants.SEPARATOR)
-            raw = utils.eliminatespaces(raw)
-            ignored_line = constants.IGNOREDLINES
-            alternant = []
-            paiements = []
-            paiements_dict = {}
-            for line in raw :
-                find_nom = re.findall(constants.REGEX_PATTERN_NOM_DOSSIER, line, re.IGNORECASE)
-                find_paiement = re.findall(constants.REGEX_DETECT_PAIEMENT,line, re.IGNORECASE)
-                find_acompte = re.findall(constants.REGEX_DETECT_ACOMPTE,line, re.IGNORECASE)
-                find_regularisation = re.findall(constants.REGEX_DETECT_REGULARISATION,line, re.IGNORECASE)
-                if find_nom:
-                    if alternant != []:
-                        if paiements == []:
-                            utils.logjson(constants.LOG_FILE,"fichier bizarre : " + avp_file + "\n" + str(raw))
-                        else :
-                            for paiement in paiements:
-                                paiements_dict["nom"] = alternant[0]
-                                paiements_dict["num_dossier"] = alternant[1]
-                                paiements_dict["siret_ent"] = alternant[2]
-                                paiements_dict["type_versement"] = paiement[0]
-                                paiements_dict["montant"] = paiement[2]
-                                paiements_dict["date"] = paiement[1]
-                                paiements_dict["texte"] = paiement[3]
-                                if 'delta' in avp and avp['delta'] == True :
-                                    paiements_dict["fichierPDF"] = "=HYPERLINK(\"data/" + alternant[2] + '/' + str(avp[constants.CHAMP_ID_AVP]) + '.pdf")'
-                                else :
-                                    paiements_dict["fichierPDF"] = "=HYPERLINK(\"delta/" + alternant[2] + '/' + str(avp[constants.CHAMP_ID_AVP]) + '.pdf")'
-                                alts.append(paiements_dict)
-                            paiements = []
-                    nom_prenom, numero_dossier = find_nom[0]
-                    numero_dossier = numero_dossier.replace(" ", "")
-                    alternant = [nom_prenom.strip(), numero_dossier, ent[constants.CHAMP_SIRET_ENT], avp_file]
-                else: 
-                    if find_paiement or find_acompte:
-                        date = re.findall(constants.CAPTURE_DATE,line, re.IGNORECASE)[0]
-                        montant = float(re.findall(constants.CAPTURE_MONTANT,line, re.IGNORECASE)[0].replace(" ","").replace(",","."))
-                        paiements.append(["paiement",date,montant,line])    
-                    elif  find_regularisation:
-                        date = re.findall(constants.CAPTURE_DATE,line, re.IGNORECASE)[0]
-                        montant = float("-" + re.findall(constants.CAPTURE_MONTANT,line, re.IGNORECASE)[0].replace(" ","").replace(",","."))
-                        paiements.append(["regularisation",date,montant,line])
-                        #print("regularisation",date,montant)
-                    elif any(words in line for words in ignored_line):
-                        pass
-                    else:
-                        print(line, avp_file)
-            #print(raw)
-            #data.append(raw)
+            avp_file = resolve_pdf_path(siret, avp[constants.CHAMP_ID_AVP], manifest) \
+                or save_path_avps + '/' + str(avp[constants.CHAMP_ID_AVP]) + ".pdf"
+            tasks.append((avp_file, siret, avp))
+    return tasks
+
+
+def _pdf_key(avp_file: str) -> Optional[str]:
+    """Empreinte du PDF (None si le fichier est illisible : l'analyse signalera l'erreur)."""
+    try:
+        return file_sha256(avp_file)
+    except OSError:
+        return None
+
+
+def _log_progress(done: int, total: int) -> None:
+    if done == total or done % max(1, total // 20) == 0:
+        logger.info(f"Analyse des PDFs : {done}/{total}")
+
+
+def parse_pdfs(
+    tasks: List[PdfTask],
+    workers: Optional[int] = None,
+    backend: Optional[str] = None,
+    on_progress: Optional[Callable[[int, int], None]] = _log_progress,
+) -> Tuple[List[Dict], Dict[str, str]]:
+    """
+    Analyse des AVPs en parallèle dans un pool de processus.
+
+    Les PDFs déjà analysés (même contenu, même version d'analyse) sont repris
+    du cache sans être rouverts. Un PDF illisible n'interrompt pas l'analyse :
+    il est signalé dans les erreurs.
+
+    Args:
+        tasks: AVPs à analyser (voir pdf_tasks)
+        workers: Nombre de processus (PDF_PARSE_WORKERS, sinon nombre de cœurs) ;
+                 1 pour tout analyser dans le processus courant
+        backend: Extraction du texte (PDF_TEXT_BACKEND par défaut)
+        on_progress: Appelée avec (PDFs traités, PDFs à analyser) après chaque PDF
+
+    Returns:
+        Tuple (lignes de paiement dans l'ordre des AVPs, erreurs par fichier)
+    """
+    backend = backend or config.PDF_TEXT_BACKEND
+    if backend not in PDF_TEXT_BACKENDS:
+        raise Exception(f"Backend d'extraction PDF inconnu : {backend}")
+
+    version = parser_version(backend)
+    keys = [_pdf_key(avp_file) for avp_file, _, _ in tasks]
+    cached = get_parsed_pdfs({key for key in keys if key is not None}, version)
+    parsed: List[Optional[List[ParsedAlternant]]] = [cached.get(key) for key in keys]
+    pending = [index for index, entry in enumerate(parsed) if entry is None]
+    if cached:
+        logger.info(f"{len(tasks) - len(pending)} PDF(s) déjà analysés, {len(pending)} à analyser")
+
+    workers = workers or config.PDF_PARSE_WORKERS or os.cpu_count() or 1
+    workers = min(workers, max(1, len(pending)))
+    errors: Dict[str, str] = {}
+    fresh: Dict[str, List[ParsedAlternant]] = {}
+    done = 0
+
+    def collect(index: int, entry: Optional[List[ParsedAlternant]], error: Optional[BaseException]) -> None:
+        nonlocal done
+        avp_file = tasks[index][0]
+        if error is not None:
+            errors[avp_file] = f"{type(error).__name__}: {error}"
+            logger.error(f"Échec de l'analyse du PDF {avp_file} : {error}")
+            utils.logjson(constants.LOG_FILE, "erreur d'analyse : " + avp_file + " : " + str(error))
+        else:
+            parsed[index] = entry
+            if keys[index] is not None:
+                fresh[keys[index]] = entry
+        done += 1
+        if on_progress is not None:
+            on_progress(done, len(pending))
+
+    if workers == 1:
+        for index in pending:
+            try:
+                collect(index, parse_avp_pdf(tasks[index][0], backend), None)
+            except Exception as e:
+                collect(index, None, e)
+    elif pending:
+        # spawn : le serveur a des threads actifs, un fork pourrait hériter de verrous pris
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {executor.submit(parse_avp_pdf, tasks[index][0], backend): index for index in pending}
+            for future in as_completed(futures):
+                error = future.exception()
+                collect(futures[future], None if error else future.result(), error)
+
+    if fresh:
+        save_parsed_pdfs(fresh, version)
+
+    rows = [
+        row
+        for (_, siret, avp), entry in zip(tasks, parsed)
+        if entry is not None
+        for row in build_rows(entry, siret, avp)
+    ]
+    if errors:
+        logger.warning(f"{len(errors)} PDF(s) sur {len(tasks)} n'ont pas pu être analysés")
+    return rows, errors
+
+
+def alternants_extract_pdf(workers: Optional[int] = None, backend: Optional[str] = None):
+    alts, _ = parse_pdfs(pdf_tasks(), workers, backend)
     # createjson(config.path_data_json,data)
     df_alts = pd.DataFrame()
     df_alts = pd.concat([df_alts,pd.DataFrame.from_dict(alts)], ignore_index= True)
-    return df_alts
\ No newline at end of file
+    return df_alts
@@ -2,7 +2,7 @@ import pandas as pd
 
 from src.modules.extract.parsers.utils import add_SEPHORA
 
-async def avps_parsing(df_avps : pd.DataFrame):  
+def avps_parsing(df_avps : pd.DataFrame):  
 
     # Supprimer la colonne rib si elle existe
     if "rib" in df_avps.columns:
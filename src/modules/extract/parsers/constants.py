@@ -20,6 +20,10 @@ AVPS_FOLDER = "data/sylae/avps"
 AVPS_DELTA_FOLDER = "data/sylae/avps_delta"
 EXCEL_FOLDER = "data/sylae/excel"
 STAT_FOLDER = "data/sylae/stats"
+BLOBS_FOLDER = "data/sylae/blobs"
+MANIFEST_FOLDER = "data/sylae/manifest"
+CATALOG_FILE = "data/sylae/catalog.sqlite3"
+PDF_CACHE_FILE = "data/sylae/pdf_cache.sqlite3"
 
 PATH_DATA_JSON = "data.json"
 PATH_FINAL_JSON = "alts.json"
@@ -32,6 +36,8 @@ CHAMP_ID_AVP = "id"
 
 
 ## Parsing data
+# À incrémenter quand la logique d'analyse des PDFs change (invalide le cache des PDFs analysés)
+PDF_PARSER_VERSION = 2
 SEPARATOR = "\n"
 
 FIN_HEADER = ["PAYE"]
@@ -3,7 +3,7 @@ import pandas as pd
 import src.modules.extract.parsers.constants as constants
 
 
-async def entreprise_parsing(entreprises_dict : dict):  
+def entreprise_parsing(entreprises_dict : dict):  
     df_ent = pd.DataFrame.from_dict(entreprises_dict)
     # Ne supprimer que les colonnes qui existent
     columns_to_drop = [col for col in constants.IGNORED_COLUMNS_ENT if col in df_ent.columns]
@@ -1,18 +1,16 @@
+import datetime
 import json
 import os
+from typing import Iterable, Iterator, List, Tuple
 
 import pandas as pd
+import xlsxwriter
+
+from src.modules.storage.snapshots.snapshots import load_latest_snapshot
 
 # Alternant PDF
 def get_last_stored_json(path):
-    list_of_files = list(map(lambda x : path + "/" + x , os.listdir(path)))
-    list_of_jsons = [x for x in list_of_files if x[-5:] == ".json"]
-    if os.listdir(path) != []:
-        last_file = max(list_of_jsons, key=os.path.getctime)
-        with open(last_file,'r') as fr :
-            content = fr.read()
-            fr.close()
-            return json.loads(content)
+    return load_latest_snapshot(path)
         
 def createjson(path,data):
     with open(path, 'w') as f:
@@ -27,50 +25,42 @@ def eliminatespaces(dict):
     dict = [x.strip() for x in dict if x.isspace() == False]
     return dict
 
-def parse_pages(pages,header_end,footer_begin,logsfile,message):
-    index_he = 0
-    index_fb = -1
-    for n in range(len(pages)):
-        x = pages[n].extract_text()
+def iter_pages_lines(pages, header_end, footer_begin, logsfile, message, separator="\n"):
+    """
+    Lignes utiles d'un document, page par page.
+
+    Sur chaque page, le texte est pris après le premier marqueur de fin
+    d'en-tête et avant le premier marqueur de début de pied de page ; les
+    lignes vides sont ignorées et les autres nettoyées. Seule la page en
+    cours est gardée en mémoire.
+    """
+    for n, page in enumerate(pages):
+        # Une page illisible fait échouer tout le fichier (signalé, et pas mis en cache)
+        x = page.extract_text()
+        start = 0
         have_he = False
+        for he in header_end:
+            index_he = x.find(he)
+            if index_he != -1:
+                start = index_he + len(he)
+                have_he = True
+                break
+        end = len(x)
         have_fb = False
-        try :
-            if n == 0: 
-                for he in header_end:
-                    if he in x : 
-                        index_he = x.index(he)
-                        raw = x[index_he+len(he):]
-                        have_he = True
-                        break
-                if not have_he :
-                    logjson(logsfile,"headers not found : " + message)
-                    raw = x
-                for fb in footer_begin:
-                    if fb in raw : 
-                        index_fb = raw.index(fb)
-                        raw = raw[:index_fb]
-                        have_fb = True
-                        break
-                if not have_fb :
-                    logjson(logsfile,"footers not found : " + message)
-            else:
-                for he in header_end:
-                    if he in x : 
-                        index_he = x.index(he)
-                        raw = x[index_he+len(he):]
-                        have_he = True
-                        break
-                
-                for fb in footer_begin:
-                    if fb in raw : 
-                        index_fb = raw.index(fb)
-                        raw = raw[:index_fb]
-                        have_fb = True
-                        break
-                raw = x[index_he+len(he):index_fb]
-        except Exception as ex:
-            logjson(logsfile,message)
-    return raw
+        for fb in footer_begin:
+            index_fb = x.find(fb, start)
+            if index_fb != -1:
+                end = index_fb
+                have_fb = True
+                break
+        if n == 0:
+            if not have_he:
+                logjson(logsfile, "headers not found : " + message)
+            if not have_fb:
+                logjson(logsfile, "footers not found : " + message)
+        for line in x[start:end].split(separator):
+            if line and not line.isspace():
+                yield line.strip()
 
 
 # AVP
@@ -85,15 +75,106 @@ def add_SEPHORA(champ):
 
 
 # Common
-def save_excel(writer, df: pd.DataFrame, sheet):
-    df.to_excel(writer, sheet_name=sheet, startrow=1, header=False, index=False)
-    worksheet = writer.sheets[sheet]
+EXCEL_COLUMN_WIDTH = 25
+EXCEL_DATETIME_FORMAT = "yyyy-mm-dd hh:mm:ss"
+
+
+def _excel_value(value):
+    """Valeur d'une cellule, convertie comme le ferait DataFrame.to_excel."""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return None if isinstance(value, float) and value != value else value
+    if isinstance(value, (list, dict, tuple, set)):
+        return str(value)
+    if value is pd.NaT or (pd.api.types.is_scalar(value) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if hasattr(value, "item"):
+        # Scalaires numpy
+        return value.item()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value
+    return str(value)
+
+
+def frame_rows(df: pd.DataFrame) -> Iterator[tuple]:
+    """Lignes d'un DataFrame, dans l'ordre de ses colonnes."""
+    return df.itertuples(index=False, name=None)
+
+
+def open_workbook(output) -> xlsxwriter.Workbook:
+    """
+    Classeur Excel écrit ligne par ligne (mode constant_memory).
+
+    Chaque ligne est vidée sur disque dès que la suivante est commencée :
+    la mémoire ne dépend pas du nombre de lignes.
+
+    Args:
+        output: Chemin du fichier ou objet fichier binaire (fichier ouvert,
+                fichier temporaire, BytesIO...)
+    """
+    return xlsxwriter.Workbook(output, {"constant_memory": True})
+
+
+def write_sheet(workbook: xlsxwriter.Workbook, sheet: str, columns: List[str], rows: Iterable[Iterable]) -> int:
+    """
+    Écrit une feuille : ligne d'en-tête avec filtres puis données.
+
+    Les lignes sont consommées une à une, elles peuvent venir d'un générateur.
+
+    Args:
+        workbook: Classeur ouvert par open_workbook
+        sheet: Nom de la feuille
+        columns: En-têtes des colonnes
+        rows: Lignes de valeurs, dans l'ordre des colonnes
+
+    Returns:
+        Nombre de lignes de données écrites
+    """
+    worksheet = workbook.add_worksheet(sheet)
+    header_format = workbook.add_format({"bold": True})
+    datetime_format = workbook.add_format({"num_format": EXCEL_DATETIME_FORMAT})
+
+    if columns:
+        worksheet.set_column(0, len(columns) - 1, EXCEL_COLUMN_WIDTH)
+    worksheet.write_row(0, 0, columns, header_format)
+    worksheet.freeze_panes(1, 0)
+
+    count = 0
+    for count, row in enumerate(rows, 1):
+        for col, value in enumerate(row):
+            value = _excel_value(value)
+            if value is None:
+                continue
+            if isinstance(value, (datetime.date, datetime.time)):
+                worksheet.write_datetime(count, col, value, datetime_format)
+            else:
+                worksheet.write(count, col, value)
+
+    if columns:
+        worksheet.autofilter(0, 0, count, len(columns) - 1)
+    return count
+
+
+def save_excel(workbook: xlsxwriter.Workbook, df: pd.DataFrame, sheet):
+    """Écrit un DataFrame dans une feuille du classeur (voir write_sheet)."""
+    write_sheet(workbook, sheet, [str(column) for column in df.columns], frame_rows(df))
+
 
-    (max_row, max_col) = df.shape
-    column_settings = [{"header": column} for column in df.columns]
-    worksheet.add_table(0, 0, max_row, max_col - 1, {"columns": column_settings})
+def write_excel(output, frames: Iterable[Tuple[str, pd.DataFrame]]) -> None:
+    """
+    Écrit un classeur complet, une feuille par DataFrame.
 
-    worksheet.set_column(0, max_col - 1, 25)
+    Args:
+        output: Chemin du fichier ou objet fichier binaire
+        frames: (nom de la feuille, DataFrame) dans l'ordre des feuilles
+    """
+    workbook = open_workbook(output)
+    try:
+        for sheet, df in frames:
+            save_excel(workbook, df, sheet)
+    finally:
+        workbook.close()
 
 
 def delete_all_jsonfiles(path):
@@ -4,37 +4,33 @@ import asyncio
 import os
 
 from src.modules.storage.common import VerifyIfDirExist
+from src.modules.extract.executor import run_extract
 from src.modules.extract.parsers.alternantsJSON import alts_parsing
-from src.modules.storage.alternants.alternants import get_stored_alts
+from src.modules.storage.alternants.alternants import get_stored_alts_frame
 from src.modules.extract.parsers.alternantsPDF import alternants_extract_pdf
 from src.modules.extract.parsers.avisdepaiement import avps_parsing
 from src.modules.extract.parsers.entreprises import entreprise_parsing
 from src.modules.extract.parsers.utils import (
     delete_all_emptyfolders,
-    save_excel,
+    write_excel,
 )
 
-from src.modules.storage.avps.avps import get_stored_avps
+from src.modules.storage.avps.avps import get_stored_avps_frames
+from src.modules.storage.blobs.manifest import materialise_pdfs
 
 
 async def ents_extract(entreprises_dict: dict):
-    df_ent = entreprise_parsing(entreprises_dict)
-    return await df_ent
+    return await run_extract(entreprise_parsing, entreprises_dict)
 
 
 async def avp_extract(entreprises_dict: dict):
-    df_avps = pd.DataFrame()
-    for entreprise in entreprises_dict:
-        avps_dict = await get_stored_avps(entreprise["siret"])
-        df_avps = pd.concat(
-            [df_avps, pd.DataFrame.from_dict(avps_dict)], ignore_index=True
-        )
+    # Sauvegardes lues en parallèle, DataFrame construit en une seule passe
+    df_avps = await get_stored_avps_frames([entreprise["siret"] for entreprise in entreprises_dict])
 
     if df_avps.empty:
         return df_avps
     
-    df_avps = avps_parsing(df_avps)
-    return await df_avps
+    return await run_extract(avps_parsing, df_avps)
 
 
 async def export_xlsx_pdfs(
@@ -56,19 +52,23 @@ async def export_xlsx_pdfs(
     if os.path.exists(f"{excel_base_dir}/output.xlsx"):
         os.remove(f"{excel_base_dir}/output.xlsx")
 
-    with pd.ExcelWriter(f"{excel_base_dir}/output.xlsx", engine="xlsxwriter") as writer:
-        save_excel(writer, df_avps, "AVPs")
-        save_excel(writer, df_ent, "Entreprises")
-        save_excel(writer, df_alts, "Alternants")
+    # Écriture ligne par ligne, dans un thread : la boucle d'événements reste disponible
+    await asyncio.to_thread(
+        write_excel,
+        f"{excel_base_dir}/output.xlsx",
+        [("AVPs", df_avps), ("Entreprises", df_ent), ("Alternants", df_alts)],
+    )
 
-    await asyncio.gather(
-        asyncio.to_thread(
+    # Liens physiques vers les blobs du manifeste : aucun PDF n'est recopié
+    await asyncio.to_thread(materialise_pdfs, f"{excel_base_dir}/delta")
+    # PDFs pas encore repris dans le manifeste (ancienne arborescence)
+    if os.path.exists("data/sylae/avps_delta"):
+        await asyncio.to_thread(
             shutil.copytree,
             "data/sylae/avps_delta",
             f"{excel_base_dir}/delta",
             dirs_exist_ok=True,
-        ),
-    )
+        )
     # Nettoyage en parallèle
     await asyncio.gather(
         asyncio.to_thread(delete_all_emptyfolders, f"{excel_base_dir}/delta"),
@@ -76,7 +76,8 @@ async def export_xlsx_pdfs(
 
 
 async def altsPDF_extract():
-    df_alts = alternants_extract_pdf()
+    # Analyse des PDFs dans un pool de processus, hors de la boucle d'événements
+    df_alts = await asyncio.to_thread(alternants_extract_pdf)
     return df_alts
 
 
@@ -85,8 +86,7 @@ async def altsJSON_extract(entreprises_dict: dict):
     dfs = []
     for entreprise in entreprises_dict:
         if await VerifyIfDirExist("data/sylae/alternants/" + entreprise["siret"]):
-            alts_dict = await get_stored_alts(entreprise["siret"])
-            dfs.append(pd.DataFrame.from_dict(alts_dict))
+            dfs.append(await get_stored_alts_frame(entreprise["siret"]))
 
     # Concaténer une seule fois à la fin
     if dfs:
@@ -95,7 +95,7 @@ async def altsJSON_extract(entreprises_dict: dict):
         if(df_alts.empty):
             return pd.DataFrame()
         
-        df_alts = await alts_parsing(df_alts)
+        df_alts = await run_extract(alts_parsing, df_alts)
         return df_alts
     
     return pd.DataFrame()
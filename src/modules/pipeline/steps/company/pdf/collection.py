@@ -32,10 +32,11 @@ async def collect_company_pdfs(
         avps: Liste des AVPs à télécharger
 
     Returns:
-        Dictionnaire des PDFs collectés avec leur statut delta
+        Dictionnaire des PDFs collectés avec leur statut delta ; les AVPs
+        dont le PDF n'a pas pu être téléchargé en sont absents
         Format: {
             'delta/siret/avp_id.pdf': {  # Pour les nouveaux AVPs
-                'content': bytes_content,
+                'content': bytes_content,  # ou 'path' vers le spool (SYLAE_PDF_SPOOL)
                 'delta': True
             },
             'data/siret/avp_id.pdf': {   # Pour les AVPs existants
@@ -50,7 +51,7 @@ async def collect_company_pdfs(
             return {}
 
         logger.info(f"Téléchargement des PDFs pour {siret}...")
-        pdfs = await download_avps_pdfs_memory(
+        pdfs, failed_ids = await download_avps_pdfs_memory(
             username=username,
             password=password,
             empId=entreprise["empId"],
@@ -68,19 +69,33 @@ async def collect_company_pdfs(
             is_delta = avp.get("delta", False)
             pdf_path = f"{'delta' if is_delta else 'data'}/{siret}/{avp['id']}.pdf"
 
+            # Contenu en mémoire ("content") ou fichier du spool ("path")
             organized_pdfs[pdf_path] = {
-                "content": pdfs[f'{siret}_{avp["id"]}']["content"],
+                **pdfs[f'{siret}_{avp["id"]}'],
                 "delta": is_delta,
             }
 
         logger.info(f"✓ {len(organized_pdfs)} PDFs téléchargés pour {siret}")
+        if failed_ids:
+            # Les PDFs récupérés sont conservés, seuls les AVPs en échec sont signalés
+            error_msg = PIPELINE_ERRORS["PDF_ERROR"].format(
+                f"{siret} - {len(failed_ids)} PDF(s) en échec : {', '.join(failed_ids)}"
+            )
+            logger.error(error_msg)
+            await tracking.log_pipeline_operation(
+                OPERATION_TYPES["PDF_DOWNLOAD"],
+                siret=siret,
+                status=STATUS["ERROR"],
+                error=error_msg,
+                metadata={"siret": siret, "failed_ids": failed_ids},
+            )
         return organized_pdfs
 
     except Exception as e:
         error_msg = PIPELINE_ERRORS["PDF_ERROR"].format(siret, str(e))
         logger.error(error_msg)
         await tracking.log_pipeline_operation(
-            OPERATION_TYPES["PDF_FETCH"],
+            OPERATION_TYPES["PDF_DOWNLOAD"],
             status=STATUS["ERROR"],
             error=error_msg,
             metadata={"siret": siret},
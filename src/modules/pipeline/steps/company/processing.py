@@ -1,9 +1,10 @@
 """Services de traitement des données entreprises."""
 
+import asyncio
 import logging
-from typing import Dict, List, Any
+import tempfile
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
-from io import BytesIO
 
 from src.services.aws.tracking import TrackingService
 from src.services.aws import OPERATION_TYPES, STATUS
@@ -15,19 +16,156 @@ from src.modules.pipeline.steps.company.pdf.collection import collect_company_pd
 from src.modules.pipeline.steps.company.alt.collection import collect_company_alternants
 from src.constants.error_messages import PIPELINE_ERRORS
 from src.constants import Environment
+from src.config import PIPELINE_COMPANY_WORKERS
 
 logger = logging.getLogger(__name__)
 
 
+async def _collect_avps_and_pdfs(
+    siret: str,
+    tracking: TrackingService,
+    environment: Environment,
+    username: str,
+    password: str,
+    entreprise: Dict,
+) -> Tuple[List[Dict], Dict[str, Dict]]:
+    """Collecte les AVPs d'une entreprise puis leurs PDFs (les PDFs dépendent des AVPs)."""
+    avps = await collect_company_avps(
+        siret=siret,
+        tracking=tracking,
+        environment=environment,
+        username=username,
+        password=password,
+        entreprise=entreprise,
+    )
+    pdfs = await collect_company_pdfs(
+        siret=siret,
+        tracking=tracking,
+        username=username,
+        password=password,
+        entreprise=entreprise,
+        avps=avps,
+    )
+    return avps, pdfs
+
+
+async def _process_company(
+    username: str,
+    password: str,
+    entreprise: Dict,
+    tracking: TrackingService,
+    environment: Environment,
+    download_tracker: AVPDownloadTracker,
+) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """
+    Traite une entreprise en isolant ses erreurs.
+
+    La collecte des AVPs (suivie des PDFs) et celle des alternants sont
+    indépendantes et s'exécutent en parallèle.
+
+    Returns:
+        Tuple (statut, données) ; le statut vaut None si l'entreprise est ignorée
+        et les données valent None si rien n'a été collecté
+    """
+    siret = entreprise.get("siret")
+    try:
+        if not siret:
+            logger.warning("SIRET manquant pour une entreprise")
+            return None, None
+
+        # Collecte des données
+        logger.info(f"Traitement de l'entreprise {siret}...")
+        (avps, pdfs), alternants = await asyncio.gather(
+            _collect_avps_and_pdfs(
+                siret, tracking, environment, username, password, entreprise
+            ),
+            collect_company_alternants(
+                siret=siret,
+                tracking=tracking,
+                username=username,
+                password=password,
+                entreprise=entreprise,
+            ),
+        )
+
+        data = None
+        if avps or pdfs or alternants:
+            data = {
+                "entreprise": entreprise,
+                "data": {
+                    "siret": siret,
+                    "avps": avps,
+                    "pdfs": pdfs,
+                    "alternants": alternants,
+                    "processed_at": datetime.now().isoformat(),
+                },
+            }
+            logger.info(f"✓ Données collectées avec succès pour {siret}")
+
+            # Marquer comme téléchargé si succès
+            if data["data"].get("avps"):
+                for avp in data["data"]["avps"]:
+                    # Ne marquer dans DynamoDB que les nouveaux AVPs (delta=True)
+                    # dont le PDF a été récupéré : les autres seront retentés au prochain passage
+                    if (
+                        avp.get("delta", False)
+                        and "id" in avp
+                        and f"delta/{siret}/{avp['id']}.pdf" in (pdfs or {})
+                    ):
+                        await download_tracker.mark_avp_downloaded(
+                            siret=siret,
+                            avp_id=str(avp["id"]),
+                            metadata={
+                                "download_date": datetime.now().isoformat(),
+                                "delta": True,
+                            },
+                        )
+
+        status = {
+            "entreprise": entreprise,
+            "data": {
+                "siret": siret,
+                "status": STATUS["SUCCESS"],
+                "error": None,
+            },
+        }
+        return status, data
+
+    except Exception as e:
+        error_msg = PIPELINE_ERRORS["COMPANY_ERROR"].format(siret, str(e))
+        logger.error(error_msg)
+        await tracking.log_pipeline_operation(
+            OPERATION_TYPES["COMPANY_ERROR"],
+            siret=siret,
+            status=STATUS["ERROR"],
+            error=error_msg,
+            metadata={"siret": siret},
+        )
+        status = {
+            "entreprise": entreprise,
+            "data": {
+                "siret": siret,
+                "status": STATUS["ERROR"],
+                "error": str(e),
+            },
+        }
+        return status, None
+
+
 async def process_companies_and_collect_data(
     username: str,
     password: str,
     entreprises: List[Dict],
     tracking: TrackingService,
     environment: Environment = Environment.DEVELOPMENT,
+    max_workers: Optional[int] = None,
 ) -> List[Dict]:
     """
-    Traite les données pour toutes les entreprises de manière séquentielle.
+    Traite les données pour toutes les entreprises, plusieurs à la fois.
+
+    Le nombre d'entreprises traitées simultanément est borné par un sémaphore.
+    Les erreurs restent isolées par entreprise et les résultats sont rendus
+    dans l'ordre de la liste d'entrée, comme en traitement séquentiel.
 
     Args:
         username: Identifiant pour l'API
@@ -35,6 +173,8 @@ async def process_companies_and_collect_data(
         entreprises: Liste des entreprises à traiter
         tracking: Service de tracking
         environment: Environnement d'exécution
+        max_workers: Nombre d'entreprises traitées en parallèle
+                     (PIPELINE_COMPANY_WORKERS par défaut, 1 = séquentiel)
 
     Returns:
         Liste des données récupérées avec succès
@@ -48,102 +188,26 @@ async def process_companies_and_collect_data(
         # Initialisation du tracker de téléchargement
         download_tracker = AVPDownloadTracker(environment)
 
-        # Traitement séquentiel
-        all_data = []
-        successful_data = []
-
-        for entreprise in entreprises:
-            try:
-                siret = entreprise.get("siret")
-                if not siret:
-                    logger.warning("SIRET manquant pour une entreprise")
-                    continue
-
-                # Collecte des données
-                logger.info(f"Traitement de l'entreprise {siret}...")
-                avps = await collect_company_avps(
-                    siret=siret,
-                    tracking=tracking,
-                    environment=environment,
-                    username=username,
-                    password=password,
-                    entreprise=entreprise,
-                )
-                pdfs = await collect_company_pdfs(
-                    siret=siret,
-                    tracking=tracking,
-                    username=username,
-                    password=password,
-                    entreprise=entreprise,
-                    avps=avps,
-                )
-                alternants = await collect_company_alternants(
-                    siret=siret,
-                    tracking=tracking,
-                    username=username,
-                    password=password,
-                    entreprise=entreprise,
-                )
+        workers = max(1, max_workers or PIPELINE_COMPANY_WORKERS)
+        semaphore = asyncio.Semaphore(workers)
+        logger.info(
+            f"Traitement de {len(entreprises)} entreprises ({workers} en parallèle)"
+        )
 
-                if avps or pdfs or alternants:
-                    data = {
-                        "entreprise": entreprise,
-                        "data": {
-                            "siret": siret,
-                            "avps": avps,
-                            "pdfs": pdfs,
-                            "alternants": alternants,
-                            "processed_at": datetime.now().isoformat(),
-                        },
-                    }
-                    successful_data.append(data)
-                    logger.info(f"✓ Données collectées avec succès pour {siret}")
-
-                    # Marquer comme téléchargé si succès
-                    if data["data"].get("avps"):
-                        for avp in data["data"]["avps"]:
-                            # Ne marquer dans DynamoDB que les nouveaux AVPs (delta=True)
-                            if avp.get("delta", False) and "id" in avp:
-                                await download_tracker.mark_avp_downloaded(
-                                    siret=siret,
-                                    avp_id=str(avp["id"]),
-                                    metadata={
-                                        "download_date": datetime.now().isoformat(),
-                                        "delta": True,
-                                    },
-                                )
-
-                all_data.append(
-                    {
-                        "entreprise": entreprise,
-                        "data": {
-                            "siret": siret,
-                            "status": STATUS["SUCCESS"],
-                            "error": None,
-                        },
-                    }
+        async def bounded(entreprise: Dict) -> Tuple[Optional[Dict], Optional[Dict]]:
+            async with semaphore:
+                return await _process_company(
+                    username, password, entreprise, tracking, environment, download_tracker
                 )
 
-            except Exception as e:
-                error_msg = PIPELINE_ERRORS["COMPANY_ERROR"].format(siret, str(e))
-                logger.error(error_msg)
-                await tracking.log_pipeline_operation(
-                    OPERATION_TYPES["COMPANY_ERROR"],
-                    siret=siret,
-                    status=STATUS["ERROR"],
-                    error=error_msg,
-                    metadata={"siret": siret},
-                )
-                all_data.append(
-                    {
-                        "entreprise": entreprise,
-                        "data": {
-                            "siret": siret,
-                            "status": STATUS["ERROR"],
-                            "error": str(e),
-                        },
-                    }
-                )
+        # gather conserve l'ordre des entreprises en entrée
+        results = await asyncio.gather(*(bounded(e) for e in entreprises))
+
+        all_data = [status for status, _ in results if status is not None]
+        successful_data = [data for _, data in results if data is not None]
+        logger.info(
+            f"{len(successful_data)}/{len(all_data)} entreprises avec des données collectées"
+        )
 
         # Vérifier si des données ont été récupérées
         if not successful_data:
@@ -214,11 +278,12 @@ async def prepare_excel_and_upload_to_snaplogic(
         )
 
         try:
-            # Préparer l'Excel
-            excel_data = BytesIO()
+            # Préparer l'Excel dans un fichier temporaire (supprimé à sa fermeture)
+            excel_data = tempfile.TemporaryFile()
             await prepare_excel(successful_data, excel_data)
             excel_data.seek(0)
         except Exception as e:
+            excel_data.close()
             error_msg = PIPELINE_ERRORS["EXCEL_ERROR"].format(str(e))
             logger.error(error_msg)
             raise Exception(error_msg) from e
@@ -231,13 +296,11 @@ async def prepare_excel_and_upload_to_snaplogic(
                 if "pdfs" in item["data"]:
                     pdfs_list = item["data"]["pdfs"]
                     for pdf_name, pdf in pdfs_list.items():
-                        pdf_content = pdf["content"]
                         # Get PDF metadata
-                        avp_id = (pdf_name.split(".")[0]).split("/")[-1]
                         delta = pdf.get("delta", False)
-                        pdf_key = f"{siret}_{avp_id}"
                         pdfs_data[pdf_name] = {
-                            "content": pdf_content,
+                            # Contenu en mémoire ou chemin vers le spool
+                            **{k: pdf[k] for k in ("content", "path", "size") if k in pdf},
                             "filename": f"{pdf_name}",
                             "delta": delta,
                         }
@@ -263,8 +326,11 @@ async def prepare_excel_and_upload_to_snaplogic(
             },
         }
 
-        # Envoyer à SnapLogic
-        response = await send_to_snaplogic(excel_data, pdfs_data, metadata, tracking)
+        # Envoyer à SnapLogic (le fichier Excel temporaire est supprimé à sa fermeture)
+        try:
+            response = await send_to_snaplogic(excel_data, pdfs_data, metadata, tracking)
+        finally:
+            excel_data.close()
 
         return {
             "status": "success",
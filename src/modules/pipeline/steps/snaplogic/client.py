@@ -1,25 +1,30 @@
 """Client SnapLogic pour l'application."""
 
-import os
 import json
+import time
 import logging
 import aiohttp
 import asyncio
-from io import BytesIO
-from typing import Dict, Any, Optional
-import pickle
+from typing import BinaryIO, Dict, Any, List, Optional
 
 from .config import snaplogic_config, get_headers
+from src.config import SYLAE_BLOB_RETENTION_HOURS
+from src.modules.storage.blobs.blobs import prune_blobs
+from src.modules.storage.blobs.manifest import referenced_blobs
 from src.services.aws import TrackingService, STATUS, OPERATION_TYPES
 from src.constants.error_messages import SNAPLOGIC_ERRORS, GENERAL_ERRORS
-from .multipart import _create_multipart
-from .temp_files import cleanup_temp_files, create_temp_file
+from .multipart import _create_multipart, _excel_size, _pdf_size
+from .temp_files import _load_temp_data, cleanup_temp_files, create_temp_file
 
 logger = logging.getLogger(__name__)
 
 SNAPLOGIC_URL = f"{snaplogic_config.BASE_URL}{snaplogic_config.UPLOAD_ENDPOINT}"
 
 
+class SnapLogicTransientError(Exception):
+    """Échec temporaire (erreur 5xx, réseau ou délai dépassé) : l'envoi peut être retenté."""
+
+
 async def _send_http_request(
     session: aiohttp.ClientSession,
     url: str,
@@ -39,6 +44,14 @@ async def _send_http_request(
             logging.info(f"SnapLogic response status: {response.status}")
             response_text = await response.text()
             logging.info(f"SnapLogic response: {response_text}")
+            if response.status >= 500:
+                raise SnapLogicTransientError(
+                    SNAPLOGIC_ERRORS["API_ERROR"].format(response.status, response_text)
+                )
+            if response.status >= 400:
+                raise Exception(
+                    SNAPLOGIC_ERRORS["API_ERROR"].format(response.status, response_text)
+                )
 
             try:
                 if isinstance(response_text, str):
@@ -52,23 +65,55 @@ async def _send_http_request(
                 logging.warning(f"Could not parse SnapLogic response as JSON: {str(e)}")
                 return {"status": "success", "data": response_text}
 
-    except asyncio.TimeoutError:
+    except SnapLogicTransientError:
+        raise
+    except asyncio.TimeoutError as e:
         error_msg = GENERAL_ERRORS["TIMEOUT_ERROR"].format("SnapLogic")
         logging.error(error_msg)
-        raise Exception(error_msg)
+        raise SnapLogicTransientError(error_msg) from e
     except aiohttp.ClientError as e:
         error_msg = SNAPLOGIC_ERRORS["NETWORK_ERROR"].format(str(e))
         logging.error(error_msg)
-        raise Exception(error_msg) from e
+        raise SnapLogicTransientError(error_msg) from e
     except Exception as e:
         error_msg = SNAPLOGIC_ERRORS["SEND_ERROR"].format(str(e))
         logging.error(error_msg)
         raise Exception(error_msg) from e
 
 
+def _split_batches(
+    pdfs_data: Dict[str, Dict[str, Any]], max_bytes: int, first_batch_bytes: int = 0
+) -> List[Dict[str, Dict[str, Any]]]:
+    """
+    Répartit les PDFs en lots d'au plus max_bytes, dans l'ordre.
+
+    Un PDF plus gros que max_bytes forme un lot à lui seul. Il y a toujours au
+    moins un lot (celui qui porte l'Excel).
+
+    Args:
+        pdfs_data: PDFs à envoyer
+        max_bytes: Taille maximale d'un lot, en octets
+        first_batch_bytes: Octets déjà pris dans le premier lot (Excel)
+    """
+    batches = []
+    batch = {}
+    size = first_batch_bytes
+    for pdf_name, pdf_info in pdfs_data.items():
+        pdf_size = _pdf_size(pdf_info)
+        if batch and size + pdf_size > max_bytes:
+            batches.append(batch)
+            batch = {}
+            size = 0
+        batch[pdf_name] = pdf_info
+        size += pdf_size
+    if batch or not batches:
+        batches.append(batch)
+    return batches
+
+
 async def _send_batch_to_snaplogic(
     session: aiohttp.ClientSession,
-    excel_data: Optional[BytesIO],
+    excel_data: Optional[BinaryIO],
     pdfs_batch: Dict[str, Dict[str, Any]],
     metadata: Dict[str, Any],
     batch_number: int,
@@ -76,67 +121,127 @@ async def _send_batch_to_snaplogic(
     tracking: TrackingService,
 ) -> Dict[str, Any]:
     """
-    Envoie un lot de données à SnapLogic.
+    Envoie un lot de données à SnapLogic, avec nouvelles tentatives.
+
+    Seuls les échecs temporaires (5xx, réseau, délai dépassé) sont retentés ;
+    une erreur 4xx est remontée immédiatement. Le formulaire est reconstruit
+    à chaque tentative : aiohttp ferme les fichiers une fois envoyés, ils
+    sont donc rouverts.
     """
-    form = await _create_multipart(
-        excel_data, pdfs_batch, metadata, batch_number, total_batches
-    )
+    batch_bytes = sum(_pdf_size(pdf_info) for pdf_info in pdfs_batch.values())
+    if excel_data is not None:
+        batch_bytes += _excel_size(excel_data)
     headers = get_headers()
-    response = await _send_http_request(session, SNAPLOGIC_URL, form, headers)
+
+    attempt = 1
+    while True:
+        start = time.perf_counter()
+        try:
+            form = await _create_multipart(
+                excel_data, pdfs_batch, metadata, batch_number, total_batches
+            )
+            response = await _send_http_request(session, SNAPLOGIC_URL, form, headers)
+            break
+        except SnapLogicTransientError as e:
+            if attempt >= snaplogic_config.RETRIES:
+                raise
+            delay = snaplogic_config.BACKOFF * 2 ** (attempt - 1)
+            logger.warning(
+                f"Batch {batch_number}/{total_batches} : tentative {attempt} échouée ({e}), "
+                f"nouvel essai dans {delay:.0f}s"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+    elapsed = time.perf_counter() - start
+
+    megabytes = batch_bytes / 2**20
+    logger.info(
+        f"Batch {batch_number}/{total_batches} envoyé : {len(pdfs_batch)} PDFs, "
+        f"{megabytes:.1f} Mo en {elapsed:.1f}s ({megabytes / max(elapsed, 1e-6):.2f} Mo/s)"
+    )
 
     # Traquer chaque batch
     await tracking.log_pipeline_operation(
         OPERATION_TYPES["SNAPLOGIC_UPLOAD"],
         status=STATUS["SUCCESS"],
-        metadata={"batch_id": metadata["batch_id"], "batch_number": batch_number},
+        metadata={
+            "batch_id": metadata["batch_id"],
+            "batch_number": batch_number,
+            "bytes": batch_bytes,
+            "duration": round(elapsed, 3),
+            "attempts": attempt,
+        },
     )
 
     return response
 
 
-async def _send_large_data(
-    excel_data: BytesIO,
+async def _send_batches(
+    session: aiohttp.ClientSession,
+    excel_data: BinaryIO,
     pdfs_data: Dict[str, Dict[str, Any]],
     metadata: Dict[str, Any],
     tracking: TrackingService,
 ) -> Dict[str, Any]:
-    """Envoie les données en plusieurs requêtes si elles sont trop volumineuses"""
-    # Diviser en lots de 10 PDFs maximum
-    pdfs_items = list(pdfs_data.items())
-    batches = []
-    for i in range(0, len(pdfs_items), 10):
-        batch = dict(pdfs_items[i : i + 10])
-        batches.append(batch)
+    """
+    Envoie l'Excel et les PDFs par lots de taille bornée (SNAPLOGIC_BATCH_MAX_BYTES).
+
+    Le premier lot, qui porte l'Excel, est envoyé seul en premier ; les suivants
+    partent en parallèle (SNAPLOGIC_CONCURRENCY lots à la fois).
+    """
+    excel_bytes = _excel_size(excel_data)
+    batches = _split_batches(pdfs_data, snaplogic_config.BATCH_MAX_BYTES, excel_bytes)
+    total = len(batches)
+    total_bytes = excel_bytes + sum(_pdf_size(pdf_info) for pdf_info in pdfs_data.values())
+    concurrency = max(1, snaplogic_config.CONCURRENCY)
+    logger.info(
+        f"Envoi en {total} lots ({total_bytes / 2**20:.1f} Mo, {concurrency} lots en parallèle)"
+    )
 
-    logger.info(f"Envoi en {len(batches)} lots")
-
-    responses = []
-    async with aiohttp.ClientSession() as session:
-        for i, batch in enumerate(batches, 1):
-            # Premier batch = avec Excel, autres sans
-            excel = excel_data if i == 1 else None
-
-            response = await _send_batch_to_snaplogic(
-                session=session,
-                excel_data=excel,
-                pdfs_batch=batch,
-                metadata=metadata,
-                batch_number=i,
-                total_batches=len(batches),
-                tracking=tracking,
+    start = time.perf_counter()
+    first = await _send_batch_to_snaplogic(
+        session, excel_data, batches[0], metadata, 1, total, tracking
+    )
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(batch_number: int, batch: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        async with semaphore:
+            return await _send_batch_to_snaplogic(
+                session, None, batch, metadata, batch_number, total, tracking
             )
-            responses.append(response)
-            logger.info(f"Batch {i}/{len(batches)} envoyé avec succès")
 
+    # Tous les lots vont au bout (avec leurs tentatives) avant de remonter un échec
+    results = await asyncio.gather(
+        *(send(i, batch) for i, batch in enumerate(batches[1:], 2)),
+        return_exceptions=True,
+    )
+    failed = [(i, r) for i, r in enumerate(results, 2) if isinstance(r, BaseException)]
+    if failed:
+        numbers = ", ".join(str(i) for i, _ in failed)
+        error_msg = SNAPLOGIC_ERRORS["BATCH_ERROR"].format(
+            f"lots {numbers} sur {total} en échec : {failed[0][1]}"
+        )
+        logger.error(error_msg)
+        raise Exception(error_msg) from failed[0][1]
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"{total} lots envoyés : {total_bytes / 2**20:.1f} Mo en {elapsed:.1f}s "
+        f"({total_bytes / 2**20 / max(elapsed, 1e-6):.2f} Mo/s)"
+    )
+
+    if total == 1:
+        return first
     return {
         "status": "success",
-        "message": f"Successfully sent {len(batches)} batches",
-        "parts": responses,
+        "message": f"Successfully sent {total} batches",
+        "parts": [first, *results],
     }
 
 
 async def send_to_snaplogic(
-    excel_data: BytesIO,
+    excel_data: BinaryIO,
     pdfs_data: Dict[str, Dict[str, Any]],
     metadata: Dict[str, Any],
     tracking: TrackingService,
@@ -149,29 +254,23 @@ async def send_to_snaplogic(
         temp_path = await create_temp_file(excel_data, pdfs_data, metadata)
         logger.info(f"Données sauvegardées dans {temp_path}")
 
-        # Configurer la session HTTP
-        timeout = aiohttp.ClientTimeout(total=3600)  # 1 heure de timeout
-        headers = get_headers()
+        # Configurer la session HTTP (partagée par tous les lots)
+        timeout = aiohttp.ClientTimeout(total=snaplogic_config.TIMEOUT)
 
         async with aiohttp.ClientSession(timeout=timeout) as session:
             try:
                 # Tenter l'envoi
-                if len(pdfs_data) > 10:
-                    response = await _send_large_data(
-                        excel_data, pdfs_data, metadata, tracking
-                    )
-                else:
-                    form = await _create_multipart(
-                        excel_data, pdfs_data, metadata, 1, 1
-                    )
-                    response = await _send_http_request(
-                        session, SNAPLOGIC_URL, form, headers
-                    )
+                response = await _send_batches(
+                    session, excel_data, pdfs_data, metadata, tracking
+                )
 
                 # Si succès, nettoyer les fichiers temporaires de ce batch
                 await cleanup_temp_files(batch_id=metadata["batch_id"])
                 # Et aussi les vieux fichiers
                 await cleanup_temp_files(max_age_hours=24)
+                # Les PDFs du spool restent disponibles plus longtemps que les fichiers de retry
+                keep = await asyncio.to_thread(referenced_blobs)
+                await asyncio.to_thread(prune_blobs, SYLAE_BLOB_RETENTION_HOURS, keep)
 
                 return response
 
@@ -203,28 +302,17 @@ async def retry_failed_snaplogic(
     """
     try:
         # Charger les données
-        with open(temp_path, "rb") as f:
-            excel_data, pdfs_data, metadata = pickle.load(f)
-        logger.info(f"Données chargées depuis {temp_path}")
+        excel_data, pdfs_data, metadata = await _load_temp_data(temp_path)
 
-        # Configurer la session HTTP
-        timeout = aiohttp.ClientTimeout(total=3600)  # 1 heure de timeout
-        headers = get_headers()
+        # Configurer la session HTTP (partagée par tous les lots)
+        timeout = aiohttp.ClientTimeout(total=snaplogic_config.TIMEOUT)
 
         async with aiohttp.ClientSession(timeout=timeout) as session:
             try:
                 # Tenter l'envoi
-                if len(pdfs_data) > 10:
-                    response = await _send_large_data(
-                        excel_data, pdfs_data, metadata, tracking
-                    )
-                else:
-                    form = await _create_multipart(
-                        excel_data, pdfs_data, metadata, 1, 1
-                    )
-                    response = await _send_http_request(
-                        session, SNAPLOGIC_URL, form, headers
-                    )
+                response = await _send_batches(
+                    session, excel_data, pdfs_data, metadata, tracking
+                )
 
                 # Si succès, supprimer le fichier temporaire et nettoyer
                 await cleanup_temp_files(batch_id=metadata["batch_id"])
@@ -12,6 +12,12 @@ class SnapLogicConfig(BaseModel):
     NOTIFICATION_ENDPOINT: str = config('SNAPLOGIC_NOTIFICATION_ENDPOINT', cast=str)
     NOTIFICATION_BEARER: str = config('SNAPLOGIC_NOTIFICATION_BEARER', cast=str)
     TIMEOUT: int = config('SNAPLOGIC_TIMEOUT', cast=int, default=3600)
+    # Envoi par lots : taille maximale d'un lot (Excel compris pour le premier), lots envoyés
+    # simultanément et nouvelles tentatives par lot (délai doublé à chaque essai)
+    BATCH_MAX_BYTES: int = config('SNAPLOGIC_BATCH_MAX_BYTES', cast=int, default=20 * 1024 * 1024)
+    CONCURRENCY: int = config('SNAPLOGIC_CONCURRENCY', cast=int, default=4)
+    RETRIES: int = config('SNAPLOGIC_RETRIES', cast=int, default=3)
+    BACKOFF: float = config('SNAPLOGIC_BACKOFF', cast=float, default=2.0)
 
 def reload_config():
     """Recharge la configuration depuis le fichier .env"""
@@ -1,17 +1,47 @@
 """Gestion des requêtes multipart pour SnapLogic."""
 
+import os
 import logging
 import aiohttp
 from io import BytesIO
-from typing import Dict, Any, Optional
+from typing import BinaryIO, Dict, Any, Optional
 
 from .config import MIME_TYPES
 
 logger = logging.getLogger(__name__)
 
 
+def _pdf_size(pdf_info: Dict[str, Any]) -> int:
+    """Taille d'un PDF (en mémoire ou dans le spool), en octets."""
+    if "content" in pdf_info:
+        return len(pdf_info["content"])
+    return pdf_info.get("size") or os.path.getsize(pdf_info["path"])
+
+
+def _excel_size(excel_data: BinaryIO) -> int:
+    """Taille du fichier Excel, en octets."""
+    position = excel_data.tell()
+    size = excel_data.seek(0, os.SEEK_END)
+    excel_data.seek(position)
+    return size
+
+
+def _reopen_excel(excel_data: BinaryIO) -> BinaryIO:
+    """
+    Nouvel objet fichier sur le contenu Excel, positionné au début.
+
+    aiohttp ferme les fichiers une fois envoyés : chaque formulaire reçoit sa
+    propre copie, l'original reste utilisable pour une nouvelle tentative.
+    """
+    if isinstance(excel_data, BytesIO):
+        return BytesIO(excel_data.getbuffer())
+    excel = os.fdopen(os.dup(excel_data.fileno()), "rb")
+    excel.seek(0)
+    return excel
+
+
 async def _create_multipart(
-    excel_data: Optional[BytesIO],
+    excel_data: Optional[BinaryIO],
     pdfs_batch: Dict[str, Dict[str, Any]],
     metadata: Dict[str, Any],
     batch_number: int,
@@ -21,8 +51,9 @@ async def _create_multipart(
     Crée le contenu multipart pour l'envoi à SnapLogic.
 
     Args:
-        excel_data: Données Excel en mémoire (optionnel)
-        pdfs_batch: Dictionnaire des PDFs pour ce batch
+        excel_data: Fichier Excel (optionnel, non fermé par l'envoi)
+        pdfs_batch: Dictionnaire des PDFs pour ce batch ("content" en mémoire
+                    ou "path" vers le spool, lu au moment de l'envoi)
         metadata: Métadonnées pour SnapLogic
         batch_number: Numéro du batch courant
         total_batches: Nombre total de batchs
@@ -32,24 +63,26 @@ async def _create_multipart(
     """
     form = aiohttp.FormData()
 
-    # Ajouter les métadonnées
-    metadata["batch_info"] = {"current": batch_number, "total": total_batches}
+    # Ajouter les métadonnées (copie : les lots peuvent être envoyés en parallèle)
+    metadata = {**metadata, "batch_info": {"current": batch_number, "total": total_batches}}
     form.add_field("metadata", str(metadata), content_type=MIME_TYPES["JSON"])
 
     # Ajouter le fichier Excel s'il est présent
     if excel_data is not None:
         form.add_field(
             "excel_file",
-            excel_data,
+            _reopen_excel(excel_data),
             filename="data.xlsx",
             content_type=MIME_TYPES["EXCEL"],
         )
 
     # Ajouter les PDFs
     for pdf_key, pdf_info in pdfs_batch.items():
+        # Fichier du spool : aiohttp le lit par morceaux pendant l'envoi puis le ferme
+        content = open(pdf_info["path"], "rb") if "path" in pdf_info else pdf_info["content"]
         form.add_field(
             f"pdf_{pdf_key}",
-            pdf_info["content"],
+            content,
             filename=f"{pdf_key}",
             content_type=MIME_TYPES["PDF"],
         )
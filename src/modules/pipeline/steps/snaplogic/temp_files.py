@@ -5,7 +5,7 @@ import tempfile
 import logging
 import pickle
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, BinaryIO
 from io import BytesIO
 
 logger = logging.getLogger(__name__)
@@ -93,12 +93,22 @@ async def remove_temp_files() -> None:
         except Exception as e:
             logger.warning(f"Impossible de supprimer le fichier temporaire {f}: {e}")
 
-async def create_temp_file(excel_data: BytesIO, pdfs_data: Dict[str, Dict[str, Any]], metadata: Dict[str, Any]) -> str:
+def _read_excel(excel_data: BinaryIO) -> bytes:
+    """Contenu du fichier Excel, sans déplacer le curseur du fichier."""
+    if isinstance(excel_data, BytesIO):
+        return excel_data.getvalue()
+    position = excel_data.tell()
+    excel_data.seek(0)
+    content = excel_data.read()
+    excel_data.seek(position)
+    return content
+
+async def create_temp_file(excel_data: BinaryIO, pdfs_data: Dict[str, Dict[str, Any]], metadata: Dict[str, Any]) -> str:
     """
     Sauvegarde les données dans un dossier temporaire pour retry.
     
     Args:
-        excel_data: Données Excel
+        excel_data: Fichier Excel (BytesIO ou fichier binaire ouvert)
         pdfs_data: Données PDFs
         metadata: Métadonnées
         
@@ -122,7 +132,7 @@ async def create_temp_file(excel_data: BytesIO, pdfs_data: Dict[str, Dict[str, A
     
     # Préparer les données à sauvegarder
     data_to_save = {
-        'excel_data': excel_data.getvalue(),
+        'excel_data': _read_excel(excel_data),
         'pdfs_data': pdfs_data,
         'metadata': metadata,
         'timestamp': timestamp,
@@ -1,18 +1,19 @@
 """Utilitaires de gestion des fichiers Excel."""
 
-from typing import List, Dict, Any
-from io import BytesIO
+import asyncio
+from typing import List, Dict, Any, BinaryIO
 import pandas as pd
 
 from src.modules.extract.parsers.alternantsJSON import alts_parsing
 from src.modules.extract.parsers.avisdepaiement import avps_parsing
 from src.modules.extract.parsers.entreprises import entreprise_parsing
-from src.modules.extract.parsers.utils import save_excel
+from src.modules.extract.parsers.utils import write_excel
+from src.modules.extract.executor import run_extract
 
 
-async def prepare_excel(successful_data: List[Dict[str, Any]], output: BytesIO) -> None:
+async def prepare_excel(successful_data: List[Dict[str, Any]], output: BinaryIO) -> None:
     """
-    Prépare un fichier Excel avec les données fournies et l'écrit dans un BytesIO.
+    Prépare un fichier Excel avec les données fournies et l'écrit dans un fichier.
     
     Args:
         successful_data: Liste des données récupérées avec succès. Chaque élément contient:
@@ -20,32 +21,35 @@ async def prepare_excel(successful_data: List[Dict[str, Any]], output: BytesIO)
             - data: Dictionnaire contenant:
                 - avps: Liste des avis de paiement
                 - alternants: Liste des alternants (optionnel)
-        output: Objet BytesIO dans lequel écrire le fichier Excel. 
-               Le curseur sera positionné au début après l'écriture.
+        output: Fichier binaire (fichier temporaire, BytesIO...) dans lequel écrire
+               le fichier Excel. Le curseur sera positionné au début après l'écriture.
     """
     # Extraire les AVPs de toutes les entreprises
     all_avps = []
     for item in successful_data:
         if "avps" in item["data"]:
             all_avps.extend(item["data"]["avps"])
-    df_avps = await avps_parsing(pd.DataFrame(all_avps))
 
     # Extraire les données des entreprises
     entreprises_data = [item["entreprise"] for item in successful_data]
-    df_ent = await entreprise_parsing(entreprises_data)
 
     # Extraire les données des alternants (si présentes)
     all_alts = []
     for item in successful_data:
         if "alternants" in item["data"]:
             all_alts.extend(item["data"]["alternants"])
-    df_alts = await alts_parsing(pd.DataFrame(all_alts))
 
-    # Création du fichier Excel en mémoire puis transformation en BytesIO
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        save_excel(writer, df_avps, "AVPs")
-        save_excel(writer, df_ent, "Entreprises")
-        save_excel(writer, df_alts, "Alternants")
+    # Les trois feuilles sont construites en parallèle dans l'exécuteur d'extraction
+    df_avps, df_ent, df_alts = await asyncio.gather(
+        run_extract(avps_parsing, pd.DataFrame(all_avps)),
+        run_extract(entreprise_parsing, entreprises_data),
+        run_extract(alts_parsing, pd.DataFrame(all_alts)),
+    )
 
-    # Remettre le curseur au début du BytesIO pour permettre la lecture
+    # Écriture ligne par ligne directement dans le fichier de sortie, dans un thread
+    await asyncio.to_thread(
+        write_excel, output, [("AVPs", df_avps), ("Entreprises", df_ent), ("Alternants", df_alts)]
+    )
+
+    # Remettre le curseur au début pour permettre la lecture
     output.seek(0)
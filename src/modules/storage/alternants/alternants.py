@@ -1,59 +1,59 @@
-import os
 from src.modules.storage.common import VerifyIfDirExistElseCreate
+from src.modules.storage.snapshots.codecs import get_codec
+from src.modules.storage.snapshots.snapshots import load_latest_frame, load_latest_snapshot, record_snapshot, snapshot_diff
 import src.modules.extract.parsers.constants as constants
-from datetime import datetime, timedelta
-import json
+from datetime import datetime
+import pandas as pd
 from typing import Optional
-import shutil
 import logging
 
 lg = logging.getLogger()
 lg.setLevel(logging.INFO)
 formatter = logging.Formatter('%(asctime)s;%(levelname)s;%(message)s;')
 
-async def save_alts(alternants : dict, siret : str) -> None:
+async def save_alts(alternants : dict, siret : str) -> dict:
     save_path = f"{constants.ALTERNANTS_FOLDER}/{siret}"
     await VerifyIfDirExistElseCreate(save_path)
-    list_of_files = map(lambda x : save_path + "/" + x , os.listdir(save_path))
-    list_of_jsons = [x for x in list_of_files if x[-5:] == ".json"]
-    if os.listdir(save_path) != []:
-        last_file = max(list_of_jsons, key=os.path.getctime)
-        lg.debug("Vérification de la sauvegarde")
-        with open(last_file,'r') as fr :
-            content = fr.read()
-            if content != json.dumps(alternants, indent=4) :
-                await file_save_alts(alternants,save_path,siret)
-            else:
-                lg.info("Pas de nouveau avp pour cette entreprise")
-            fr.close()
+    lg.debug("Vérification de la sauvegarde")
+    diff = snapshot_diff(save_path, alternants, "id")
+    if diff["modified"]:
+        await file_save_alts(alternants,save_path,siret,diff)
     else:
-        await file_save_alts(alternants,save_path,siret)
+        lg.info("Pas de nouveau avp pour cette entreprise")
+    return diff
 
 
 
-async def file_save_alts(jsontxt : dict, path : str, siret : str):
+async def file_save_alts(jsontxt : dict, path : str, siret : str, diff : Optional[dict] = None):
 
         lg.debug("Sauvegarde à faire")
 
-        with open(path + '/alts_' + siret +'_' + datetime.now().strftime("%d%m%Y-%H-%M-%S") + '.json','w') as f :
-            f.write(json.dumps(jsontxt, indent=4))
-            f.close()
-            lg.debug("Fichier : alts_" + siret +'_' + datetime.now().strftime("%d%m%Y-%H-%M-%S") + ".json créé")
+        codec = get_codec(jsontxt)
+        file_name = 'alts_' + siret +'_' + datetime.now().strftime("%d%m%Y-%H-%M-%S") + codec.extension
+        codec.dump(jsontxt, path + '/' + file_name)
+        lg.debug("Fichier : " + file_name + " créé")
+        record_snapshot(path, path + '/' + file_name, diff or snapshot_diff(path, jsontxt, "id"))
 
 
 
 async def get_stored_alts(siret : str) -> dict :
     save_path = f"{constants.ALTERNANTS_FOLDER}/{siret}"
-    list_of_jsons = list(map(lambda x : save_path + "/" + x , os.listdir(save_path)))
+    alternants = load_latest_snapshot(save_path)
+    if alternants is not None:
+        lg.debug("Récupération de la sauvegarde")
+        return alternants
+    else:
+        lg.error("No alternant file saved, save them first")
+        raise Exception("No alternant file saved, save them first")
 
-    list_of_jsons = [x for x in list_of_jsons if x[-5:] == ".json"]
-    if os.listdir(save_path) != []:
-        last_file = max(list_of_jsons, key=os.path.getctime)
+
+async def get_stored_alts_frame(siret : str) -> pd.DataFrame :
+    """Dernière sauvegarde des alternants d'une entreprise, chargée directement en DataFrame."""
+    save_path = f"{constants.ALTERNANTS_FOLDER}/{siret}"
+    df_alts = load_latest_frame(save_path)
+    if df_alts is not None:
         lg.debug("Récupération de la sauvegarde")
-        with open(last_file,'r') as fr :
-            content = fr.read()
-            fr.close()
-            return json.loads(content)
+        return df_alts
     else:
         lg.error("No alternant file saved, save them first")
-        raise Exception("No alternant file saved, save them first")
\ No newline at end of file
+        raise Exception("No alternant file saved, save them first")
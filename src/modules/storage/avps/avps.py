@@ -1,7 +1,11 @@
+import asyncio
 from datetime import datetime
-import json
-import os
+import pandas as pd
+from typing import List, Optional
 from src.modules.storage.common import VerifyIfDirExistElseCreate
+from src.modules.storage.blobs.manifest import get_manifest, resolve_pdf_path
+from src.modules.storage.snapshots.codecs import get_codec
+from src.modules.storage.snapshots.snapshots import SnapshotMissing, load_latest_frame, load_latest_frames, load_latest_snapshot, record_snapshot, snapshot_diff
 
 import logging
 
@@ -10,125 +14,96 @@ lg.setLevel(logging.INFO)
 formatter = logging.Formatter("%(asctime)s;%(levelname)s;%(message)s;")
 
 
-async def file_save_avps(jsontxt: dict, path: str, siret: str):
+async def file_save_avps(jsontxt: dict, path: str, siret: str, diff: Optional[dict] = None):
 
     lg.debug("Sauvegarde à faire")
 
-    with open(
-        path
-        + "/avp_"
-        + siret
-        + "_"
-        + datetime.now().strftime("%d%m%Y-%H-%M-%S")
-        + ".json",
-        "w",
-    ) as f:
-        f.write(json.dumps(jsontxt, indent=4))
-        f.close()
-        lg.debug(
-            "Fichier : avp_"
-            + siret
-            + "_"
-            + datetime.now().strftime("%d%m%Y-%H-%M-%S")
-            + ".json créé"
-        )
-
-
-async def file_update_avps(jsontxt: dict, path: str, siret: str):
+    codec = get_codec(jsontxt)
+    file_name = "avp_" + siret + "_" + datetime.now().strftime("%d%m%Y-%H-%M-%S") + codec.extension
+    codec.dump(jsontxt, path + "/" + file_name)
+    lg.debug("Fichier : " + file_name + " créé")
+    record_snapshot(path, path + "/" + file_name, diff or snapshot_diff(path, jsontxt, "id"))
 
-    lg.debug("Sauvegarde à faire")
 
-    with open(
-        path
-        + "/avp_"
-        + siret
-        + "_"
-        + datetime.now().strftime("%d%m%Y-%H-%M-%S")
-        + ".json",
-        "w",
-    ) as f:
-        f.write(json.dumps(jsontxt, indent=4))
-        f.close()
-        lg.debug(
-            "Fichier : avp_"
-            + siret
-            + "_"
-            + datetime.now().strftime("%d%m%Y-%H-%M-%S")
-            + ".json créé"
-        )
-
-
-async def save_avps(avps: dict, siret: str) -> None:
+async def file_update_avps(jsontxt: dict, path: str, siret: str, diff: Optional[dict] = None):
+    await file_save_avps(jsontxt, path, siret, diff)
+
+
+async def save_avps(avps: dict, siret: str) -> dict:
+    """
+    Sauvegarde les AVPs d'une entreprise s'ils ont changé depuis la dernière sauvegarde.
+
+    Returns:
+        Différences avec la sauvegarde précédente (voir snapshot_diff) : IDs des
+        AVPs ajoutés ("added"), modifiés ("changed") et supprimés ("removed")
+    """
     save_path = "data/sylae/avps/" + siret
     await VerifyIfDirExistElseCreate(save_path)
-    list_of_files = map(lambda x: save_path + "/" + x, os.listdir(save_path))
-    list_of_jsons = [x for x in list_of_files if x[-5:] == ".json"]
-    if os.listdir(save_path) != []:
-        last_file = max(list_of_jsons, key=os.path.getctime)
-        lg.debug("Vérification de la sauvegarde")
-        with open(last_file, "r") as fr:
-            content = fr.read()
-            if content != json.dumps(avps, indent=4):
-                await file_save_avps(avps, save_path, siret)
-            else:
-                lg.info("Pas de nouveau avp pour cette entreprise")
-            fr.close()
+    lg.debug("Vérification de la sauvegarde")
+    diff = snapshot_diff(save_path, avps, "id")
+    if diff["modified"]:
+        await file_save_avps(avps, save_path, siret, diff)
     else:
-        await file_save_avps(avps, save_path, siret)
+        lg.info("Pas de nouveau avp pour cette entreprise")
+    return diff
 
 
-async def update_avps(avps: dict, siret: str) -> None:
+async def update_avps(avps: dict, siret: str) -> dict:
     save_path = "data/sylae/avps/" + siret
     await VerifyIfDirExistElseCreate(save_path)
-    list_of_files = map(lambda x: save_path + "/" + x, os.listdir(save_path))
-    list_of_jsons = [x for x in list_of_files if x[-5:] == ".json"]
-    if os.listdir(save_path) != []:
-        last_file = max(list_of_jsons, key=os.path.getctime)
-        lg.debug("Vérification de la sauvegarde")
-        with open(last_file, "r") as fr:
-            content = fr.read()
-            if content != json.dumps(avps, indent=4):
-                await file_update_avps(avps, save_path, siret)
-            else:
-                lg.info("Pas de nouveau avp pour cette entreprise")
-            fr.close()
+    lg.debug("Vérification de la sauvegarde")
+    diff = snapshot_diff(save_path, avps, "id")
+    if diff["modified"]:
+        await file_update_avps(avps, save_path, siret, diff)
     else:
-        await file_update_avps(avps, save_path, siret)
+        lg.info("Pas de nouveau avp pour cette entreprise")
+    return diff
 
 
 def complete_pdf_avps(siret) -> bool:
     save_path = "data/sylae/avps/" + siret
-    list_of_files = list(map(lambda x: save_path + "/" + x, os.listdir(save_path)))
-    list_of_pdf = [x for x in list_of_files if x[-4:] == ".pdf"]
-    list_of_jsons = [x for x in list_of_files if x[-5:] == ".json"]
+    avps = load_latest_snapshot(save_path)
 
-    if list_of_jsons == []:
+    if avps is None:
         print(str(siret) + " : no data for this company, please download avps")
         return False
     else:
-        last_file = max(list_of_jsons, key=os.path.getctime)
-        with open(last_file, "r") as fr:
-            content = fr.read()
-            fr.close()
-            avps = json.loads(content)
-        if len(avps) == len(list_of_pdf):
-            return True
-        else:
-            return False
+        # Chaque AVP doit avoir son PDF (blob du manifeste ou ancien emplacement)
+        manifest = get_manifest(siret)
+        return all(resolve_pdf_path(siret, avp["id"], manifest) for avp in avps)
 
 
 async def get_stored_avps(siret: str) -> dict:
     save_path = "data/sylae/avps/" + siret
-    list_of_jsons = list(map(lambda x: save_path + "/" + x, os.listdir(save_path)))
+    avps = load_latest_snapshot(save_path)
+    if avps is not None:
+        lg.debug("Récupération de la sauvegarde")
+        return avps
+    else:
+        lg.error("No avis de paiment file saved, save them first")
+        raise Exception("No avis de paiment file saved, save them first")
+
 
-    list_of_jsons = [x for x in list_of_jsons if x[-5:] == ".json"]
-    if os.listdir(save_path) != []:
-        last_file = max(list_of_jsons, key=os.path.getctime)
+async def get_stored_avps_frame(siret: str) -> pd.DataFrame:
+    """Dernière sauvegarde des AVPs d'une entreprise, chargée directement en DataFrame."""
+    save_path = "data/sylae/avps/" + siret
+    df_avps = load_latest_frame(save_path)
+    if df_avps is not None:
         lg.debug("Récupération de la sauvegarde")
-        with open(last_file, "r") as fr:
-            content = fr.read()
-            fr.close()
-            return json.loads(content)
+        return df_avps
     else:
         lg.error("No avis de paiment file saved, save them first")
         raise Exception("No avis de paiment file saved, save them first")
+
+
+async def get_stored_avps_frames(sirets: List[str]) -> pd.DataFrame:
+    """
+    Dernières sauvegardes des AVPs de plusieurs entreprises, lues en parallèle
+    et réunies en un seul DataFrame (dans l'ordre des SIRETs).
+    """
+    save_paths = ["data/sylae/avps/" + siret for siret in sirets]
+    try:
+        return await asyncio.to_thread(load_latest_frames, save_paths)
+    except SnapshotMissing as e:
+        lg.error(f"No avis de paiment file saved for {', '.join(e.folders)}, save them first")
+        raise Exception("No avis de paiment file saved, save them first")
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+import hashlib
+import os
+import tempfile
+from typing import Dict, Optional, Set
+
+import src.modules.extract.parsers.constants as constants
+
+import logging
+
+lg = logging.getLogger()
+
+
+def blob_path(sha256: str) -> str:
+    """Chemin du blob dans le spool, adressé par son empreinte SHA-256."""
+    return f"{constants.BLOBS_FOLDER}/{sha256[:2]}/{sha256}"
+
+
+class BlobWriter:
+    """
+    Écrit un fichier par morceaux dans le spool en calculant son empreinte.
+
+    Le contenu est d'abord écrit dans un fichier temporaire, puis renommé
+    vers son chemin définitif (adressé par contenu) par `commit` : un même
+    PDF téléchargé deux fois n'occupe qu'un seul fichier.
+
+    Utilisation :
+        writer = BlobWriter()
+        for chunk in chunks:
+            writer.write(chunk)
+        blob = writer.commit()   # ou writer.discard()
+    """
+
+    def __init__(self):
+        os.makedirs(constants.BLOBS_FOLDER, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=constants.BLOBS_FOLDER, prefix=".tmp_")
+        self._file = os.fdopen(fd, "wb")
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+
+    def write(self, chunk: bytes) -> None:
+        if len(self.head) < 16:
+            self.head = (self.head + chunk)[:16]
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> Dict[str, object]:
+        """
+        Publie le blob dans le spool.
+
+        Returns:
+            {"path": chemin du blob, "sha256": empreinte, "size": taille en octets}
+        """
+        self._file.close()
+        sha256 = self._hash.hexdigest()
+        path = blob_path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self._tmp_path, path)
+        return {"path": path, "sha256": sha256, "size": self.size}
+
+    def discard(self) -> None:
+        """Abandonne l'écriture (téléchargement invalide ou interrompu)."""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def store_blob(content: bytes) -> Dict[str, object]:
+    """Enregistre un contenu déjà en mémoire dans le spool."""
+    writer = BlobWriter()
+    try:
+        writer.write(content)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.commit()
+
+
+def file_sha256(path: str) -> str:
+    """
+    Empreinte SHA-256 d'un fichier.
+
+    Un blob du spool est nommé par son empreinte : elle n'est pas recalculée.
+    """
+    name = os.path.basename(path)
+    if os.path.dirname(os.path.dirname(path)) == constants.BLOBS_FOLDER and len(name) == 64:
+        return name
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as fr:
+        for chunk in iter(lambda: fr.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def prune_blobs(max_age_hours: int, keep: Optional[Set[str]] = None, folder: Optional[str] = None) -> int:
+    """
+    Supprime les blobs du spool plus anciens que max_age_hours.
+
+    Args:
+        max_age_hours: Âge maximum des blobs en heures
+        keep: Empreintes à conserver quel que soit leur âge (blobs référencés par un manifeste)
+        folder: Dossier du spool (BLOBS_FOLDER par défaut)
+
+    Returns:
+        Nombre de fichiers supprimés
+    """
+    folder = folder or constants.BLOBS_FOLDER
+    if not os.path.isdir(folder):
+        return 0
+    limit = datetime.now() - timedelta(hours=max_age_hours)
+    removed = 0
+    keep = keep or set()
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name in keep:
+                continue
+            path = os.path.join(root, name)
+            try:
+                if datetime.fromtimestamp(os.path.getmtime(path)) < limit:
+                    os.remove(path)
+                    removed += 1
+            except OSError as e:
+                lg.warning(f"Impossible de supprimer le blob {path}: {e}")
+    if removed:
+        lg.info(f"{removed} blob(s) supprimé(s) du spool")
+    return removed
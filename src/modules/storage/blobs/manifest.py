@@ -0,0 +1,250 @@
+import errno
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Set, Union
+try:
+    import fcntl
+except ImportError:  # Windows (poste de dev) : pas de verrou entre processus
+    fcntl = None
+
+import src.modules.extract.parsers.constants as constants
+from src.modules.storage.blobs.blobs import blob_path, store_blob
+
+import logging
+
+lg = logging.getLogger()
+
+# Manifeste par SIRET : { avp_id: {"sha256": ..., "size": ..., "delta": bool,
+#                                  "etag": ..., "last_modified": ...} }
+# Il sert aussi d'index local : un PDF présent n'est pas retéléchargé.
+Manifest = Dict[str, Dict[str, Union[str, int, bool]]]
+
+
+def _manifest_file(siret: str) -> str:
+    return f"{constants.MANIFEST_FOLDER}/{siret}.json"
+
+
+def _lock_file(siret: str) -> str:
+    return f"{constants.MANIFEST_FOLDER}/{siret}.lock"
+
+
+def _legacy_paths(siret: str, avp_id: str) -> Dict[bool, str]:
+    """Anciens emplacements des PDFs, par statut delta."""
+    return {
+        False: f"{constants.AVPS_FOLDER}/{siret}/{avp_id}.pdf",
+        True: f"{constants.AVPS_DELTA_FOLDER}/{siret}/{avp_id}.pdf",
+    }
+
+
+def get_manifest(siret: str) -> Manifest:
+    """Retourne le manifeste des PDFs d'une entreprise (vide s'il n'existe pas)."""
+    path = _manifest_file(siret)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as fr:
+        return json.loads(fr.read())
+
+
+def save_manifest(siret: str, manifest: Manifest) -> None:
+    """Écrit le manifeste d'une entreprise (renommage atomique)."""
+    os.makedirs(constants.MANIFEST_FOLDER, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=constants.MANIFEST_FOLDER, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "w") as fw:
+            fw.write(json.dumps(manifest, indent=4))
+        os.replace(tmp_path, _manifest_file(siret))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def manifest_lock(siret: str) -> Iterator[None]:
+    """
+    Verrou exclusif sur le manifeste d'une entreprise, partagé entre les workers uvicorn.
+
+    Le verrou n'est tenu que le temps d'une lecture-modification-écriture :
+    le bloc ne doit pas contenir d'await (les autres coroutines du worker ne
+    peuvent alors pas attendre ce même verrou).
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(constants.MANIFEST_FOLDER, exist_ok=True)
+    with open(_lock_file(siret), "w") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def update_manifest(siret: str) -> Iterator[Manifest]:
+    """
+    Relit le manifeste sous verrou et l'écrit à la sortie du bloc (pas en cas d'erreur).
+
+    Utilisation :
+        with update_manifest(siret) as manifest:
+            register_pdf(manifest, avp_id, pdf, delta=True)
+    """
+    with manifest_lock(siret):
+        manifest = get_manifest(siret)
+        yield manifest
+        save_manifest(siret, manifest)
+
+
+def register_pdf(
+    manifest: Manifest, avp_id: str, pdf: Union[bytes, Dict], delta: bool
+) -> Dict:
+    """
+    Ajoute un PDF au manifeste (le manifeste doit ensuite être sauvegardé).
+
+    Args:
+        manifest: Manifeste de l'entreprise
+        avp_id: ID de l'AVP
+        pdf: Contenu du PDF, ou PDF téléchargé ({"content"} ou blob du spool {"sha256", "size"},
+             avec éventuellement "etag" / "last_modified")
+        delta: Statut delta de l'AVP
+
+    Returns:
+        L'entrée du manifeste
+    """
+    if isinstance(pdf, bytes):
+        pdf = {"content": pdf}
+    blob = store_blob(pdf["content"]) if "content" in pdf else pdf
+    entry = {"sha256": blob["sha256"], "size": blob["size"], "delta": delta}
+    for validator in ("etag", "last_modified"):
+        if pdf.get(validator):
+            entry[validator] = pdf[validator]
+    manifest[str(avp_id)] = entry
+    return entry
+
+
+def migrate_legacy_pdfs(siret: str) -> int:
+    """
+    Reprend dans le manifeste les PDFs d'une entreprise encore rangés dans
+    l'ancienne arborescence (avps/ ou avps_delta/), puis supprime les anciens fichiers.
+
+    Étape explicite, à appeler avant de mettre à jour le manifeste d'une
+    entreprise. Les anciens fichiers ne sont supprimés qu'une fois le
+    manifeste écrit ; un PDF déjà présent dans le manifeste n'est pas repris.
+
+    Args:
+        siret: SIRET de l'entreprise
+
+    Returns:
+        Nombre de PDFs repris
+    """
+    legacy = []
+    for delta, folder in ((False, constants.AVPS_FOLDER), (True, constants.AVPS_DELTA_FOLDER)):
+        folder = f"{folder}/{siret}"
+        if os.path.isdir(folder):
+            legacy += [(delta, f"{folder}/{name}") for name in sorted(os.listdir(folder)) if name.endswith(".pdf")]
+    if not legacy:
+        return 0
+
+    migrated = 0
+    with update_manifest(siret) as manifest:
+        for delta, path in legacy:
+            avp_id = os.path.basename(path)[:-4]
+            # Déjà repris (ou déjà repris par un autre worker avant le verrou)
+            if avp_id in manifest or not os.path.exists(path):
+                continue
+            with open(path, "rb") as fr:
+                register_pdf(manifest, avp_id, fr.read(), delta)
+            migrated += 1
+    for _, path in legacy:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    lg.info(f"{migrated} PDF(s) de {siret} repris de l'ancienne arborescence")
+    return migrated
+
+
+def get_local_entry(manifest: Manifest, avp_id: str) -> Optional[Dict]:
+    """Entrée du manifeste dont le blob est encore présent sur le disque."""
+    entry = manifest.get(str(avp_id))
+    if entry is not None and os.path.exists(blob_path(entry["sha256"])):
+        return entry
+    return None
+
+
+def resolve_pdf_path(siret: str, avp_id: str, manifest: Optional[Manifest] = None) -> Optional[str]:
+    """
+    Chemin du PDF d'un AVP : blob du manifeste, sinon ancien emplacement.
+
+    Returns:
+        Le chemin du fichier, ou None si le PDF n'a pas été téléchargé
+    """
+    manifest = get_manifest(siret) if manifest is None else manifest
+    entry = get_local_entry(manifest, avp_id)
+    if entry is not None:
+        return blob_path(entry["sha256"])
+    for path in _legacy_paths(siret, str(avp_id)).values():
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def referenced_blobs() -> Set[str]:
+    """Empreintes de tous les blobs référencés par un manifeste (à ne pas purger)."""
+    shas = set()
+    if not os.path.isdir(constants.MANIFEST_FOLDER):
+        return shas
+    for name in os.listdir(constants.MANIFEST_FOLDER):
+        if name.endswith(".json"):
+            manifest = get_manifest(name[:-5])
+            shas.update(entry["sha256"] for entry in manifest.values())
+    return shas
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        # Autre système de fichiers ou liens non supportés : copie classique
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+        shutil.copyfile(src, dst)
+
+
+def materialise_pdfs(dest_dir: str, delta_only: bool = True) -> int:
+    """
+    Reconstitue l'arborescence <dest_dir>/<siret>/<avp_id>.pdf à partir des manifestes.
+
+    Les fichiers sont des liens physiques vers les blobs (copie si le lien
+    est impossible) : l'export ne duplique pas les PDFs sur le disque.
+
+    Args:
+        dest_dir: Dossier de destination
+        delta_only: Ne reprendre que les AVPs delta
+
+    Returns:
+        Nombre de PDFs exportés
+    """
+    count = 0
+    if not os.path.isdir(constants.MANIFEST_FOLDER):
+        return count
+    for name in os.listdir(constants.MANIFEST_FOLDER):
+        if not name.endswith(".json"):
+            continue
+        siret = name[:-5]
+        for avp_id, entry in get_manifest(siret).items():
+            if delta_only and not entry["delta"]:
+                continue
+            src = blob_path(entry["sha256"])
+            if not os.path.exists(src):
+                lg.warning(f"Blob manquant pour l'AVP {avp_id} ({siret})")
+                continue
+            dst = f"{dest_dir}/{siret}/{avp_id}.pdf"
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            if os.path.exists(dst):
+                os.remove(dst)
+            _link_or_copy(src, dst)
+            count += 1
+    return count
@@ -5,8 +5,8 @@ async def verify_file_exist(file):
     return os.path.isfile(file)
 
 async def VerifyIfDirExistElseCreate(dir : str):
-    if not os.path.isdir(dir):
-        os.makedirs(dir)
+    # exist_ok : plusieurs workers peuvent créer le même dossier en même temps
+    os.makedirs(dir, exist_ok=True)
 
 async def VerifyIfDirExist(dir : str):
     return os.path.isdir(dir)
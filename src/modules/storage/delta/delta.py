@@ -1,10 +1,8 @@
 import logging
 import os
-import shutil
 from datetime import datetime
-from pathlib import Path
 
-from src.modules.storage.common import verify_file_exist
+from src.modules.storage.blobs.manifest import get_manifest, migrate_legacy_pdfs, update_manifest
 
 lg = logging.getLogger()
 lg.setLevel(logging.INFO)
@@ -12,48 +10,30 @@ formatter = logging.Formatter("%(asctime)s;%(levelname)s;%(message)s;")
 
 
 async def delta_to_data(avps: dict, siret: str):
-    save_path = "data/sylae/avps/" + siret
-    delta_save_path = "data/sylae/avps_delta/" + siret
-
-    for avp in avps:
-        if "delta" in avp:
-            if avp["delta"] == True:
-                avp_file = save_path + "/" + str(avp["id"]) + ".pdf"
-                delta_file = delta_save_path + "/" + str(avp["id"]) + ".pdf"
-
-                if await verify_file_exist(delta_file):
-                    shutil.move(delta_file, avp_file)
-                    avp["delta"] = False
+    """Passe les AVPs delta en data : simple mise à jour du manifeste, sans déplacer de fichier."""
+    migrate_legacy_pdfs(siret)
+    with update_manifest(siret) as manifest:
+        for avp in avps:
+            if "delta" in avp:
+                if avp["delta"] == True:
+                    entry = manifest.get(str(avp["id"]))
+                    if entry is not None:
+                        entry["delta"] = False
+                        avp["delta"] = False
     return avps
 
 
 async def refresh_deltas_in_avps(siret: str, avps: dict):
-    save_path = "data/sylae/avps/" + siret
-    delta_save_path = "data/sylae/avps_delta/" + siret
+    """Aligne le statut delta des AVPs sur le manifeste ; un AVP sans PDF reste delta."""
+    migrate_legacy_pdfs(siret)
+    manifest = get_manifest(siret)
 
     for avp in avps:
-        avp_file = save_path + "/" + str(avp["id"]) + ".pdf"
-        delta_file = delta_save_path + "/" + str(avp["id"]) + ".pdf"
-
-        if await verify_file_exist(avp_file):
-            if not "delta" in avp:
-                print(None, "->", "False")
-            elif avp["delta"] != False:
-                print(avp["delta"], "->", "False")
-            avp["delta"] = False
-            if await verify_file_exist(delta_file):
-                os.remove(delta_file)
-                print(delta_file, "removed", "!")
-
-        elif await verify_file_exist(delta_file):
-            if not "delta" in avp:
-                print(None, "->", "True")
-            elif avp["delta"] != True:
-                print(avp["delta"], "->", "True")
-            avp["delta"] = True
-
-        else:
-            avp["delta"] = True
+        entry = manifest.get(str(avp["id"]))
+        delta = True if entry is None else entry["delta"]
+        if avp.get("delta") != delta:
+            lg.debug(f"AVP {avp['id']} : delta {avp.get('delta')} -> {delta}")
+        avp["delta"] = delta
     return avps
 
 
@@ -63,50 +43,24 @@ async def refresh_deltas_in_avps_bydate(
     """
     Met à jour les AVPs en fonction de leur date de création.
     Les AVPs plus récents que la date de référence sont placés dans delta,
-    les autres dans data.
+    les autres dans data (mise à jour du manifeste, les PDFs ne bougent pas).
 
     Args:
         siret: SIRET de l'entreprise
         avps: Liste des AVPs à traiter
         reference_date: Date de référence pour le tri
     """
-    save_path = "data/sylae/avps/" + siret
-    delta_save_path = "data/sylae/avps_delta/" + siret
-
-    for avp in avps:
-        avp_file = save_path + "/" + str(avp["id"]) + ".pdf"
-        delta_file = delta_save_path + "/" + str(avp["id"]) + ".pdf"
-
-        # Convertir la date de l'AVP en datetime
-        avp_date = datetime.strptime(avp.get("date", ""), "%d/%m/%Y")
-
-        # Si le fichier existe dans data
-        if await verify_file_exist(avp_file):
-            # Si l'AVP est plus récent que la date de référence, on le déplace dans delta
-            if avp_date > reference_date:
-                os.makedirs(os.path.dirname(delta_file), exist_ok=True)
-                shutil.move(avp_file, delta_file)
-                avp["delta"] = True
-            else:
-                avp["delta"] = False
-                if await verify_file_exist(delta_file):
-                    os.remove(delta_file)
-
-        # Si le fichier existe dans delta
-        elif await verify_file_exist(delta_file):
-            # Si l'AVP est plus ancien que la date de référence, on le déplace dans data
-            if avp_date <= reference_date:
-                os.makedirs(os.path.dirname(avp_file), exist_ok=True)
-                shutil.move(delta_file, avp_file)
-                avp["delta"] = False
-            else:
-                avp["delta"] = True
-
-        # Si le fichier n'existe ni dans data ni dans delta
-        else:
-            # On marque comme delta si plus récent que la date de référence
+    migrate_legacy_pdfs(siret)
+    with update_manifest(siret) as manifest:
+        for avp in avps:
+            # Convertir la date de l'AVP en datetime
+            avp_date = datetime.strptime(avp.get("date", ""), "%d/%m/%Y")
             avp["delta"] = avp_date > reference_date
 
+            entry = manifest.get(str(avp["id"]))
+            if entry is not None:
+                entry["delta"] = avp["delta"]
+
     return avps
 
 
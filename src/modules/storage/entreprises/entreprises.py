@@ -3,28 +3,24 @@ import json
 import logging
 import os
 import shutil
+from typing import Optional
 import src.modules.extract.parsers.constants as constants
 from src.modules.storage.common import VerifyIfDirExistElseCreate
+from src.modules.storage.snapshots.snapshots import forget_folder, load_latest_snapshot, record_snapshot, snapshot_diff
 
 lg = logging.getLogger()
 lg.setLevel(logging.INFO)
 formatter = logging.Formatter('%(asctime)s;%(levelname)s;%(message)s;')
 
-async def save_entreprises(jsontxt : dict):
+async def save_entreprises(jsontxt : dict) -> dict:
     save_path = constants.ENTREPRISE_FOLDER
-    list_of_jsons = map(lambda x : save_path + "/" + x , os.listdir(save_path))
-    if os.listdir(save_path) != []:
-        last_file = max(list_of_jsons, key=os.path.getctime)
-        lg.debug("Vérification de la sauvegarde")
-        with open(last_file,'r') as fr :
-            content = fr.read()
-            if content != json.dumps(jsontxt["items"], indent=4) :
-                await file_save_entreprises(jsontxt)
-            else:
-                lg.info("Last Entreprises Data are already at the last version")
-            fr.close()
+    lg.debug("Vérification de la sauvegarde")
+    diff = snapshot_diff(save_path, jsontxt["items"], "siret")
+    if diff["modified"]:
+        await file_save_entreprises(jsontxt, diff)
     else:
-        await file_save_entreprises(jsontxt)
+        lg.info("Last Entreprises Data are already at the last version")
+    return diff
 
 async def save_new_entreprises(all_ent: list, old_ent: list):
     old_sirets = {str(ent["siret"]) for ent in old_ent} 
@@ -55,11 +51,13 @@ async def save_new_entreprises(all_ent: list, old_ent: list):
     with open(new_entreprise_path,'w') as f :
         f.write(json.dumps(new_ent, indent=4))
         f.close()
+    record_snapshot(constants.NEW_ENTREPRISE_FOLDER, new_entreprise_path)
 
     entreprise_path = f"{constants.ENTREPRISE_FOLDER}/new_entreprises_{datetime.now().strftime("%d-%m-%Y")}.json"
     with open(entreprise_path,'w') as f :
         f.write(json.dumps(new_ent, indent=4))
         f.close()
+    record_snapshot(constants.ENTREPRISE_FOLDER, entreprise_path)
 
 
 async def save_old_entreprises(items : list):
@@ -74,6 +72,7 @@ async def save_old_entreprises(items : list):
     with open(old_entreprise_path,'w') as f :
         f.write(json.dumps(items, indent=4))
         f.close()
+    record_snapshot(constants.ENTREPRISE_FOLDER, old_entreprise_path)
 
 async def clean_all_folders():
     alt_folder = constants.ALTERNANTS_FOLDER
@@ -82,6 +81,13 @@ async def clean_all_folders():
     ent_folder = constants.ENTREPRISE_FOLDER
     session_folder = constants.SESSION_FOLDER
     stat_folder = constants.STAT_FOLDER
+    manifest_folder = constants.MANIFEST_FOLDER
+    if os.path.exists(manifest_folder):
+        shutil.rmtree(manifest_folder)
+
+    for folder in (alt_folder, avp_folder, ent_folder):
+        forget_folder(folder)
+
     if os.path.exists(alt_folder):
         shutil.rmtree(alt_folder)
 
@@ -108,7 +114,7 @@ async def clean_all_folders():
     os.makedirs(stat_folder, exist_ok=True)
 
 
-async def file_save_entreprises(jsontxt : dict):
+async def file_save_entreprises(jsontxt : dict, diff : Optional[dict] = None):
     stat_path = f"{constants.STAT_FOLDER}/stats_{datetime.now().strftime("%d%m%Y-%H-%M-%S")}.json"
     entreprise_path = f"{constants.ENTREPRISE_FOLDER}/entreprise_{datetime.now().strftime("%d%m%Y-%H-%M-%S")}.json"
 
@@ -122,18 +128,15 @@ async def file_save_entreprises(jsontxt : dict):
         f.write(json.dumps(jsontxt["items"], indent=4))
         f.close()
         lg.debug("Fichier : entreprise_" + datetime.now().strftime("%d%m%Y-%H-%M-%S") + ".json créé")
+    record_snapshot(constants.ENTREPRISE_FOLDER, entreprise_path, diff or snapshot_diff(constants.ENTREPRISE_FOLDER, jsontxt["items"], "siret"))
 
 
 async def get_stored_entreprises() -> dict :
     save_path = constants.ENTREPRISE_FOLDER
-    list_of_jsons = map(lambda x : save_path + "/" + x , os.listdir(save_path))
-    if os.listdir(save_path) != []:
-        last_file = max(list_of_jsons, key=os.path.getctime)
+    entreprises = load_latest_snapshot(save_path)
+    if entreprises is not None:
         lg.debug("Récupération de la sauvegarde")
-        with open(last_file,'r') as fr :
-            content = fr.read()
-            fr.close()
-            return json.loads(content)
+        return entreprises
     else:
         lg.error("No entreprises file saved, save entreprises first")
         raise Exception("No entreprises file saved, save entreprises first")
@@ -144,25 +147,15 @@ async def get_old_entreprises(folder_name: str) -> list :
     ent_save_path = f"data/{folder_name}/entreprises"    
     await VerifyIfDirExistElseCreate(ent_save_path)
 
-    jsons = map(lambda x : ent_save_path + "/" + x , os.listdir(ent_save_path))    
-    if os.listdir(ent_save_path) != []:
-        last_file = max(jsons, key=os.path.getctime)
-        with open(last_file,'r') as fr :
-            content = fr.read()
-            fr.close()
-            ent_json = json.loads(content)
-            {result.append(ent) for ent in ent_json}
+    ent_json = load_latest_snapshot(ent_save_path)
+    if ent_json is not None:
+        {result.append(ent) for ent in ent_json}
     
     ent_save_path = f"data/{folder_name}/new_entreprises"  
     await VerifyIfDirExistElseCreate(ent_save_path)
 
-    jsons = map(lambda x : ent_save_path + "/" + x , os.listdir(ent_save_path))
-    if os.listdir(ent_save_path) != []:
-        last_file = max(jsons, key=os.path.getctime)
-        with open(last_file,'r') as fr :
-            content = fr.read()
-            fr.close()
-            ent_json = json.loads(content)
-            {result.append(ent) for ent in ent_json}
+    ent_json = load_latest_snapshot(ent_save_path)
+    if ent_json is not None:
+        {result.append(ent) for ent in ent_json}
     
     return result
\ No newline at end of file
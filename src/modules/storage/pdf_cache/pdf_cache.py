@@ -0,0 +1,74 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List
+
+import src.modules.extract.parsers.constants as constants
+
+# Résultats d'analyse des PDFs d'AVP, par empreinte du PDF et version de l'analyse.
+# Un AVP émis ne change plus : un PDF déjà analysé n'est pas rouvert.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parsed_pdfs (
+    sha256      TEXT NOT NULL,
+    version     TEXT NOT NULL,
+    parsed      TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (sha256, version)
+);
+"""
+
+_schema_ready = False
+
+
+@contextmanager
+def _cache() -> Iterator[sqlite3.Connection]:
+    global _schema_ready
+    os.makedirs(os.path.dirname(constants.PDF_CACHE_FILE), exist_ok=True)
+    conn = sqlite3.connect(constants.PDF_CACHE_FILE, timeout=30)
+    try:
+        if not _schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            _schema_ready = True
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def get_parsed_pdfs(shas: Iterable[str], version: str) -> Dict[str, List[Any]]:
+    """
+    Résultats d'analyse déjà connus.
+
+    Args:
+        shas: Empreintes SHA-256 des PDFs
+        version: Version de l'analyse
+
+    Returns:
+        { empreinte: résultat } pour les PDFs présents dans le cache
+    """
+    shas = list(shas)
+    parsed = {}
+    with _cache() as conn:
+        for i in range(0, len(shas), 500):
+            chunk = shas[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT sha256, parsed FROM parsed_pdfs WHERE version = ? AND sha256 IN ({placeholders})",
+                [version, *chunk],
+            ).fetchall()
+            parsed.update((sha, json.loads(content)) for sha, content in rows)
+    return parsed
+
+
+def save_parsed_pdfs(parsed: Dict[str, List[Any]], version: str) -> None:
+    """Enregistre des résultats d'analyse ({ empreinte: résultat })."""
+    now = time.time()
+    with _cache() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO parsed_pdfs (sha256, version, parsed, created_at) VALUES (?, ?, ?, ?)",
+            [(sha, version, json.dumps(content), now) for sha, content in parsed.items()],
+        )
+
@@ -1,8 +1,15 @@
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 import json
 import logging
 import os
-from typing import Optional
+import tempfile
+from typing import AsyncIterator, Optional
+try:
+    import fcntl
+except ImportError:  # Windows (poste de dev) : pas de verrou entre processus
+    fcntl = None
 #import shutil
 from src.modules.storage.common import VerifyIfDirExistElseCreate
 import src.modules.extract.parsers.constants as constants
@@ -11,34 +18,99 @@ lg = logging.getLogger()
 lg.setLevel(logging.INFO)
 formatter = logging.Formatter('%(asctime)s;%(levelname)s;%(message)s;')
 
+SESSION_DATE_FORMAT = "%d%m%Y-%H-%M-%S"
+
+# Session courante gardée en mémoire : le fichier ne sert qu'au partage entre processus
+_session_cache : dict = {}
+_folders_ready = False
+
+async def _create_folders():
+    """Crée une seule fois par processus tous les dossiers necessaires."""
+    global _folders_ready
+    if _folders_ready:
+        return
+    await VerifyIfDirExistElseCreate(constants.ENTREPRISE_FOLDER)
+    await VerifyIfDirExistElseCreate(constants.NEW_ENTREPRISE_FOLDER)
+    await VerifyIfDirExistElseCreate(constants.SESSION_FOLDER)
+    await VerifyIfDirExistElseCreate(constants.ALTERNANTS_FOLDER)
+    await VerifyIfDirExistElseCreate(constants.AVPS_FOLDER)
+    await VerifyIfDirExistElseCreate(constants.AVPS_DELTA_FOLDER)
+    await VerifyIfDirExistElseCreate(constants.EXCEL_FOLDER)
+    await VerifyIfDirExistElseCreate(constants.STAT_FOLDER)
+    _folders_ready = True
+
 async def cache_session(sessionId : str, expiration : str):
-    #Création de tous les dossiers necessaire
-    if not os.path.exists(f"{constants.SESSION_FOLDER}/{constants.SESSION_FILENAME}"):
-        await VerifyIfDirExistElseCreate(constants.ENTREPRISE_FOLDER)
-        await VerifyIfDirExistElseCreate(constants.NEW_ENTREPRISE_FOLDER)
-        await VerifyIfDirExistElseCreate(constants.SESSION_FOLDER)
-        await VerifyIfDirExistElseCreate(constants.ALTERNANTS_FOLDER)
-        await VerifyIfDirExistElseCreate(constants.AVPS_FOLDER)
-        await VerifyIfDirExistElseCreate(constants.AVPS_DELTA_FOLDER)
-        await VerifyIfDirExistElseCreate(constants.EXCEL_FOLDER)
-        await VerifyIfDirExistElseCreate(constants.STAT_FOLDER)
-
-    expiration = (datetime.now() + timedelta(minutes=15)).strftime("%d%m%Y-%H-%M-%S")
-    session = {"SessionId" : sessionId, "Expired" : expiration}    
+    await _create_folders()
+
+    expires = datetime.now() + timedelta(minutes=15)
+    _session_cache.update({"SessionId" : sessionId, "Expired" : expires})
+
+    session = {"SessionId" : sessionId, "Expired" : expires.strftime(SESSION_DATE_FORMAT)}
     file_path = f"{constants.SESSION_FOLDER}/{constants.SESSION_FILENAME}"
 
-    with open(file_path,'w') as fw :
-        fw.write(json.dumps(session, indent=4, default=str))
-        fw.close()
-        
+    # Écriture dans un fichier temporaire puis renommage atomique :
+    # les autres workers lisent toujours un fichier complet
+    fd, tmp_path = tempfile.mkstemp(dir=constants.SESSION_FOLDER, prefix=".session_")
+    try:
+        with os.fdopen(fd, 'w') as fw :
+            fw.write(json.dumps(session, indent=4, default=str))
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
 async def get_cached_session() -> Optional[str] : 
+    """
+    Retourne la session en cours si elle n'a pas expiré.
+
+    La session en mémoire est lue en priorité ; le fichier n'est consulté que
+    si elle est absente ou expirée (session ouverte par un autre processus).
+    """
+    now = datetime.now()
+    if _session_cache and _session_cache["Expired"] > now:
+        return _session_cache["SessionId"]
+
     file_path = f"{constants.SESSION_FOLDER}/{constants.SESSION_FILENAME}"
     if os.path.exists(file_path):
         with open(file_path,'r') as fr :
             content = json.loads(fr.read())
-            if datetime.strptime(content["Expired"],"%d%m%Y-%H-%M-%S") < datetime.now():
-                return None
-            else:
-                return content["SessionId"]
+        expires = datetime.strptime(content["Expired"], SESSION_DATE_FORMAT)
+        if expires < now:
+            return None
+        _session_cache.update({"SessionId" : content["SessionId"], "Expired" : expires})
+        return content["SessionId"]
     else:
-        return None
\ No newline at end of file
+        return None
+
+# Intervalle entre deux demandes du verrou de session (secondes)
+_SESSION_LOCK_POLL = 0.2
+
+@asynccontextmanager
+async def session_refresh_lock() -> AsyncIterator[None]:
+    """
+    Verrou exclusif entre les workers uvicorn pendant une connexion à Sylaé.
+
+    Un seul worker se connecte à Sylaé ; pour la session partagée, les autres
+    attendent le verrou puis relisent la session qu'il vient d'écrire. Les
+    connexions des pools de sessions passent aussi par ce verrou. Le verrou
+    est demandé sans blocage et redemandé périodiquement : aucun thread
+    n'est occupé pendant l'attente, qui peut être annulée proprement.
+    """
+    if fcntl is None:
+        yield
+        return
+    await _create_folders()
+    lock_file = open(f"{constants.SESSION_FOLDER}/{constants.SESSION_FILENAME}.lock", 'w')
+    try:
+        while True:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(_SESSION_LOCK_POLL)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    finally:
+        lock_file.close()
@@ -0,0 +1,223 @@
+import itertools
+import json
+from concurrent.futures import Executor
+from typing import Any, Dict, List
+
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson absent : module json standard
+    orjson = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow absent : pas de codec Parquet
+    pa = None
+    pq = None
+
+import src.config as config
+
+import logging
+
+lg = logging.getLogger()
+
+
+def _dumps_compact(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _loads(content: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class JsonCodec:
+    """Format historique : un document JSON indenté par sauvegarde."""
+
+    name = "json"
+    extension = ".json"
+
+    def dump(self, payload: Any, path: str) -> None:
+        with open(path, "w") as f:
+            f.write(json.dumps(payload, indent=4))
+
+    def load(self, path: str) -> Any:
+        with open(path, "rb") as fr:
+            return _loads(fr.read())
+
+    def load_frame(self, path: str) -> pd.DataFrame:
+        return pd.DataFrame.from_dict(self.load(path))
+
+    def load_frames(self, paths: List[str], executor: Executor) -> pd.DataFrame:
+        """Charge plusieurs sauvegardes en un seul DataFrame, construit en une passe."""
+        records = list(itertools.chain.from_iterable(executor.map(self.load, paths)))
+        return pd.DataFrame.from_dict(records)
+
+
+class JsonLinesCodec:
+    """Un enregistrement JSON compact par ligne (orjson si disponible)."""
+
+    name = "jsonl"
+    extension = ".jsonl"
+
+    def dump(self, payload: List[Dict], path: str) -> None:
+        with open(path, "wb") as f:
+            for record in payload:
+                f.write(_dumps_compact(record))
+                f.write(b"\n")
+
+    def load(self, path: str) -> List[Dict]:
+        with open(path, "rb") as fr:
+            return [_loads(line) for line in fr if line.strip()]
+
+    def load_frame(self, path: str) -> pd.DataFrame:
+        return pd.DataFrame.from_records(self.load(path))
+
+    def load_frames(self, paths: List[str], executor: Executor) -> pd.DataFrame:
+        """Charge plusieurs sauvegardes en un seul DataFrame, construit en une passe."""
+        records = list(itertools.chain.from_iterable(executor.map(self.load, paths)))
+        return pd.DataFrame.from_records(records)
+
+
+class ParquetCodec:
+    """
+    Format colonnaire Parquet (pyarrow).
+
+    Chaque colonne est construite à partir des valeurs Python des
+    enregistrements (sans passer par pandas) : les entiers restent des
+    entiers, y compris avec des valeurs nulles. Les colonnes imbriquées ou de
+    types mélangés (employeur, details, ...) sont stockées en JSON et décodées
+    au chargement. Les champs absents d'un enregistrement sont notés dans une
+    colonne technique et retirés à la relecture : load() rend exactement les
+    enregistrements sauvegardés.
+    """
+
+    name = "parquet"
+    extension = ".parquet"
+    _METADATA_KEY = b"json_columns"
+    _MISSING_COLUMN = "__missing__"
+
+    def _json_column(self, values: List[Any]) -> bool:
+        types = {type(value) for value in values if value is not None}
+        return len(types) > 1 or bool(types & {dict, list})
+
+    def _json_array(self, values: List[Any]):
+        return pa.array(
+            [None if value is None else _dumps_compact(value).decode("utf-8") for value in values],
+            pa.string(),
+        )
+
+    def dump(self, payload: List[Dict], path: str) -> None:
+        columns = list(dict.fromkeys(itertools.chain.from_iterable(payload)))
+        arrays = {}
+        json_columns = []
+        for column in columns:
+            values = [record.get(column) for record in payload]
+            if not self._json_column(values):
+                try:
+                    arrays[column] = pa.array(values)
+                    continue
+                except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+                    # Valeurs non gérées par Arrow : conservées en JSON
+                    pass
+            json_columns.append(column)
+            arrays[column] = self._json_array(values)
+        missing = [[column for column in columns if column not in record] for record in payload]
+        if any(missing):
+            arrays[self._MISSING_COLUMN] = self._json_array([keys or None for keys in missing])
+        table = pa.table(arrays) if arrays else pa.table({self._MISSING_COLUMN: pa.array([], pa.string())})
+        metadata = {self._METADATA_KEY: json.dumps(json_columns).encode()}
+        pq.write_table(table.replace_schema_metadata(metadata), path, compression="zstd")
+
+    def _read(self, path: str):
+        # Petits fichiers lus depuis un pool de threads : pas de threads pyarrow en plus
+        table = pq.ParquetFile(path).read(use_threads=False)
+        json_columns = json.loads((table.schema.metadata or {}).get(self._METADATA_KEY, b"[]"))
+        return table, json_columns
+
+    def load(self, path: str) -> List[Dict]:
+        table, json_columns = self._read(path)
+        records = table.to_pylist()
+        for record in records:
+            missing = record.pop(self._MISSING_COLUMN, None)
+            for column in json_columns:
+                if record[column] is not None:
+                    record[column] = _loads(record[column])
+            if missing is not None:
+                for column in _loads(missing):
+                    del record[column]
+        return records
+
+    def _to_frame(self, table, json_columns: List[str]) -> pd.DataFrame:
+        # Champs absents : NaN / None dans le DataFrame, comme avec les codecs JSON
+        if self._MISSING_COLUMN in table.column_names:
+            table = table.drop_columns([self._MISSING_COLUMN])
+        frame = table.to_pandas()
+        for column in json_columns:
+            frame[column] = frame[column].map(lambda value: None if value is None else _loads(value))
+        return frame
+
+    def load_frame(self, path: str) -> pd.DataFrame:
+        return self._to_frame(*self._read(path))
+
+    def load_frames(self, paths: List[str], executor: Executor) -> pd.DataFrame:
+        """
+        Charge plusieurs sauvegardes en un seul DataFrame.
+
+        Les fichiers sont lus en parallèle (pyarrow libère le GIL), les tables
+        Arrow concaténées, puis converties en une seule fois. Si les schémas
+        ne s'accordent pas, chaque fichier est converti séparément.
+        """
+        tables = list(executor.map(self._read, paths))
+        json_columns = [columns for _, columns in tables]
+        if all(columns == json_columns[0] for columns in json_columns):
+            try:
+                table = pa.concat_tables([table for table, _ in tables], promote_options="default")
+                return self._to_frame(table, json_columns[0])
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                lg.debug(f"Schémas Parquet incompatibles, conversion fichier par fichier : {e}")
+        frames = [self._to_frame(table, columns) for table, columns in tables]
+        return pd.concat(frames, ignore_index=True)
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), JsonLinesCodec())}
+if pa is not None:
+    CODECS[ParquetCodec.name] = ParquetCodec()
+
+EXTENSIONS = {codec.extension: codec for codec in CODECS.values()}
+
+_parquet_warned = False
+
+
+def get_codec(payload: Any = None):
+    """
+    Codec d'écriture des sauvegardes (SNAPSHOT_CODEC).
+
+    Seules les listes d'enregistrements passent par les formats JSON Lines /
+    Parquet ; tout autre contenu reste en JSON.
+    """
+    global _parquet_warned
+    name = config.SNAPSHOT_CODEC
+    if name not in CODECS:
+        if name == ParquetCodec.name:
+            if not _parquet_warned:
+                lg.warning("pyarrow n'est pas installé, sauvegardes en JSON Lines")
+                _parquet_warned = True
+            name = JsonLinesCodec.name
+        else:
+            raise Exception(f"Format de sauvegarde inconnu : {name}")
+    if name != JsonCodec.name and not isinstance(payload, list):
+        return CODECS[JsonCodec.name]
+    return CODECS[name]
+
+
+def codec_for_path(path: str):
+    """Codec de lecture d'une sauvegarde, d'après son extension."""
+    for extension, codec in EXTENSIONS.items():
+        if path.endswith(extension):
+            return codec
+    raise Exception(f"Format de sauvegarde non reconnu : {path}")
@@ -0,0 +1,361 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+import src.config as config
+import src.modules.extract.parsers.constants as constants
+from src.modules.storage.snapshots.codecs import EXTENSIONS, codec_for_path
+
+import logging
+
+lg = logging.getLogger()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    folder      TEXT NOT NULL,
+    path        TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    digest      TEXT,
+    records     TEXT,
+    PRIMARY KEY (folder, path)
+);
+CREATE TABLE IF NOT EXISTS current (
+    folder      TEXT PRIMARY KEY,
+    path        TEXT NOT NULL
+);
+"""
+
+_schema_ready = False
+
+
+class SnapshotMissing(Exception):
+    """Aucune sauvegarde pour un ou plusieurs dossiers."""
+
+    def __init__(self, folders: List[str]):
+        super().__init__(f"Aucune sauvegarde pour {', '.join(folders)}")
+        self.folders = folders
+
+
+@contextmanager
+def _catalog() -> Iterator[sqlite3.Connection]:
+    """
+    Connexion au catalogue des sauvegardes JSON.
+
+    Le catalogue est partagé par les workers uvicorn : WAL et délai d'attente
+    pour les écritures concurrentes.
+    """
+    global _schema_ready
+    os.makedirs(os.path.dirname(constants.CATALOG_FILE), exist_ok=True)
+    conn = sqlite3.connect(constants.CATALOG_FILE, timeout=30)
+    try:
+        if not _schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # Catalogues créés avant les empreintes de contenu
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(snapshots)")}
+            for column in ("digest", "records"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE snapshots ADD COLUMN {column} TEXT")
+            _schema_ready = True
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _scan_latest(folder: str) -> Optional[str]:
+    """Ancienne méthode : sauvegarde la plus récente du dossier, par date de création."""
+    if not os.path.isdir(folder):
+        return None
+    jsons = [
+        f"{folder}/{name}" for name in os.listdir(folder)
+        if os.path.splitext(name)[1] in EXTENSIONS
+    ]
+    if not jsons:
+        return None
+    return max(jsons, key=os.path.getctime)
+
+
+def content_digest(payload: Any) -> str:
+    """
+    Empreinte SHA-256 canonique d'un contenu JSON.
+
+    Clés triées et encodage compact : deux contenus égaux ont la même
+    empreinte quel que soit l'ordre des clés ou l'indentation du fichier.
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def record_digests(payload: Any, key: Optional[str]) -> Dict[str, str]:
+    """
+    Empreinte de chaque enregistrement d'une sauvegarde, par identifiant.
+
+    Args:
+        payload: Liste d'enregistrements (AVPs, alternants, entreprises)
+        key: Champ identifiant les enregistrements ("id", "siret"), None pour ne pas détailler
+
+    Returns:
+        { identifiant: empreinte } pour les enregistrements qui ont ce champ
+    """
+    if key is None or not isinstance(payload, list):
+        return {}
+    return {
+        str(record[key]): content_digest(record)
+        for record in payload
+        if isinstance(record, dict) and key in record
+    }
+
+
+def diff_records(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, List[str]]:
+    """Identifiants des enregistrements ajoutés, modifiés et supprimés entre deux sauvegardes."""
+    return {
+        "added": [record_id for record_id in new if record_id not in old],
+        "changed": [record_id for record_id in new if record_id in old and old[record_id] != new[record_id]],
+        "removed": [record_id for record_id in old if record_id not in new],
+    }
+
+
+def current_digests(folder: str, key: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Empreintes de la sauvegarde courante d'un dossier.
+
+    Une sauvegarde enregistrée sans empreinte (antérieure aux empreintes ou
+    reprise d'un ancien dossier) est lue une seule fois pour les calculer.
+
+    Returns:
+        {"digest": ..., "records": {identifiant: empreinte}}, ou None si aucune sauvegarde
+    """
+    path = latest_snapshot(folder)
+    if path is None:
+        return None
+    with _catalog() as conn:
+        row = conn.execute(
+            "SELECT digest, records FROM snapshots WHERE folder = ? AND path = ?", (folder, path)
+        ).fetchone()
+    if row is not None and row[0] is not None:
+        return {"digest": row[0], "records": json.loads(row[1] or "{}")}
+
+    payload = codec_for_path(path).load(path)
+    digests = {"digest": content_digest(payload), "records": record_digests(payload, key)}
+    with _catalog() as conn:
+        conn.execute(
+            "UPDATE snapshots SET digest = ?, records = ? WHERE folder = ? AND path = ?",
+            (digests["digest"], json.dumps(digests["records"]), folder, path),
+        )
+    return digests
+
+
+def snapshot_diff(folder: str, payload: Any, key: Optional[str] = "id") -> Dict[str, Any]:
+    """
+    Compare un nouveau contenu à la sauvegarde courante, par empreintes.
+
+    Seul le nouveau contenu est sérialisé ; l'ancienne sauvegarde n'est pas relue.
+
+    Args:
+        folder: Dossier des sauvegardes
+        payload: Nouveau contenu
+        key: Champ identifiant les enregistrements
+
+    Returns:
+        {"modified": bool, "digest", "records", "added", "changed", "removed"}
+    """
+    digest = content_digest(payload)
+    records = record_digests(payload, key)
+    current = current_digests(folder, key)
+    if current is None:
+        diff = diff_records({}, records)
+    else:
+        diff = diff_records(current["records"], records)
+    modified = current is None or current["digest"] != digest
+    if modified and (diff["added"] or diff["changed"] or diff["removed"]):
+        lg.info(
+            f"{folder} : {len(diff['added'])} ajout(s), {len(diff['changed'])} modification(s), "
+            f"{len(diff['removed'])} suppression(s)"
+        )
+    return {"modified": modified, "digest": digest, "records": records, **diff}
+
+
+def record_snapshot(folder: str, path: str, diff: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Enregistre une nouvelle sauvegarde et en fait la version courante du dossier.
+
+    Les sauvegardes au-delà de SNAPSHOT_RETENTION sont supprimées.
+
+    Args:
+        folder: Dossier des sauvegardes
+        path: Chemin du JSON écrit
+        diff: Résultat de snapshot_diff, pour conserver les empreintes de la sauvegarde
+    """
+    digest = diff["digest"] if diff else None
+    records = json.dumps(diff["records"]) if diff else None
+    with _catalog() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshots (folder, path, created_at, digest, records) VALUES (?, ?, ?, ?, ?)",
+            (folder, path, time.time(), digest, records),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO current (folder, path) VALUES (?, ?)",
+            (folder, path),
+        )
+    compact_snapshots(folder)
+
+
+def latest_snapshot(folder: str) -> Optional[str]:
+    """
+    Chemin de la sauvegarde courante d'un dossier.
+
+    Lecture directe du pointeur dans le catalogue ; le dossier n'est parcouru
+    que si le pointeur manque ou vise un fichier disparu (sauvegardes
+    antérieures au catalogue), et le pointeur est alors renseigné.
+
+    Returns:
+        Le chemin du JSON, ou None si le dossier n'a aucune sauvegarde
+    """
+    with _catalog() as conn:
+        row = conn.execute("SELECT path FROM current WHERE folder = ?", (folder,)).fetchone()
+    if row is not None and os.path.exists(row[0]):
+        return row[0]
+
+    path = _scan_latest(folder)
+    if path is not None:
+        with _catalog() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (folder, path, created_at) VALUES (?, ?, ?)",
+                (folder, path, os.path.getctime(path)),
+            )
+            conn.execute("INSERT OR REPLACE INTO current (folder, path) VALUES (?, ?)", (folder, path))
+    return path
+
+
+def latest_snapshots(folders: Iterable[str]) -> Dict[str, Optional[str]]:
+    """
+    Chemins des sauvegardes courantes de plusieurs dossiers.
+
+    Les pointeurs sont lus en quelques requêtes groupées ; seuls les dossiers
+    sans pointeur valide repassent par latest_snapshot.
+
+    Returns:
+        { dossier: chemin du JSON ou None }
+    """
+    folders = list(folders)
+    paths: Dict[str, Optional[str]] = {}
+    with _catalog() as conn:
+        for i in range(0, len(folders), 500):
+            chunk = folders[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            paths.update(conn.execute(
+                f"SELECT folder, path FROM current WHERE folder IN ({placeholders})", chunk
+            ).fetchall())
+    return {
+        folder: paths[folder] if folder in paths and os.path.exists(paths[folder]) else latest_snapshot(folder)
+        for folder in folders
+    }
+
+
+def load_latest_snapshot(folder: str) -> Optional[Any]:
+    """Contenu de la sauvegarde courante d'un dossier (None si aucune)."""
+    path = latest_snapshot(folder)
+    if path is None:
+        return None
+    return codec_for_path(path).load(path)
+
+
+def load_latest_frame(folder: str) -> Optional[pd.DataFrame]:
+    """
+    Sauvegarde courante d'un dossier chargée directement en DataFrame.
+
+    Avec le format Parquet, les colonnes sont lues sans construire de dicts
+    intermédiaires.
+
+    Returns:
+        Le DataFrame, ou None si le dossier n'a aucune sauvegarde
+    """
+    path = latest_snapshot(folder)
+    if path is None:
+        return None
+    return codec_for_path(path).load_frame(path)
+
+
+def load_latest_frames(folders: Iterable[str], workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Charge les sauvegardes courantes de plusieurs dossiers en un seul DataFrame.
+
+    Les fichiers sont lus en parallèle sur un pool de threads et le DataFrame
+    est construit en une seule passe (tables Arrow concaténées pour Parquet,
+    enregistrements mis bout à bout pour JSON), dans l'ordre des dossiers.
+
+    Args:
+        folders: Dossiers des sauvegardes
+        workers: Nombre de lectures simultanées (SNAPSHOT_LOAD_WORKERS par défaut)
+
+    Returns:
+        Le DataFrame de toutes les sauvegardes
+
+    Raises:
+        SnapshotMissing: si un dossier n'a aucune sauvegarde
+    """
+    folders = list(folders)
+    current = latest_snapshots(folders)
+    missing = [folder for folder, path in current.items() if path is None]
+    if missing:
+        raise SnapshotMissing(missing)
+    paths = [current[folder] for folder in folders]
+    if not paths:
+        return pd.DataFrame()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers or config.SNAPSHOT_LOAD_WORKERS)) as executor:
+        codecs = {codec_for_path(path) for path in paths}
+        if len(codecs) == 1:
+            return codecs.pop().load_frames(paths, executor)
+        # Formats mélangés (migration en cours) : un DataFrame par fichier
+        frames = executor.map(lambda path: codec_for_path(path).load_frame(path), paths)
+        return pd.concat(list(frames), ignore_index=True)
+
+
+def compact_snapshots(folder: str, keep: Optional[int] = None) -> int:
+    """
+    Supprime les sauvegardes les plus anciennes d'un dossier.
+
+    Seules les sauvegardes connues du catalogue sont supprimées ; la
+    version courante est toujours conservée.
+
+    Args:
+        folder: Dossier des sauvegardes
+        keep: Nombre de sauvegardes à conserver (SNAPSHOT_RETENTION par défaut)
+
+    Returns:
+        Nombre de sauvegardes supprimées
+    """
+    keep = max(1, keep or config.SNAPSHOT_RETENTION)
+    with _catalog() as conn:
+        current = conn.execute("SELECT path FROM current WHERE folder = ?", (folder,)).fetchone()
+        rows = conn.execute(
+            "SELECT path FROM snapshots WHERE folder = ? ORDER BY created_at DESC LIMIT -1 OFFSET ?",
+            (folder, keep),
+        ).fetchall()
+        old = [path for (path,) in rows if current is None or path != current[0]]
+        conn.executemany(
+            "DELETE FROM snapshots WHERE folder = ? AND path = ?",
+            [(folder, path) for path in old],
+        )
+    for path in old:
+        if os.path.exists(path):
+            os.remove(path)
+    if old:
+        lg.debug(f"{len(old)} ancienne(s) sauvegarde(s) supprimée(s) dans {folder}")
+    return len(old)
+
+
+def forget_folder(folder: str) -> None:
+    """Retire un dossier du catalogue (dossier vidé ou supprimé)."""
+    with _catalog() as conn:
+        conn.execute("DELETE FROM snapshots WHERE folder = ? OR folder LIKE ?", (folder, f"{folder}/%"))
+        conn.execute("DELETE FROM current WHERE folder = ? OR folder LIKE ?", (folder, f"{folder}/%"))
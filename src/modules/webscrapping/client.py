@@ -0,0 +1,286 @@
+import asyncio
+import importlib.util
+import logging
+from contextlib import asynccontextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import AsyncIterator, Dict, Optional, Set
+
+import httpx
+
+import src.config as config
+
+lg = logging.getLogger()
+
+MAX_REDIRECTS = 10
+# Fragments d'URL d'une page de connexion : une redirection vers l'une d'elles signifie que la session a expiré
+LOGIN_URL_MARKERS = ("login", "authentification", "connexion")
+
+
+class SylaeOverloadError(Exception):
+    """Sylaé a renvoyé une page vide ("\\n\\n\\n") ou une erreur 5xx."""
+
+
+class SylaeAuthError(Exception):
+    """Sylaé a refusé la session (401 ou redirection vers la page de connexion)."""
+
+
+def is_overloaded(response: httpx.Response) -> bool:
+    """Indique si la réponse trahit une saturation de Sylaé."""
+    return response.status_code >= 500 or response.text.startswith("\n\n\n")
+
+
+def is_auth_failure(response: httpx.Response, redirected: bool) -> bool:
+    """Indique si Sylaé a rejeté la session (expirée ou invalidée)."""
+    if response.status_code == 401:
+        return True
+    url = str(response.url).lower()
+    return redirected and any(marker in url for marker in LOGIN_URL_MARKERS)
+
+
+class SylaeClient:
+    """
+    Client HTTP asynchrone partagé pour toutes les requêtes Sylaé.
+
+    Les connexions sont conservées dans un pool keep-alive (HTTP/2 si le paquet
+    `h2` est installé) au lieu d'ouvrir une connexion TCP/TLS par requête.
+    Le JSESSIONID est passé à chaque appel : le client ne conserve aucun cookie,
+    ce qui permet de partager le même pool entre plusieurs sessions Sylaé.
+
+    Sylaé mémorise côté serveur l'employeur sélectionné pour chaque session.
+    Le client retient cette sélection par JSESSIONID pour éviter les appels
+    VERIFID_URL redondants, et `employer_lease` réserve une session à un
+    employeur le temps d'un traitement pour que deux employeurs ne se
+    disputent jamais le même contexte. Seules les sessions ouvertes par ce
+    processus (`own_session`) profitent de ce cache : une session partagée
+    avec d'autres workers peut changer d'employeur à tout moment.
+    """
+
+    def __init__(
+        self,
+        timeout: float = config.SYLAE_HTTP_TIMEOUT,
+        connect_timeout: float = config.SYLAE_HTTP_CONNECT_TIMEOUT,
+        max_connections: int = config.SYLAE_HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = config.SYLAE_HTTP_MAX_KEEPALIVE,
+        max_per_host: int = config.SYLAE_HTTP_MAX_PER_HOST,
+        http2: bool = config.SYLAE_HTTP2,
+        employer_affinity: bool = config.SYLAE_EMPLOYER_AFFINITY,
+    ):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        )
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.max_per_host = max_per_host
+        self.employer_affinity = employer_affinity
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        # Employeur sélectionné côté serveur, par JSESSIONID
+        self._selected_employers: Dict[str, str] = {}
+        # Sessions ouvertes par ce processus, qu'aucun autre worker n'utilise
+        self._owned_sessions: Set[str] = set()
+        self._select_locks: Dict[str, asyncio.Lock] = {}
+        # Baux employeur : employeur propriétaire et nombre de détenteurs par JSESSIONID
+        self._lease_owners: Dict[str, str] = {}
+        self._lease_holders: Dict[str, int] = {}
+        self._lease_condition = asyncio.Condition()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            # Jar qui refuse tous les cookies : la session est portée par l'appelant
+            jar = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=self.limits,
+                timeout=self.timeout,
+                cookies=jar,
+                follow_redirects=False,
+            )
+            lg.info(f"Client HTTP Sylaé initialisé (http2={self.http2})")
+        return self._client
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = httpx.URL(url).host
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_slots[host]
+
+    async def _send(
+        self, method: str, url: str, sessionID: str, stream: bool, **kwargs
+    ) -> httpx.Response:
+        client = self._get_client()
+        cookie = f"JSESSIONID={sessionID}"
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["Cookie"] = cookie
+
+        request = client.build_request(method, url, headers=headers, **kwargs)
+        response = await client.send(request, stream=stream)
+        redirected = False
+        for _ in range(MAX_REDIRECTS):
+            if not response.is_redirect or response.next_request is None:
+                break
+            next_request = response.next_request
+            next_request.headers["Cookie"] = cookie
+            await response.aclose()
+            response = await client.send(next_request, stream=stream)
+            redirected = True
+
+        if is_auth_failure(response, redirected):
+            await response.aclose()
+            self.forget_session(sessionID)
+            raise SylaeAuthError(f"Session Sylaé rejetée ({response.status_code} {response.url})")
+        return response
+
+    async def request(
+        self, method: str, url: str, sessionID: str, **kwargs
+    ) -> httpx.Response:
+        """
+        Envoie une requête Sylaé avec le cookie de session donné.
+
+        Les redirections sont suivies manuellement pour conserver le cookie
+        JSESSIONID, que httpx retire lors d'une redirection.
+
+        Args:
+            method: Méthode HTTP
+            url: URL Sylaé
+            sessionID: JSESSIONID à utiliser
+            **kwargs: Arguments passés à httpx (data, params, ...)
+
+        Returns:
+            La réponse finale après redirections
+
+        Raises:
+            SylaeAuthError: si Sylaé rejette la session
+        """
+        async with self._host_slot(url):
+            return await self._send(method, url, sessionID, stream=False, **kwargs)
+
+    @asynccontextmanager
+    async def stream(
+        self, method: str, url: str, sessionID: str, **kwargs
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Comme `request`, mais le corps de la réponse n'est pas chargé en mémoire.
+
+        Le corps se lit par morceaux avec `response.aiter_bytes()` à
+        l'intérieur du bloc ; la connexion est rendue au pool à la sortie.
+
+        Yields:
+            La réponse finale après redirections, corps non lu
+        """
+        async with self._host_slot(url):
+            response = await self._send(method, url, sessionID, stream=True, **kwargs)
+            try:
+                yield response
+            finally:
+                await response.aclose()
+
+    async def get(self, url: str, sessionID: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, sessionID, **kwargs)
+
+    async def post(self, url: str, sessionID: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, sessionID, **kwargs)
+
+    async def select_employer(self, sessionID: str, empId: str) -> None:
+        """
+        Sélectionne l'employeur côté serveur pour la session donnée.
+
+        Pour une session propre au processus, l'appel VERIFID_URL n'est envoyé
+        que si un autre employeur (ou aucun) est actuellement sélectionné ;
+        pour toute autre session, il est envoyé à chaque fois.
+
+        Args:
+            sessionID: JSESSIONID de la session
+            empId: ID de l'employeur à sélectionner
+        """
+        empId = str(empId)
+        if self._is_selected(sessionID, empId):
+            return
+        lock = self._select_locks.setdefault(sessionID, asyncio.Lock())
+        async with lock:
+            if self._is_selected(sessionID, empId):
+                return
+            r = await self.post(config.VERIFID_URL + empId, sessionID)
+            if r.is_success:
+                self._selected_employers[sessionID] = empId
+            else:
+                self._selected_employers.pop(sessionID, None)
+                lg.warning(f"Sélection de l'employeur {empId} refusée ({r.status_code})")
+
+    def _is_selected(self, sessionID: str, empId: str) -> bool:
+        return (
+            self.employer_affinity
+            and sessionID in self._owned_sessions
+            and self._selected_employers.get(sessionID) == empId
+        )
+
+    def own_session(self, sessionID: str) -> None:
+        """Déclare une session ouverte par ce processus et utilisée par lui seul."""
+        self._owned_sessions.add(sessionID)
+
+    def forget_session(self, sessionID: str) -> None:
+        """Oublie l'employeur sélectionné pour une session expirée ou remplacée."""
+        self._selected_employers.pop(sessionID, None)
+        self._select_locks.pop(sessionID, None)
+        self._owned_sessions.discard(sessionID)
+
+    def is_leasable(self, sessionID: str, empId: str) -> bool:
+        """Indique si la session est libre ou déjà réservée à cet employeur."""
+        return (
+            self._lease_holders.get(sessionID, 0) == 0
+            or self._lease_owners.get(sessionID) == str(empId)
+        )
+
+    @asynccontextmanager
+    async def employer_lease(self, sessionID: str, empId: str) -> AsyncIterator[str]:
+        """
+        Réserve une session à un employeur le temps du bloc.
+
+        Plusieurs tâches du même employeur partagent la session ; un autre
+        employeur attend que tous les détenteurs l'aient libérée.
+
+        Args:
+            sessionID: JSESSIONID à réserver
+            empId: ID de l'employeur
+
+        Yields:
+            Le JSESSIONID réservé
+        """
+        empId = str(empId)
+        async with self._lease_condition:
+            await self._lease_condition.wait_for(lambda: self.is_leasable(sessionID, empId))
+            self._lease_owners[sessionID] = empId
+            self._lease_holders[sessionID] = self._lease_holders.get(sessionID, 0) + 1
+        try:
+            yield sessionID
+        finally:
+            async with self._lease_condition:
+                self._lease_holders[sessionID] -= 1
+                if self._lease_holders[sessionID] == 0:
+                    del self._lease_holders[sessionID]
+                    del self._lease_owners[sessionID]
+                self._lease_condition.notify_all()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_sylae_client: Optional[SylaeClient] = None
+
+
+def get_sylae_client() -> SylaeClient:
+    """Retourne le client Sylaé partagé du worker, créé à la première utilisation."""
+    global _sylae_client
+    if _sylae_client is None:
+        _sylae_client = SylaeClient()
+    return _sylae_client
+
+
+async def close_sylae_client() -> None:
+    """Ferme le pool de connexions du client partagé (arrêt de l'application)."""
+    global _sylae_client
+    if _sylae_client is not None:
+        await _sylae_client.aclose()
+        _sylae_client = None
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+
+lg = logging.getLogger()
+
+
+class AdaptiveLimiter:
+    """
+    Limite de concurrence adaptative (AIMD) pour les appels à Sylaé.
+
+    La limite augmente d'un slot après une fenêtre complète de succès et
+    est divisée par deux dès que Sylaé montre des signes de saturation
+    (page vide "\\n\\n\\n", erreur 5xx, timeout).
+
+    Utilisation :
+        async with limiter:
+            ...
+        await limiter.success()   # ou await limiter.overload()
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 16):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self._active = 0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self) -> "AdaptiveLimiter":
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        async with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    async def success(self) -> None:
+        """Signale un appel réussi : la limite remonte après une fenêtre de succès."""
+        async with self._condition:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+                lg.debug(f"Concurrence Sylaé augmentée à {self.limit}")
+                self._condition.notify_all()
+
+    async def overload(self) -> None:
+        """Signale une saturation de Sylaé : la limite est divisée par deux."""
+        async with self._condition:
+            self._successes = 0
+            new_limit = max(self.minimum, self.limit // 2)
+            if new_limit != self.limit:
+                lg.warning(f"Sylaé saturé, concurrence réduite de {self.limit} à {new_limit}")
+                self.limit = new_limit
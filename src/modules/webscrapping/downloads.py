@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import random
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+import src.config as config
+from src.modules.storage.blobs.blobs import BlobWriter
+
+from .client import SylaeAuthError, SylaeClient, get_sylae_client
+
+lg = logging.getLogger()
+
+# Un PDF vide fait environ 1KB : en dessous, le fichier est considéré corrompu
+MIN_PDF_SIZE = 1024
+
+
+class PdfDownloadError(Exception):
+    """Le PDF n'a pas pu être récupéré après toutes les tentatives."""
+
+
+def _check_status(avp_id: str, response: httpx.Response) -> None:
+    if not response.is_success or response.status_code != 200:
+        raise PdfDownloadError(f"PDF {avp_id} refusé par le serveur ({response.status_code})")
+
+
+def _check_body(avp_id: str, head: bytes, size: int) -> None:
+    if not size or head.startswith(b"\n\n\n"):
+        raise PdfDownloadError(f"PDF {avp_id} vide")
+    if size < MIN_PDF_SIZE:
+        raise PdfDownloadError(f"PDF {avp_id} trop petit ({size} bytes) - probablement corrompu")
+
+
+def _conditional_headers(validators: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    headers = {}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _response_validators(response: httpx.Response) -> Dict[str, str]:
+    validators = {}
+    if response.headers.get("ETag"):
+        validators["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        validators["last_modified"] = response.headers["Last-Modified"]
+    return validators
+
+
+async def _fetch_pdf(
+    client: SylaeClient,
+    sessionID: str,
+    avp_id: str,
+    params: dict,
+    spool: bool,
+    validators: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    headers = _conditional_headers(validators)
+    if not spool:
+        response = await client.get(config.PDF_AVP_URL, sessionID, params=params, headers=headers)
+        if response.status_code == 304:
+            return {"not_modified": True}
+        _check_status(avp_id, response)
+        _check_body(avp_id, response.content, len(response.content))
+        return {"content": response.content, **_response_validators(response)}
+
+    # Le PDF est écrit par morceaux dans le spool, sans jamais être entier en mémoire
+    async with client.stream("GET", config.PDF_AVP_URL, sessionID, params=params, headers=headers) as response:
+        if response.status_code == 304:
+            return {"not_modified": True}
+        _check_status(avp_id, response)
+        writer = BlobWriter()
+        try:
+            async for chunk in response.aiter_bytes():
+                writer.write(chunk)
+            _check_body(avp_id, writer.head, writer.size)
+        except BaseException:
+            writer.discard()
+            raise
+        return {**writer.commit(), **_response_validators(response)}
+
+
+async def download_pdf(
+    client: SylaeClient,
+    sessionID: str,
+    avp_id: str,
+    slots: asyncio.Semaphore,
+    retries: int,
+    backoff: float,
+    spool: bool = False,
+    validators: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Télécharge un PDF d'AVP en le retentant en cas d'échec.
+
+    Avec des validateurs (ETag / Last-Modified d'un téléchargement précédent),
+    la requête est conditionnelle et un 304 renvoie {"not_modified": True}.
+
+    Returns:
+        {"content": bytes} en mémoire, ou {"path", "sha256", "size"} en mode spool,
+        avec "etag" / "last_modified" si Sylaé les fournit
+
+    Entre deux tentatives, le délai double (backoff * 2^n) avec une part
+    aléatoire pour ne pas relancer tous les téléchargements au même instant.
+    L'attente se fait hors slot pour laisser passer les autres PDFs.
+
+    Raises:
+        PdfDownloadError: si toutes les tentatives ont échoué
+        SylaeAuthError: si Sylaé rejette la session (inutile de réessayer)
+    """
+    params = {
+        "dispatchMethod": "download",
+        "ignore_no_cache": "true",
+        "id": avp_id,
+    }
+    for attempt in range(retries + 1):
+        try:
+            async with slots:
+                return await _fetch_pdf(client, sessionID, avp_id, params, spool, validators)
+        except (PdfDownloadError, httpx.TransportError) as e:
+            if attempt == retries:
+                raise PdfDownloadError(f"{e} après {retries + 1} tentatives") from e
+            delay = backoff * (2 ** attempt) + random.uniform(0, backoff)
+            lg.warning(f"{e} - nouvelle tentative dans {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def download_pdfs(
+    sessionID: str,
+    avp_ids: Iterable[str],
+    client: Optional[SylaeClient] = None,
+    workers: int = config.SYLAE_PDF_WORKERS,
+    retries: int = config.SYLAE_PDF_RETRIES,
+    backoff: float = config.SYLAE_PDF_BACKOFF,
+    spool: bool = config.SYLAE_PDF_SPOOL,
+    validators: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    Télécharge des PDFs d'AVP en parallèle avec un nombre borné de téléchargements simultanés.
+
+    Un PDF en échec n'interrompt pas les autres : il est signalé dans la
+    liste des échecs. L'employeur doit déjà être sélectionné pour la session.
+
+    En mode spool, chaque PDF est écrit au fil de l'eau dans le spool adressé
+    par contenu (data/sylae/blobs) : la mémoire consommée dépend du nombre de
+    téléchargements simultanés et non du volume total.
+
+    Args:
+        sessionID: JSESSIONID de la session
+        avp_ids: IDs des AVPs à télécharger
+        client: Client HTTP Sylaé (client partagé par défaut)
+        workers: Nombre de téléchargements simultanés
+        retries: Nombre de nouvelles tentatives par PDF
+        backoff: Délai de base entre deux tentatives (secondes)
+        spool: Écrire les PDFs dans le spool plutôt qu'en mémoire
+        validators: Validateurs HTTP connus par ID d'AVP, pour des requêtes conditionnelles
+
+    Returns:
+        Tuple (PDFs par ID d'AVP dans l'ordre demandé, IDs en échec) ; chaque
+        PDF vaut {"content": bytes} ou {"path", "sha256", "size"} en mode spool,
+        ou {"not_modified": True} si la requête conditionnelle a répondu 304
+
+    Raises:
+        SylaeAuthError: si Sylaé rejette la session
+    """
+    client = client or get_sylae_client()
+    avp_ids = [str(avp_id) for avp_id in avp_ids]
+    slots = asyncio.Semaphore(max(1, workers))
+
+    validators = validators or {}
+
+    async def worker(avp_id: str) -> Dict[str, Any]:
+        pdf = await download_pdf(
+            client, sessionID, avp_id, slots, retries, backoff, spool, validators.get(avp_id)
+        )
+        if pdf.get("not_modified"):
+            lg.info(f"PDF {avp_id} inchangé")
+        else:
+            size = pdf["size"] if spool else len(pdf["content"])
+            lg.info(f"PDF {avp_id} téléchargé avec succès ({size} bytes)")
+        return pdf
+
+    results = await asyncio.gather(*(worker(avp_id) for avp_id in avp_ids), return_exceptions=True)
+
+    contents: Dict[str, Dict[str, Any]] = {}
+    failed: List[str] = []
+    for avp_id, result in zip(avp_ids, results):
+        if isinstance(result, SylaeAuthError):
+            raise result
+        if isinstance(result, PdfDownloadError):
+            lg.error(f"Échec du téléchargement du PDF {avp_id} : {result}")
+            failed.append(avp_id)
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            contents[avp_id] = result
+    return contents, failed
@@ -1,21 +1,22 @@
 import logging
-import requests
+from typing import Optional
 import src.config as config
 from bs4 import BeautifulSoup as bs4
+from src.modules.webscrapping.client import SylaeClient, SylaeOverloadError, get_sylae_client, is_overloaded
 
 lg = logging.getLogger()
 lg.setLevel(logging.INFO)
 formatter = logging.Formatter('%(asctime)s;%(levelname)s;%(message)s;')
 
-async def get_alternant(sessionID : str, empId : str, altId : str) -> list :
+async def get_alternant(sessionID : str, empId : str, altId : str, client : Optional[SylaeClient] = None) -> list :
     lg.info("Récupération des alterntants de l'entreprise")
-    cookies = dict(JSESSIONID=sessionID)
-    r = requests.post(config.VERIFID_URL + str(empId),
-                      cookies=cookies)
+    client = client or get_sylae_client()
+    await client.select_employer(sessionID, empId)
     
-    r = requests.get(config.ALT_URL + str(altId),
-                      cookies=cookies)
-    if r.ok == False or r.status_code != 200:
+    r = await client.get(config.ALT_URL + str(altId), sessionID)
+    if is_overloaded(r):
+        raise SylaeOverloadError(f"Sylaé saturé lors de la récupération de l'alternant {altId}")
+    if not r.is_success or r.status_code != 200:
         raise Exception("La requête d'extraction des alternants à échouée")
     
 
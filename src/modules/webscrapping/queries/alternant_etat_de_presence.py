@@ -1,19 +1,21 @@
 import logging
-import requests
 from datetime import datetime
+from typing import Optional
 import src.config as config
 from bs4 import BeautifulSoup as bs4
+from src.modules.webscrapping.client import SylaeClient, SylaeOverloadError, get_sylae_client, is_overloaded
 
 lg = logging.getLogger()
 lg.setLevel(logging.INFO)
 formatter = logging.Formatter('%(asctime)s;%(levelname)s;%(message)s;')
 
-async def get_alternant_etat_presence(sessionID: str, altId: str) -> list:
-    cookies = dict(JSESSIONID=sessionID)
+async def get_alternant_etat_presence(sessionID: str, altId: str, client: Optional[SylaeClient] = None) -> list:
+    client = client or get_sylae_client()
     
-    r = requests.get(config.ALT_EDP_URL + str(altId) + "&m=&r=1&s=0",
-                    cookies=cookies)
-    if r.ok == False or r.status_code != 200:
+    r = await client.get(config.ALT_EDP_URL + str(altId) + "&m=&r=1&s=0", sessionID)
+    if is_overloaded(r):
+        raise SylaeOverloadError(f"Sylaé saturé lors de la récupération de l'état de présence {altId}")
+    if not r.is_success or r.status_code != 200:
         raise Exception("La requête d'extraction de l'état de présence a échoué")
 
     soup = bs4(r.text, 'html.parser')
@@ -1,22 +1,21 @@
 import logging
-import requests
+from typing import Optional
 import src.config as config
+from src.modules.webscrapping.client import SylaeClient, get_sylae_client
 
 lg = logging.getLogger()
 lg.setLevel(logging.INFO)
 formatter = logging.Formatter('%(asctime)s;%(levelname)s;%(message)s;')
 
-async def get_alternant_datas(sessionID : str, empId : str) -> dict :
+async def get_alternant_datas(sessionID : str, empId : str, client : Optional[SylaeClient] = None) -> dict :
     lg.info("Récupération des alterntants de l'entreprise")
-    cookies = dict(JSESSIONID=sessionID)
-    r = requests.post(config.VERIFID_URL + str(empId),
-                      cookies=cookies)
+    client = client or get_sylae_client()
+    await client.select_employer(sessionID, empId)
 
     form_data = {"pageSize":"2500","pageNumber":"1","sortIndex":"1","ascending":"true"}
-    r = requests.post(config.ALTS_URL,
-                      cookies=cookies, data=form_data)
+    r = await client.post(config.ALTS_URL, sessionID, data=form_data)
 
-    if r.ok == False or r.status_code != 200:
+    if not r.is_success or r.status_code != 200:
         raise Exception("La requête d'extraction des alternants à échouée")
     lg.info("Récupération réussie")
     return r.json()
@@ -1,7 +1,16 @@
 from datetime import datetime
 import logging
-import requests
-from src.modules.storage.common import save_file, verify_file_exist
+from typing import List, Optional, Tuple
+from src.modules.storage.blobs.blobs import blob_path
+from src.modules.storage.blobs.manifest import (
+    get_local_entry,
+    get_manifest,
+    migrate_legacy_pdfs,
+    register_pdf,
+    update_manifest,
+)
+from src.modules.webscrapping.client import SylaeClient, get_sylae_client
+from src.modules.webscrapping.downloads import download_pdfs
 import src.config as config
 
 lg = logging.getLogger()
@@ -9,9 +18,11 @@ lg.setLevel(logging.INFO)
 formatter = logging.Formatter("%(asctime)s;%(levelname)s;%(message)s;")
 
 
-async def fetch_avps_list(sessionID: str, empId: str, ref_date: datetime) -> dict:
-    cookies = dict(JSESSIONID=sessionID)
-    r = requests.post(config.VERIFID_URL + str(empId), cookies=cookies)
+async def fetch_avps_list(
+    sessionID: str, empId: str, ref_date: datetime, client: Optional[SylaeClient] = None
+) -> dict:
+    client = client or get_sylae_client()
+    await client.select_employer(sessionID, empId)
 
     form_data = {
         "pageSize": "2500",
@@ -22,13 +33,13 @@ async def fetch_avps_list(sessionID: str, empId: str, ref_date: datetime) -> dic
         "annee": "0",
         "mois": "0",
     }
-    r = requests.post(config.AVP_URL, cookies=cookies, data=form_data)
+    r = await client.post(config.AVP_URL, sessionID, data=form_data)
 
-    if r.ok == False or r.status_code != 200:
+    if not r.is_success or r.status_code != 200:
         lg.error(f"Échec de la requête avec le code {r.status_code}")
         raise Exception("La requête d'extraction des avis de paiement à échouée")
     if r.text.startswith("\n\n\n"):
-        r = requests.post(config.AVP_URL, cookies=cookies, data=form_data)
+        r = await client.post(config.AVP_URL, sessionID, data=form_data)
         if r.text.startswith("\n\n\n"):
             raise Exception("La requête d'extraction des avis de paiement  a échouée")
 
@@ -71,144 +82,142 @@ async def fetch_avps_list(sessionID: str, empId: str, ref_date: datetime) -> dic
 
 
 async def get_entreprise_avps_pdf(
-    sessionID: str, empId: str, siret: str, avps: dict
+    sessionID: str, empId: str, siret: str, avps: dict, client: Optional[SylaeClient] = None
 ) -> dict:
-    save_path = "data/sylae/avps/" + siret
-    delta_save_path = "data/sylae/avps_delta/" + siret
-    cookies = dict(JSESSIONID=sessionID)
-    r = requests.post(config.VERIFID_URL + str(empId), cookies=cookies)
+    """
+    Récupère les PDFs des AVPs d'une entreprise via le manifeste du stockage par contenu.
+
+    Les PDFs déjà connus sont lus depuis leur blob ; les nouveaux sont
+    téléchargés dans le spool et ajoutés au manifeste avec delta=True.
+    """
+    client = client or get_sylae_client()
+    await client.select_employer(sessionID, empId)
 
-    # Log des AVPs existants avant traitement
+    migrate_legacy_pdfs(siret)
+    manifest = get_manifest(siret)
     existing_in_avps = set()
     existing_in_delta = set()
-    duplicates = set()
 
     pdf_contents = []  # Liste pour stocker les contenus PDF avec leurs métadonnées
+    to_download = []
 
     for avp in avps:
-        avp_file = save_path + "/" + str(avp["id"]) + ".pdf"
-        delta_file = delta_save_path + "/" + str(avp["id"]) + ".pdf"
-        pdf_info = {"id": avp["id"]}
-
-        if await verify_file_exist(avp_file):
-            existing_in_avps.add(avp["id"])
-            with open(avp_file, "rb") as f:
-                pdf_info["content"] = f.read()
-            pdf_info["delta"] = False
-            pdf_contents.append(pdf_info)
-            continue
-
-        if await verify_file_exist(delta_file):
-            existing_in_delta.add(avp["id"])
-            with open(delta_file, "rb") as f:
-                pdf_info["content"] = f.read()
-            pdf_info["delta"] = True
-            pdf_contents.append(pdf_info)
+        entry = get_local_entry(manifest, avp["id"])
+        if entry is None:
+            to_download.append(avp["id"])
             continue
-
-        # Téléchargement du nouveau PDF
-        form_data = {
-            "dispatchMethod": "download",
-            "ignore_no_cache": "true",
-            "id": avp["id"],
-        }
-        r = requests.get(config.PDF_AVP_URL, cookies=cookies, params=form_data)
-
-        if r.ok == False or r.status_code != 200:
-            raise Exception(
-                "La requête d'extraction des PDFs a été refusée par le serveur"
-            )
-        if r.text.startswith("\n\n\n"):
-            r = requests.get(config.PDF_AVP_URL, cookies=cookies, params=form_data)
-            if r.text.startswith("\n\n\n"):
-                raise Exception("La requête d'extraction des PDFs a échouée")
-
-        lg.info(f"Téléchargement AVP {avp['id']} dans delta_save_path")
-        pdf_content = r.content
-        await save_file(delta_save_path, delta_file, pdf_content)
-        pdf_info["content"] = pdf_content
-        pdf_info["delta"] = True
-        pdf_contents.append(pdf_info)
-
-    duplicates = existing_in_avps.intersection(existing_in_delta)
-    if duplicates:
-        lg.warning(f"AVPs présents dans les deux dossiers: {duplicates}")
+        (existing_in_delta if entry["delta"] else existing_in_avps).add(avp["id"])
+        with open(blob_path(entry["sha256"]), "rb") as f:
+            pdf_contents.append({"id": avp["id"], "content": f.read(), "delta": entry["delta"]})
+
+    # Téléchargement des nouveaux PDFs
+    downloaded, failed = await download_pdfs(sessionID, to_download, client=client, spool=True)
+    new_entries = {}
+    with update_manifest(siret) as manifest:
+        for avp_id in to_download:
+            if str(avp_id) in downloaded:
+                new_entries[avp_id] = register_pdf(manifest, avp_id, downloaded[str(avp_id)], delta=True)
+    for avp_id, entry in new_entries.items():
+        lg.info(f"Téléchargement AVP {avp_id} dans le stockage delta")
+        with open(blob_path(entry["sha256"]), "rb") as f:
+            pdf_contents.append({"id": avp_id, "content": f.read(), "delta": True})
 
     lg.info(f"Stats finales:")
-    lg.info(f"- AVPs dans le dossier avps: {len(existing_in_avps)}")
-    lg.info(f"- AVPs dans le dossier delta: {len(existing_in_delta)}")
-    lg.info(f"- AVPs en double: {len(duplicates)}")
+    lg.info(f"- AVPs dans data: {len(existing_in_avps)}")
+    lg.info(f"- AVPs dans delta: {len(existing_in_delta)}")
+    lg.info(f"- AVPs téléchargés: {len(to_download) - len(failed)}")
+    if failed:
+        lg.error(f"- PDFs en échec: {len(failed)} ({', '.join(failed)})")
 
     return pdf_contents  # Retourne la liste des PDFs avec leurs métadonnées et contenus
 
 
 async def get_entreprise_avps_pdf_memory(
-    sessionID: str, empId: str, siret: str, avps: dict
-) -> dict:
+    sessionID: str, empId: str, siret: str, avps: dict, client: Optional[SylaeClient] = None
+) -> Tuple[dict, List[str]]:
     """
-    Récupère les PDFs des AVPs d'une entreprise directement en mémoire sans stockage local.
+    Récupère les PDFs des AVPs d'une entreprise pour le pipeline.
+
+    Les PDFs déjà présents dans l'index local (manifeste du stockage par
+    contenu) sont servis sans requête ; seuls les nouveaux AVPs sont
+    téléchargés, en parallèle, puis ajoutés à l'index. Un PDF en échec
+    n'empêche pas de récupérer les autres ; si la revalidation d'un PDF
+    indexé échoue (SYLAE_PDF_REVALIDATE), sa version locale est servie. En mode spool (SYLAE_PDF_SPOOL),
+    chaque PDF est un fichier référencé par "path" au lieu de "content".
 
     Args:
         sessionID: ID de session pour l'API
         empId: ID de l'entreprise
         siret: SIRET de l'entreprise
         avps: Liste des AVPs à télécharger
+        client: Client HTTP Sylaé (client partagé par défaut)
 
     Returns:
-        Dict contenant les PDFs en mémoire
-        Format: {
+        Tuple (PDFs, IDs des AVPs dont le PDF n'a pas pu être récupéré)
+        Format des PDFs: {
             'siret_AVP1': {
-                'content': bytes_content,
+                'content': bytes_content,   # ou 'path', 'sha256', 'size' en mode spool
                 'delta': bool
             }
         }
     """
-    cookies = dict(JSESSIONID=sessionID)
-    r = requests.post(config.VERIFID_URL + str(empId), cookies=cookies)
-
-    pdf_contents = {}
+    client = client or get_sylae_client()
+    await client.select_employer(sessionID, empId)
 
+    migrate_legacy_pdfs(siret)
+    manifest = get_manifest(siret)
+    to_download = []
+    validators = {}
     for avp in avps:
         avp_id = str(avp["id"])
+        entry = get_local_entry(manifest, avp_id)
+        if entry is None:
+            to_download.append(avp_id)
+        elif config.SYLAE_PDF_REVALIDATE and (entry.get("etag") or entry.get("last_modified")):
+            to_download.append(avp_id)
+            validators[avp_id] = entry
+
+    downloaded, failed = await download_pdfs(
+        sessionID, to_download, client=client, spool=config.SYLAE_PDF_SPOOL, validators=validators
+    )
+    # Revalidation en échec : le blob déjà indexé reste servi
+    stale = [avp_id for avp_id in failed if avp_id in validators]
+    if stale:
+        lg.warning(
+            f"Revalidation impossible pour {len(stale)} PDF(s) de {siret}, "
+            f"version de l'index local conservée: {', '.join(stale)}"
+        )
+        failed = [avp_id for avp_id in failed if avp_id not in validators]
+
+    delta_by_id = {str(avp["id"]): avp.get("delta", True) for avp in avps}
+    if downloaded:
+        with update_manifest(siret) as manifest:
+            for avp_id, pdf in downloaded.items():
+                if not pdf.get("not_modified"):
+                    register_pdf(manifest, avp_id, pdf, delta=delta_by_id[avp_id])
 
-        # Téléchargement du PDF
-        form_data = {
-            "dispatchMethod": "download",
-            "ignore_no_cache": "true",
-            "id": avp_id,
-        }
-
-        r = requests.get(config.PDF_AVP_URL, cookies=cookies, params=form_data)
-
-        if r.ok == False or r.status_code != 200:
-            lg.error(
-                f"Échec du téléchargement du PDF {avp_id} avec le code {r.status_code}"
-            )
-            raise Exception(
-                f"La requête d'extraction du PDF {avp_id} a été refusée par le serveur"
-            )
-
-        if r.text.startswith("\n\n\n") or not r.content:
-            r = requests.get(config.PDF_AVP_URL, cookies=cookies, params=form_data)
-            if r.text.startswith("\n\n\n") or not r.content:
-                lg.error(
-                    f"Échec du téléchargement du PDF {avp_id} après nouvelle tentative - Contenu vide"
-                )
-                raise Exception(
-                    f"La requête d'extraction du PDF {avp_id} a échoué - Contenu vide"
-                )
-
-        # Vérification de la taille minimale du PDF (un PDF vide fait environ 1KB)
-        if len(r.content) < 1024:  # 1KB
-            lg.error(
-                f"PDF {avp_id} trop petit ({len(r.content)} bytes) - probablement corrompu"
-            )
-            raise Exception(f"Le PDF {avp_id} semble être corrompu ou vide")
-
-        lg.info(f"PDF {avp_id} téléchargé avec succès ({len(r.content)} bytes)")
+    pdf_contents = {}
+    for avp in avps:
+        avp_id = str(avp["id"])
+        if avp_id in failed:
+            continue
+        pdf = downloaded.get(avp_id)
+        if pdf is None or pdf.get("not_modified") or config.SYLAE_PDF_SPOOL:
+            entry = manifest[avp_id]
+            path = blob_path(entry["sha256"])
+            if config.SYLAE_PDF_SPOOL:
+                pdf = {"path": path, "sha256": entry["sha256"], "size": entry["size"]}
+            else:
+                with open(path, "rb") as f:
+                    pdf = {"content": f.read()}
         pdf_contents[f"{siret}_{avp_id}"] = {
-            "content": r.content,
+            **{k: pdf[k] for k in ("content", "path", "sha256", "size") if k in pdf},
             "delta": False,  # Sera mis à jour plus tard par refresh_deltas
         }
 
-    return pdf_contents
+    fetched = sum(1 for pdf in downloaded.values() if not pdf.get("not_modified"))
+    lg.info(f"PDFs {siret}: {len(pdf_contents) - fetched} servis par l'index local, {fetched} téléchargés")
+    if failed:
+        lg.error(f"{len(failed)} PDF(s) en échec pour {siret}: {', '.join(failed)}")
+
+    return pdf_contents, failed
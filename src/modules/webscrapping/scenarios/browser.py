@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from playwright.async_api import Browser, BrowserContext, Playwright, async_playwright
+
+lg = logging.getLogger()
+
+
+class LoginMetrics:
+    """Durées des connexions Sylaé pour un worker."""
+
+    def __init__(self):
+        self.logins = 0
+        self.failures = 0
+        self.browser_launches = 0
+        self.total_seconds = 0.0
+        self.last_seconds: Optional[float] = None
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float, success: bool) -> None:
+        self.logins += 1
+        if not success:
+            self.failures += 1
+        self.total_seconds += seconds
+        self.last_seconds = seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "logins": self.logins,
+            "failures": self.failures,
+            "browser_launches": self.browser_launches,
+            "last_seconds": self.last_seconds,
+            "avg_seconds": self.total_seconds / self.logins if self.logins else None,
+            "max_seconds": self.max_seconds,
+        }
+
+
+class BrowserManager:
+    """
+    Navigateur Chromium conservé pendant toute la vie du worker.
+
+    Le lancement de Chromium coûte plusieurs secondes et plusieurs centaines
+    de Mo : il est fait une seule fois (au démarrage de l'application ou à la
+    première connexion) et chaque connexion ouvre seulement un contexte
+    isolé, refermé ensuite. Si le navigateur plante ou se déconnecte, il est
+    relancé à la connexion suivante.
+    """
+
+    def __init__(self, headless: bool = True):
+        self.headless = headless
+        self.metrics = LoginMetrics()
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> Browser:
+        """Démarre le navigateur s'il n'est pas déjà lancé et connecté."""
+        async with self._lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._browser is not None:
+                lg.warning("Navigateur Playwright déconnecté, relance")
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            self._browser.on("disconnected", self._on_disconnected)
+            self.metrics.browser_launches += 1
+            lg.info("Navigateur Playwright démarré")
+            return self._browser
+
+    def _on_disconnected(self, browser: Browser) -> None:
+        if browser is self._browser:
+            lg.warning("Le navigateur Playwright s'est arrêté")
+
+    @asynccontextmanager
+    async def new_context(self) -> AsyncIterator[BrowserContext]:
+        """
+        Ouvre un contexte de navigation vierge (cookies, stockage) sur le navigateur partagé.
+
+        Yields:
+            Le contexte, fermé à la sortie du bloc
+        """
+        browser = await self.start()
+        context = await browser.new_context()
+        try:
+            yield context
+        finally:
+            try:
+                await context.close()
+            except Exception as e:
+                # Le navigateur a pu tomber pendant la connexion
+                lg.warning(f"Fermeture du contexte Playwright impossible : {e}")
+
+    async def stop(self) -> None:
+        """Arrête le navigateur et Playwright (arrêt de l'application)."""
+        async with self._lock:
+            if self._browser is not None:
+                try:
+                    await self._browser.close()
+                except Exception as e:
+                    lg.warning(f"Fermeture du navigateur Playwright impossible : {e}")
+                self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+
+_browser_manager: Optional[BrowserManager] = None
+
+
+def get_browser_manager() -> BrowserManager:
+    """Retourne le gestionnaire de navigateur du worker, créé à la première utilisation."""
+    global _browser_manager
+    if _browser_manager is None:
+        _browser_manager = BrowserManager()
+    return _browser_manager
+
+
+async def close_browser_manager() -> None:
+    """Arrête le navigateur partagé s'il a été démarré."""
+    global _browser_manager
+    if _browser_manager is not None:
+        await _browser_manager.stop()
+        _browser_manager = None
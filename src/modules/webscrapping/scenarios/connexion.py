@@ -1,49 +1,183 @@
-from typing import Optional
-from playwright.async_api import async_playwright
-from src.constants import Environment
+from typing import Awaitable, Callable
+from urllib.parse import urljoin
+import time
+import httpx
+from bs4 import BeautifulSoup as bs4
+import src.config as config
+from .browser import LoginMetrics, get_browser_manager
 import logging
 
 lg = logging.getLogger()
 
+SYLAE_HOME_URL = "https://sylae.asp-public.fr/sylae/"
+SYLAE_LOGOUT_URL = "https://sylae.asp-public.fr/sylae/employeur/choixemployeur.do"
+
+LOGIN_STRATEGIES = ("playwright", "http", "auto")
+
+PASSWORD_CHANGE_MESSAGE = "changement du mot de passe a faire veuillez vous connecter au compte et signaler"
+# Textes de la page de changement de mot de passe imposé par Sylaé
+PASSWORD_CHANGE_MARKERS = ("nouveau mot de passe", "changement du mot de passe", "changement de mot de passe",
+                           "changer votre mot de passe", "modifier votre mot de passe")
+
+# Durées des connexions par formulaire HTTP (celles de Playwright sont portées par le BrowserManager)
+http_login_metrics = LoginMetrics()
+
+
+class HttpLoginUnavailable(Exception):
+    """Le formulaire de connexion ne peut pas être rejoué en HTTP (captcha, formulaire introuvable, ...)."""
+
+
+class SylaeLoginRejected(Exception):
+    """Sylaé a refusé les identifiants : pas de nouvelle tentative, le compte pourrait être bloqué."""
+
+
 async def Authentification(identifiant, pwd) -> str:
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
+    """
+    Ouvre une session Sylaé et retourne son JSESSIONID.
 
-        page = await context.new_page()
+    La stratégie dépend de SYLAE_LOGIN_STRATEGY :
+        - "playwright" : connexion via le navigateur ;
+        - "http" : formulaire rejoué en HTTP, sans navigateur ;
+        - "auto" : formulaire HTTP, puis navigateur si Sylaé exige une interaction.
+
+    Des identifiants refusés ne sont jamais retentés via le navigateur.
+
+    Args:
+        identifiant: Identifiant du compte Sylaé
+        pwd: Mot de passe du compte Sylaé
+    """
+    strategy = config.SYLAE_LOGIN_STRATEGY
+    if strategy not in LOGIN_STRATEGIES:
+        raise Exception(f"Stratégie de connexion Sylaé inconnue : {strategy}")
 
-        try:
-            # force l'expiration de la session
-            await page.goto("https://sylae.asp-public.fr/sylae/employeur/choixemployeur.do")
+    if strategy == "playwright":
+        return await _timed_login("playwright", get_browser_manager().metrics, _playwright_login, identifiant, pwd)
+    try:
+        return await _timed_login("http", http_login_metrics, _http_login, identifiant, pwd)
+    except (HttpLoginUnavailable, httpx.HTTPError) as e:
+        if strategy == "http":
+            raise Exception(f"Connexion HTTP à Sylaé impossible : {e}")
+        lg.warning(f"Connexion HTTP à Sylaé impossible ({e}), connexion via le navigateur")
+    return await _timed_login("playwright", get_browser_manager().metrics, _playwright_login, identifiant, pwd)
+
+async def _timed_login(
+    name: str,
+    metrics: LoginMetrics,
+    login: Callable[[str, str], Awaitable[str]],
+    identifiant: str,
+    pwd: str,
+) -> str:
+    start = time.perf_counter()
+    success = False
+    try:
+        jsessionID = await login(identifiant, pwd)
+        success = True
+        return jsessionID
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.record(elapsed, success)
+        lg.info(f"Connexion Sylaé ({name}) {'réussie' if success else 'échouée'} en {elapsed:.2f}s")
+
+def _is_password_change_page(html: str) -> bool:
+    soup = bs4(html, 'html.parser')
+    # Nouveau mot de passe + confirmation, ou texte explicite de la page
+    if len(soup.find_all("input", attrs={"type": "password"})) >= 2:
+        return True
+    text = soup.get_text(" ").lower()
+    return any(marker in text for marker in PASSWORD_CHANGE_MARKERS)
+
+def _find_login_form(html: str):
+    soup = bs4(html, 'html.parser')
+    for form in soup.find_all("form"):
+        if form.find("input", attrs={"type": "password"}) is not None:
+            return form
+    return None
+
+async def _http_login(identifiant: str, pwd: str) -> str:
+    async with httpx.AsyncClient(
+        follow_redirects=True,
+        timeout=httpx.Timeout(config.SYLAE_HTTP_TIMEOUT, connect=config.SYLAE_HTTP_CONNECT_TIMEOUT),
+    ) as client:
+        # force l'expiration de la session
+        await client.get(SYLAE_LOGOUT_URL)
+
+        r = await client.get(SYLAE_HOME_URL)
+        r.raise_for_status()
+        form = _find_login_form(r.text)
+        if form is None:
+            raise HttpLoginUnavailable("formulaire de connexion introuvable")
+        if "captcha" in str(form).lower():
+            raise HttpLoginUnavailable("captcha demandé")
+
+        # Champs cachés (jetons du formulaire) repris tels quels
+        data = {
+            field["name"]: field.get("value", "")
+            for field in form.find_all("input")
+            if field.get("name") and field.get("type") not in ("submit", "button", "checkbox")
+        }
+        user_field = form.find("input", attrs={"placeholder": "prénom.nom"}) \
+            or form.find("input", attrs={"type": ["text", "email"]})
+        password_field = form.find("input", attrs={"type": "password"})
+        if user_field is None or not user_field.get("name") or not password_field.get("name"):
+            raise HttpLoginUnavailable("champs identifiant / mot de passe introuvables")
+        data[user_field["name"]] = identifiant
+        data[password_field["name"]] = pwd
+
+        action = urljoin(str(r.url), form.get("action") or str(r.url))
+        r = await client.request((form.get("method") or "post").upper(), action, data=data)
+        r.raise_for_status()
+
+        # Mot de passe expiré : même erreur que via le navigateur, pas de nouvelle tentative
+        if _is_password_change_page(r.text):
+            lg.error(PASSWORD_CHANGE_MESSAGE)
+            raise Exception(PASSWORD_CHANGE_MESSAGE)
+
+        # Toujours un champ mot de passe : identifiants refusés (ou captcha demandé après l'envoi)
+        form = _find_login_form(r.text)
+        if form is not None:
+            if "captcha" in str(form).lower():
+                raise HttpLoginUnavailable("captcha demandé après l'envoi du formulaire")
+            error_message = "Mauvais identifiants, Impossible de se connecter"
+            lg.error(error_message)
+            raise SylaeLoginRejected(error_message)
+
+        jsessionID = next(
+            (cookie.value for cookie in client.cookies.jar if cookie.name == "JSESSIONID" and "sylae" in cookie.domain),
+            None,
+        )
+        if jsessionID is None:
+            raise HttpLoginUnavailable("JSESSIONID absent après connexion")
+        return jsessionID
+
+async def _playwright_login(identifiant: str, pwd: str) -> str:
+    async with get_browser_manager().new_context() as context:
+        page = await context.new_page()
 
-            await page.goto("https://sylae.asp-public.fr/sylae/")
+        # force l'expiration de la session
+        await page.goto(SYLAE_LOGOUT_URL)
 
-            if(await page.locator("#cookieContainButton").count() > 0):
-                await page.locator("#cookieContainButton").get_by_text("J’ai compris").click()
+        await page.goto(SYLAE_HOME_URL)
 
-            await page.get_by_placeholder("prénom.nom").click()
-            await page.get_by_placeholder("prénom.nom").fill("yoel.pepin")
-            await page.get_by_placeholder("prénom.nom").press("Tab")
-            await page.get_by_label("Mot de passe *").fill("Black971#")
-            await page.get_by_role("button", name="Se connecter").click()
+        if(await page.locator("#cookieContainButton").count() > 0):
+            await page.locator("#cookieContainButton").get_by_text("J’ai compris").click()
 
-            # Vérifier si on est redirigé vers la page de changement de mot de passe
-            if await page.locator("text=mot de passe").count() > 0:
-                error_message = "changement du mot de passe a faire veuillez vous connecter au compte et signaler"
-                lg.error(error_message)
-                await send_error_notification(error_message)
-                raise Exception(error_message)
+        await page.get_by_placeholder("prénom.nom").click()
+        await page.get_by_placeholder("prénom.nom").fill(identifiant)
+        await page.get_by_placeholder("prénom.nom").press("Tab")
+        await page.get_by_label("Mot de passe *").fill(pwd)
+        await page.get_by_role("button", name="Se connecter").click()
 
-            cookies = await context.cookies()
-            jsessionID = next((x["value"] for x in cookies if x["name"] == "JSESSIONID"), None)
+        # Vérifier si on est redirigé vers la page de changement de mot de passe
+        if await page.locator("text=mot de passe").count() > 0:
+            lg.error(PASSWORD_CHANGE_MESSAGE)
+            raise Exception(PASSWORD_CHANGE_MESSAGE)
 
-            if jsessionID == None:
-                error_message = "Mauvais identifiants, Impossible de se connecter"
-                lg.error(error_message)
-                raise Exception(error_message)
+        cookies = await context.cookies()
+        jsessionID = next((x["value"] for x in cookies if x["name"] == "JSESSIONID"), None)
 
-            return jsessionID
+        if jsessionID == None:
+            error_message = "Mauvais identifiants, Impossible de se connecter"
+            lg.error(error_message)
+            raise Exception(error_message)
 
-        finally:
-            await context.close()
-            await browser.close()
\ No newline at end of file
+        return jsessionID
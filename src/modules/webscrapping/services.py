@@ -1,16 +1,24 @@
+import asyncio
 import logging
 import os
 from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, List, Tuple
+
+import httpx
+
+import src.config as config
 
 from src.modules.webscrapping.queries.alternant import get_alternant
-from src.modules.storage.services import get_cached_session, cache_session
+from src.modules.storage.services import get_cached_session, cache_session, session_refresh_lock
 from src.modules.storage.delta.delta import refresh_deltas_in_avps, refresh_deltas_in_avps_bydate
 from src.modules.storage.avps.avps import update_avps
 
 from src.modules.webscrapping.queries.alternants import get_alternant_datas
-from src.modules.storage.services import get_cached_session, cache_session
 
 from .scenarios.connexion import Authentification
+from .client import SylaeAuthError, SylaeOverloadError
+from .concurrency import AdaptiveLimiter
+from .session_pool import get_session_pool
 
 from .queries.avispaiements import fetch_avps_list, get_entreprise_avps_pdf, get_entreprise_avps_pdf_memory
 from .queries.entreprises import get_entreprises_list
@@ -39,17 +47,59 @@ console_handler.setFormatter(formatter)
 lg.addHandler(file_handler)
 lg.addHandler(console_handler)
 
+# Limite partagée par toutes les entreprises traitées par ce worker
+alt_details_limiter = AdaptiveLimiter(
+    config.SYLAE_ALT_CONCURRENCY,
+    minimum=config.SYLAE_ALT_MIN_CONCURRENCY,
+    maximum=config.SYLAE_ALT_MAX_CONCURRENCY,
+)
+
+# Une seule connexion à la fois : les coroutines qui trouvent la session expirée
+# attendent la connexion en cours et réutilisent son résultat
+_session_refresh_lock = asyncio.Lock()
+
 async def create_or_get_valid_session(username : str, password : str) -> str:
-    expiration = (datetime.now() + timedelta(minutes=15)).strftime("%d%m%Y-%H-%M-%S")
     content = await get_cached_session()
     if content:
         return content
-    else :
+    # Verrou du worker, puis verrou partagé entre workers : un seul renouvellement au total
+    async with _session_refresh_lock, session_refresh_lock():
+        content = await get_cached_session()
+        if content:
+            return content
+        expiration = (datetime.now() + timedelta(minutes=15)).strftime("%d%m%Y-%H-%M-%S")
         sessionId = await Authentification(username,password)
         await cache_session(sessionId,expiration)
         return sessionId
 
 
+async def with_employer_session(username : str, password : str, empId : str, call : Callable[[str], Awaitable[Any]]) -> Any:
+    """
+    Exécute un traitement Sylaé avec une session du pool réservée à l'employeur.
+
+    Si Sylaé rejette la session en cours de route, elle est recyclée et le
+    traitement est relancé une fois avec une session renouvelée.
+
+    Args:
+        username: Identifiant pour l'API
+        password: Mot de passe pour l'API
+        empId: ID de l'entreprise
+        call: Traitement recevant le JSESSIONID
+
+    Returns:
+        Le résultat du traitement
+    """
+    pool = get_session_pool(username, password)
+    for attempt in range(2):
+        try:
+            async with pool.lease(empId) as sessionID:
+                return await call(sessionID)
+        except SylaeAuthError:
+            if attempt:
+                raise
+            lg.warning(f"Session Sylaé rejetée pour l'entreprise {empId}, nouvelle tentative")
+
+
 async def get_entreprises(username : str, password : str) -> dict:
     sessionID = await create_or_get_valid_session(username, password)
     entreprises = await get_entreprises_list(sessionID)
@@ -57,9 +107,10 @@ async def get_entreprises(username : str, password : str) -> dict:
 
 async def fetch_avps(username : str, password : str, empId : str, ref_date: datetime)-> dict:
 
-    sessionID = await create_or_get_valid_session(username, password)
-    avps = await fetch_avps_list(sessionID, empId, ref_date)
-    return avps
+    return await with_employer_session(
+        username, password, empId,
+        lambda sessionID: fetch_avps_list(sessionID, empId, ref_date),
+    )
 
 async def download_avps_pdfs(username: str, password: str, empId: str, siret: str, avps: dict) -> dict:
     """
@@ -81,8 +132,10 @@ async def download_avps_pdfs(username: str, password: str, empId: str, siret: st
             }
         }
     """
-    sessionID = await create_or_get_valid_session(username, password)
-    pdf_contents = await get_entreprise_avps_pdf(sessionID, empId, siret, avps)
+    pdf_contents = await with_employer_session(
+        username, password, empId,
+        lambda sessionID: get_entreprise_avps_pdf(sessionID, empId, siret, avps),
+    )
     
     # Formatage des PDFs selon le format attendu
     formatted_pdfs = {}
@@ -94,7 +147,7 @@ async def download_avps_pdfs(username: str, password: str, empId: str, siret: st
     
     return formatted_pdfs
 
-async def download_avps_pdfs_memory(username: str, password: str, empId: str, siret: str, avps: dict) -> dict:
+async def download_avps_pdfs_memory(username: str, password: str, empId: str, siret: str, avps: dict) -> Tuple[dict, List[str]]:
     """
     Télécharge les PDFs des AVPs d'une entreprise directement en mémoire.
     
@@ -106,16 +159,18 @@ async def download_avps_pdfs_memory(username: str, password: str, empId: str, si
         avps: Liste des AVPs à télécharger
         
     Returns:
-        Dict contenant les PDFs en mémoire avec leur statut delta
-        Format: {
+        Tuple (PDFs en mémoire avec leur statut delta, IDs des AVPs en échec)
+        Format des PDFs: {
             'siret_AVP1': {
                 'content': bytes_content,
                 'delta': bool
             }
         }
     """
-    sessionID = await create_or_get_valid_session(username, password)
-    return await get_entreprise_avps_pdf_memory(sessionID, empId, siret, avps)
+    return await with_employer_session(
+        username, password, empId,
+        lambda sessionID: get_entreprise_avps_pdf_memory(sessionID, empId, siret, avps),
+    )
 
 async def refresh_deltas(siret : str, avps : dict):
     new_avps = await refresh_deltas_in_avps(siret,avps)
@@ -134,15 +189,53 @@ async def refresh_deltas_bydate(siret: str, avps: dict, reference_date: datetime
     new_avps = await refresh_deltas_in_avps_bydate(siret, avps, reference_date)
     await update_avps(new_avps, siret)
 
+async def _call_with_backoff(limiter: AdaptiveLimiter, call: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Exécute un appel Sylaé sous la limite adaptative.
+
+    En cas de saturation (page vide, 5xx, timeout), la limite est réduite et
+    l'appel est retenté avec un délai exponentiel, hors slot.
+    """
+    for attempt in range(config.SYLAE_ALT_RETRIES + 1):
+        async with limiter:
+            try:
+                result = await call()
+            except (SylaeOverloadError, httpx.TimeoutException) as e:
+                await limiter.overload()
+                if attempt == config.SYLAE_ALT_RETRIES:
+                    raise
+                error = e
+            else:
+                await limiter.success()
+                return result
+        delay = config.SYLAE_ALT_BACKOFF * (2 ** attempt)
+        lg.warning(f"{error} - nouvelle tentative dans {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+
 async def fetch_alts(username : str, password : str, empId : str)-> dict:
 
-    sessionID = await create_or_get_valid_session(username, password)
+    return await with_employer_session(
+        username, password, empId,
+        lambda sessionID: _fetch_alts_for_session(sessionID, empId),
+    )
+
+
+async def _fetch_alts_for_session(sessionID : str, empId : str) -> dict:
     alts = await get_alternant_datas(sessionID, empId)
     alts = alts['items']
     total = len(alts)
-    for i, alt in enumerate(alts, 1):
-        lg.info(f"Traitement {i}/{total} - Alternant {alt['id']}")
-        alt_datas = await get_alternant(sessionID,empId ,alt['id'])
-        last_date = await get_alternant_etat_presence(sessionID, alt['id'])
+    done = 0
+
+    async def fetch_details(alt: dict) -> None:
+        nonlocal done
+        alt_datas, last_date = await asyncio.gather(
+            _call_with_backoff(alt_details_limiter, lambda: get_alternant(sessionID, empId, alt['id'])),
+            _call_with_backoff(alt_details_limiter, lambda: get_alternant_etat_presence(sessionID, alt['id'])),
+        )
         alt.update({"details":alt_datas, "last_date":last_date})
+        done += 1
+        lg.info(f"Traitement {done}/{total} - Alternant {alt['id']}")
+
+    await asyncio.gather(*(fetch_details(alt) for alt in alts))
     return alts
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import src.config as config
+from src.modules.storage.services import session_refresh_lock
+
+from .client import SylaeAuthError, SylaeClient, get_sylae_client
+from .scenarios.connexion import Authentification
+
+lg = logging.getLogger()
+
+
+async def _locked_login(username: str, password: str) -> str:
+    """
+    Connexion à Sylaé sous le verrou partagé entre les workers uvicorn.
+
+    Une seule connexion (formulaire ou navigateur) est en cours à la fois pour
+    tout le serveur. Les JSESSIONID du pool restent propres au processus :
+    Sylaé mémorise l'employeur sélectionné par session, et une session
+    utilisée en même temps par deux workers pourrait changer d'employeur au
+    milieu d'une extraction.
+    """
+    async with session_refresh_lock():
+        return await Authentification(username, password)
+
+
+class _SessionSlot:
+    """Une session Sylaé du pool et l'employeur qui la détient."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.sessionID: Optional[str] = None
+        self.expires_at = 0.0
+        self.owner: Optional[str] = None
+        self.holders = 0
+        self.lock = asyncio.Lock()
+
+    def needs_refresh(self, margin: float) -> bool:
+        return self.sessionID is None or time.monotonic() >= self.expires_at - margin
+
+
+class SessionPool:
+    """
+    Pool de sessions Sylaé authentifiées, prêtées par employeur.
+
+    Sylaé mémorise l'employeur sélectionné par session : une session ne peut
+    donc servir qu'un employeur à la fois. Le pool ouvre jusqu'à `size`
+    sessions (à la demande) et les prête aux workers :
+        - une session déjà détenue par l'employeur est partagée entre ses tâches ;
+        - sinon une session libre est réservée, de préférence encore valide ;
+        - sinon le worker attend qu'une session se libère.
+
+    Les sessions sont renouvelées avant leur expiration (15 minutes côté Sylaé)
+    et recyclées dès que Sylaé les rejette.
+
+    Utilisation :
+        async with pool.lease(empId) as sessionID:
+            ...
+    """
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        size: int = config.SYLAE_SESSION_POOL_SIZE,
+        ttl: float = config.SYLAE_SESSION_TTL,
+        refresh_margin: float = config.SYLAE_SESSION_REFRESH_MARGIN,
+        login: Callable[[str, str], Awaitable[str]] = _locked_login,
+        client: Optional[SylaeClient] = None,
+    ):
+        self.username = username
+        self.password = password
+        self.size = max(1, size)
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl / 2)
+        self._login = login
+        self._client = client
+        self._slots: List[_SessionSlot] = [_SessionSlot(i) for i in range(self.size)]
+        self._condition = asyncio.Condition()
+
+    @property
+    def client(self) -> SylaeClient:
+        return self._client or get_sylae_client()
+
+    def _pick(self, empId: str) -> Optional[_SessionSlot]:
+        for slot in self._slots:
+            if slot.owner == empId:
+                return slot
+        idle = [slot for slot in self._slots if slot.holders == 0]
+        if not idle:
+            return None
+        # Une session encore valide évite une connexion
+        return min(idle, key=lambda slot: slot.needs_refresh(self.refresh_margin))
+
+    async def _acquire(self, empId: str) -> _SessionSlot:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._pick(empId) is not None)
+            slot = self._pick(empId)
+            slot.owner = empId
+            slot.holders += 1
+            return slot
+
+    async def _release(self, slot: _SessionSlot) -> None:
+        async with self._condition:
+            slot.holders -= 1
+            if slot.holders == 0:
+                slot.owner = None
+            self._condition.notify_all()
+
+    async def _ensure_session(self, slot: _SessionSlot) -> str:
+        async with slot.lock:
+            if slot.needs_refresh(self.refresh_margin):
+                if slot.sessionID is not None:
+                    self.client.forget_session(slot.sessionID)
+                    lg.info(f"Renouvellement de la session Sylaé {slot.index + 1}/{self.size}")
+                else:
+                    lg.info(f"Ouverture de la session Sylaé {slot.index + 1}/{self.size}")
+                slot.sessionID = await self._login(self.username, self.password)
+                slot.expires_at = time.monotonic() + self.ttl
+                self.client.own_session(slot.sessionID)
+            return slot.sessionID
+
+    def _recycle(self, slot: _SessionSlot, sessionID: str) -> None:
+        # Une autre tâche a pu renouveler la session entre-temps
+        if slot.sessionID == sessionID:
+            self.client.forget_session(sessionID)
+            slot.sessionID = None
+            slot.expires_at = 0.0
+
+    @asynccontextmanager
+    async def lease(self, empId: str) -> AsyncIterator[str]:
+        """
+        Prête une session valide réservée à l'employeur le temps du bloc.
+
+        Args:
+            empId: ID de l'employeur
+
+        Yields:
+            Le JSESSIONID à utiliser
+
+        Raises:
+            SylaeAuthError: si Sylaé rejette la session pendant le bloc ;
+                la session est alors recyclée pour le prochain prêt
+        """
+        empId = str(empId)
+        slot = await self._acquire(empId)
+        try:
+            sessionID = await self._ensure_session(slot)
+            async with self.client.employer_lease(sessionID, empId):
+                try:
+                    yield sessionID
+                except SylaeAuthError:
+                    lg.warning(f"Session Sylaé {slot.index + 1}/{self.size} rejetée, elle sera renouvelée")
+                    self._recycle(slot, sessionID)
+                    raise
+        finally:
+            await self._release(slot)
+
+
+_session_pools: Dict[str, SessionPool] = {}
+
+
+def get_session_pool(username: str, password: str) -> SessionPool:
+    """Retourne le pool de sessions du worker pour ce compte, créé à la première utilisation."""
+    pool = _session_pools.get(username)
+    if pool is None or pool.password != password:
+        pool = SessionPool(username, password)
+        _session_pools[username] = pool
+    return pool
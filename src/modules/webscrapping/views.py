@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, status
 import logging
-import requests
+import httpx
 from datetime import datetime
 
 from src.modules.storage.avps.avps import complete_pdf_avps, get_stored_avps, save_avps
@@ -9,6 +9,8 @@ from src.modules.storage.delta.delta import delete_all_emptyfolders
 from src.modules.storage.alternants.alternants import save_alts
 
 from .services import *
+from .scenarios.browser import get_browser_manager
+from .scenarios.connexion import http_login_metrics
 
 router = APIRouter()
 
@@ -63,7 +65,7 @@ async def save_all_alternants()-> str :
             if alternants:
                 total_alternants += len(alternants)
             await save_alts(alternants, entreprise["siret"])
-        except requests.exceptions.ConnectionError as e:
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
             error_msg = f"Erreur de connexion pour l'entreprise {entreprise['siret']}: Le site sylae.asp-public.fr est inaccessible"
             lg.error(error_msg)
             errors.append(error_msg)
@@ -141,4 +143,13 @@ async def get_old_siret(old_folder_name: str)-> str :
     lg.info("Début récupération entreprises")
     old_entreprise = await get_old_entreprises(old_folder_name)
     await save_old_entreprises(old_entreprise)
-    return "step7-get-old-sirets => ok"
\ No newline at end of file
+    return "step7-get-old-sirets => ok"
+
+
+@router.get("/login-metrics", status_code=status.HTTP_200_OK)
+async def login_metrics() -> dict:
+    """Durées des connexions Sylaé par stratégie et relances du navigateur pour ce worker."""
+    return {
+        "http": http_login_metrics.as_dict(),
+        "playwright": get_browser_manager().metrics.as_dict(),
+    }